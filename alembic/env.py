@@ -22,9 +22,9 @@ def run_migrations_offline():
 
 def run_migrations_online():
     """Run migrations in 'online' mode using backend.database engine"""
-    from backend.database import engine
+    from backend.database import connect
     
-    with engine.connect() as connection:
+    with connect() as connection:
         context.configure(
             connection=connection, 
             target_metadata=target_metadata, 
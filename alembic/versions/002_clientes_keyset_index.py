@@ -0,0 +1,27 @@
+"""add composite index for clientes keyset pagination
+
+Revision ID: 002_clientes_keyset_index
+Revises: 001_add_refresh_tokens
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002_clientes_keyset_index'
+down_revision = '001_add_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_clientes_empresa_contato_id',
+        'clientes',
+        ['empresa_id', 'data_primeiro_contato', 'id'],
+        unique=False,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_clientes_empresa_contato_id', table_name='clientes', if_exists=True)
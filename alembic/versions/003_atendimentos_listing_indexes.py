@@ -0,0 +1,29 @@
+"""add composite indexes for filtered atendimentos listing
+
+Revision ID: 003_atendimentos_listing_indexes
+Revises: 002_clientes_keyset_index
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_atendimentos_listing_indexes'
+down_revision = '002_clientes_keyset_index'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_atendimentos_empresa_data_id': ['empresa_id', 'data_atendimento', 'id'],
+    'ix_atendimentos_empresa_status_data_id': ['empresa_id', 'status_atendimento', 'data_atendimento', 'id'],
+    'ix_atendimentos_empresa_cliente_data_id': ['empresa_id', 'cliente_id', 'data_atendimento', 'id'],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'atendimentos', columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name in reversed(list(INDEXES)):
+        op.drop_index(name, table_name='atendimentos', if_exists=True)
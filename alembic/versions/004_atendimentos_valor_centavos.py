@@ -0,0 +1,27 @@
+"""add numeric valor_centavos to atendimentos
+
+The column is filled for existing rows by the online backfill job:
+    python -m backend.jobs backfill-valor-centavos
+
+Revision ID: 004_atendimentos_valor_centavos
+Revises: 003_atendimentos_listing_indexes
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_atendimentos_valor_centavos'
+down_revision = '003_atendimentos_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('atendimentos')}
+    if 'valor_centavos' not in columns:
+        op.add_column('atendimentos', sa.Column('valor_centavos', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('atendimentos', 'valor_centavos')
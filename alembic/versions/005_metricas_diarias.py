@@ -0,0 +1,53 @@
+"""create metricas_diarias rollup table
+
+Populated here from the raw tables; re-run `python -m backend.jobs rebuild-metricas`
+after `backfill-valor-centavos` so historical revenue is included.
+
+Revision ID: 005_metricas_diarias
+Revises: 004_atendimentos_valor_centavos
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_metricas_diarias'
+down_revision = '004_atendimentos_valor_centavos'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('metricas_diarias'):
+        op.create_table(
+            'metricas_diarias',
+            sa.Column('empresa_id', sa.Integer(), nullable=False),
+            sa.Column('dia', sa.Date(), nullable=False),
+            sa.Column('atendimentos', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('receita_centavos', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('novos_clientes', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+            sa.PrimaryKeyConstraint('empresa_id', 'dia'),
+        )
+    op.execute("DELETE FROM metricas_diarias")
+    op.execute(
+        """
+        INSERT INTO metricas_diarias (empresa_id, dia, atendimentos, receita_centavos, novos_clientes)
+        SELECT empresa_id, dia, SUM(atendimentos), SUM(receita_centavos), SUM(novos_clientes)
+        FROM (
+            SELECT empresa_id, date(data_atendimento) AS dia, COUNT(*) AS atendimentos,
+                   COALESCE(SUM(valor_centavos), 0) AS receita_centavos, 0 AS novos_clientes
+            FROM atendimentos WHERE data_atendimento IS NOT NULL
+            GROUP BY empresa_id, date(data_atendimento)
+            UNION ALL
+            SELECT empresa_id, date(data_primeiro_contato) AS dia, 0, 0, COUNT(*)
+            FROM clientes WHERE data_primeiro_contato IS NOT NULL
+            GROUP BY empresa_id, date(data_primeiro_contato)
+        ) AS fontes
+        GROUP BY empresa_id, dia
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('metricas_diarias')
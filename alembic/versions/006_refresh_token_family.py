@@ -0,0 +1,29 @@
+"""add family_id to refresh_tokens for reuse detection
+
+Existing tokens become single-token families (family_id = jti).
+
+Revision ID: 006_refresh_token_family
+Revises: 005_metricas_diarias
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_refresh_token_family'
+down_revision = '005_metricas_diarias'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('refresh_tokens')}
+    if 'family_id' not in columns:
+        op.add_column('refresh_tokens', sa.Column('family_id', sa.String(length=64), nullable=True))
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'], unique=False, if_not_exists=True)
+    op.execute("UPDATE refresh_tokens SET family_id = jti WHERE family_id IS NULL")
+
+
+def downgrade():
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens', if_exists=True)
+    op.drop_column('refresh_tokens', 'family_id')
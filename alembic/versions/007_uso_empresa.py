@@ -0,0 +1,43 @@
+"""create uso_empresa usage counters
+
+Filled here from the raw tables; `python -m backend.jobs reconcile-uso` recomputes
+them later if they ever drift.
+
+Revision ID: 007_uso_empresa
+Revises: 006_refresh_token_family
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_uso_empresa'
+down_revision = '006_refresh_token_family'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('uso_empresa'):
+        op.create_table(
+            'uso_empresa',
+            sa.Column('empresa_id', sa.Integer(), nullable=False),
+            sa.Column('clientes', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('atendimentos', sa.Integer(), nullable=False, server_default='0'),
+            sa.ForeignKeyConstraint(['empresa_id'], ['empresas.id'], ),
+            sa.PrimaryKeyConstraint('empresa_id'),
+        )
+    op.execute("DELETE FROM uso_empresa")
+    op.execute(
+        """
+        INSERT INTO uso_empresa (empresa_id, clientes, atendimentos)
+        SELECT e.id,
+               (SELECT COUNT(*) FROM clientes c WHERE c.empresa_id = e.id),
+               (SELECT COUNT(*) FROM atendimentos a WHERE a.empresa_id = e.id)
+        FROM empresas e
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('uso_empresa')
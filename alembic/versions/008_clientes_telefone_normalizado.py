@@ -0,0 +1,85 @@
+"""add clientes.telefone_normalizado with a unique (empresa_id, telefone_normalizado) index
+
+Existing rows are backfilled here in id order. When an empresa already has several
+clientes with the same normalized phone, the oldest keeps it and the later ones stay
+NULL (they remain listed, but no longer block or match phone lookups).
+
+Revision ID: 008_clientes_telefone_normalizado
+Revises: 007_uso_empresa
+Create Date: 2026-10-17 00:00:00.000000
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_clientes_telefone_normalizado'
+down_revision = '007_uso_empresa'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _normalizar(value):
+    # Copy of backend.telefone.normalizar_telefone as of this revision.
+    international = (value or "").strip().startswith("+")
+    digits = re.sub(r"\D", "", value or "").lstrip("0")
+    if not international and len(digits) in (10, 11):
+        digits = "55" + digits
+    return digits or None
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('clientes')}
+    if 'telefone_normalizado' not in columns:
+        op.add_column('clientes', sa.Column('telefone_normalizado', sa.String(length=20), nullable=True))
+
+    clientes = sa.table(
+        'clientes',
+        sa.column('id', sa.Integer),
+        sa.column('empresa_id', sa.Integer),
+        sa.column('telefone', sa.String),
+        sa.column('telefone_normalizado', sa.String),
+    )
+    vistos = set()
+    ultimo_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(clientes.c.id, clientes.c.empresa_id, clientes.c.telefone)
+            .where(clientes.c.id > ultimo_id)
+            .order_by(clientes.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            normalizado = _normalizar(row.telefone)
+            if normalizado is not None and (row.empresa_id, normalizado) in vistos:
+                normalizado = None
+            elif normalizado is not None:
+                vistos.add((row.empresa_id, normalizado))
+            updates.append({'b_id': row.id, 'b_normalizado': normalizado})
+        bind.execute(
+            clientes.update()
+            .where(clientes.c.id == sa.bindparam('b_id'))
+            .values(telefone_normalizado=sa.bindparam('b_normalizado')),
+            updates,
+        )
+        ultimo_id = rows[-1].id
+
+    op.create_index(
+        'uq_clientes_empresa_telefone_normalizado',
+        'clientes',
+        ['empresa_id', 'telefone_normalizado'],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index('uq_clientes_empresa_telefone_normalizado', table_name='clientes', if_exists=True)
+    op.drop_column('clientes', 'telefone_normalizado')
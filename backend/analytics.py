@@ -2,9 +2,14 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Optional, Tuple
 
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend import models
+
 
 _PERIOD_ALIASES = {
     "hoje": "today",
@@ -110,3 +115,67 @@ def parse_brl_number(value) -> float:
         return float(raw)
     except ValueError:
         return 0.0
+
+
+def brl_to_centavos(value) -> Optional[int]:
+    """Convert a BRL amount (number or legacy string) to integer centavos.
+
+    Returns None when there is no value at all, so "not informed" stays distinct from zero.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and not value.strip():
+        return None
+    return int(round(parse_brl_number(value) * 100))
+
+
+def rollup_days(dr: DateRange) -> Tuple[date, date, date]:
+    """Day-aligned windows read from metricas_diarias.
+
+    Returns (previous_first_day, current_first_day, current_last_day). The previous
+    window is the same number of whole days immediately before the current one.
+    """
+    first = dr.start_date.date()
+    last = dr.end_date.date()
+    days = (last - first).days + 1
+    return first - timedelta(days=days), first, last
+
+
+def compute_dashboard_analytics(db: Session, empresa_id: int, dr: DateRange) -> dict:
+    """Metrics and daily series for /api/dashboard/analytics from the daily rollup.
+
+    A single query reads at most two rows per day of the window (previous + current),
+    independent of how many clientes/atendimentos the empresa has.
+    """
+    prev_first, first, last = rollup_days(dr)
+    m = models.MetricaDiaria
+    rows = db.execute(
+        select(m.dia, m.atendimentos, m.receita_centavos, m.novos_clientes)
+        .where(m.empresa_id == empresa_id, m.dia >= prev_first, m.dia <= last)
+        .order_by(m.dia)
+    ).all()
+
+    appointments = {False: 0, True: 0}
+    revenue = {False: 0, True: 0}
+    clients = {False: 0, True: 0}
+    revenue_series = []
+    clients_series = []
+    for r in rows:
+        atual = r.dia >= first
+        appointments[atual] += r.atendimentos or 0
+        revenue[atual] += r.receita_centavos or 0
+        clients[atual] += r.novos_clientes or 0
+        if atual and r.atendimentos:
+            revenue_series.append({"date": r.dia.isoformat(), "value": (r.receita_centavos or 0) / 100})
+        if atual and r.novos_clientes:
+            clients_series.append({"date": r.dia.isoformat(), "value": int(r.novos_clientes)})
+
+    return {
+        "metrics": {
+            "revenue": build_metric_change(revenue[True] / 100, revenue[False] / 100),
+            "clients": build_metric_change(float(clients[True]), float(clients[False])),
+            "appointments": build_metric_change(float(appointments[True]), float(appointments[False])),
+        },
+        "revenue_series": revenue_series,
+        "clients_series": clients_series,
+    }
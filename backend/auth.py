@@ -1,14 +1,19 @@
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from backend import models, database
+from backend import models, database, empresa_cache, refresh_store
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional, Tuple
 from datetime import datetime, timedelta, timezone
 import os
 import hashlib
+import threading
+import time
 import uuid
 import logging
+from collections import OrderedDict
 # OAuth2 scheme para extrair o token do header Authorization
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/empresas/login")
 logger = logging.getLogger("clientflow.auth")
@@ -30,6 +35,11 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(
     os.getenv("JWT_EXPIRE_MINUTES") or os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 )
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Tokens já verificados mantidos em memória (por sha256 do token, no máximo até o exp).
+JWT_CACHE_MAX_ENTRIES = int(os.getenv("JWT_CACHE_MAX_ENTRIES", "1024"))
+
+_verified_lock = threading.Lock()
+_verified: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -45,19 +55,51 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     logger.info("Token JWT criado para sub=%s, expira em %s minutos", to_encode.get("sub"), ACCESS_TOKEN_EXPIRE_MINUTES)
     return encoded_jwt
-def get_current_empresa_jwt(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> models.Empresa:
+def verify_access_token(token: str) -> dict:
     """
-    Dependency para rotas protegidas: extrai empresa do JWT
+    Verifica assinatura/expiração do JWT e devolve as claims (levanta JWTError se inválido).
+
+    O resultado fica num LRU limitado, então middleware e dependências que recebem o
+    mesmo token não repetem a verificação; a entrada nunca é usada depois do `exp`.
     """
-    credentials_exception = HTTPException(
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.time()
+    with _verified_lock:
+        item = _verified.get(key)
+        if item is not None:
+            expires_at, payload = item
+            if expires_at > now:
+                _verified.move_to_end(key)
+                return dict(payload)
+            del _verified[key]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)) and exp > now:
+        with _verified_lock:
+            _verified[key] = (float(exp), dict(payload))
+            _verified.move_to_end(key)
+            while len(_verified) > JWT_CACHE_MAX_ENTRIES:
+                _verified.popitem(last=False)
+    return payload
+
+
+def clear_verified_tokens() -> None:
+    with _verified_lock:
+        _verified.clear()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não autenticado",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _empresa_id_do_token(token: str, claims: Optional[dict]) -> int:
     try:
-        logger.info("Decodificando JWT... (token: %s...)", token[:20] if token else "VAZIO")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info("JWT decodificado com sucesso. sub=%s", payload.get("sub"))
+        payload = claims if claims is not None else verify_access_token(token)
         
         empresa_id_raw = payload.get("sub")
         try:
@@ -67,26 +109,55 @@ def get_current_empresa_jwt(token: str = Depends(oauth2_scheme), db: Session = D
         
         if empresa_id is None:
             logger.warning("JWT válido mas sem 'sub'. Payload: %s", payload)
-            raise credentials_exception
+            raise _credentials_exception()
             
         logger.info("Buscando empresa com ID: %s", empresa_id)
     except JWTError as e:
         logger.error("Erro ao decodificar JWT: %s", str(e))
-        raise credentials_exception
-    
-    empresa = db.query(models.Empresa).filter(models.Empresa.id == empresa_id).first()
+        raise _credentials_exception()
+    return empresa_id
+
+
+def _autenticada(empresa: Optional[empresa_cache.EmpresaSnapshot], empresa_id: int) -> empresa_cache.EmpresaSnapshot:
     if empresa is None:
         logger.error("Empresa com ID %s não encontrada no banco de dados", empresa_id)
-        raise credentials_exception
+        raise _credentials_exception()
     
     logger.info("Autenticação bem-sucedida para empresa: %s (ID: %s)", empresa.nome_empresa, empresa.id)
     return empresa
+
+
+def get_current_empresa_jwt(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(database.get_db),
+    claims: Optional[dict] = None,
+) -> empresa_cache.EmpresaSnapshot:
+    """
+    Dependency para rotas protegidas: extrai empresa do JWT
+
+    Devolve um `EmpresaSnapshot` somente leitura (cacheado), não uma instância ORM.
+    `claims` permite reaproveitar o payload já verificado pelo middleware.
+    """
+    empresa_id = _empresa_id_do_token(token, claims)
+    return _autenticada(empresa_cache.get_empresa(db, empresa_id), empresa_id)
+
+
+async def get_current_empresa_jwt_async(
+    token: str,
+    db: AsyncSession,
+    claims: Optional[dict] = None,
+) -> empresa_cache.EmpresaSnapshot:
+    """Versão async de `get_current_empresa_jwt` (AsyncSession, sem thread do threadpool)."""
+    empresa_id = _empresa_id_do_token(token, claims)
+    return _autenticada(await empresa_cache.get_empresa_async(db, empresa_id), empresa_id)
+
+
 def decode_access_token(token: str):
     """
     Decodifica e valida um JWT, retorna payload se válido, senão None
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_access_token(token)
         # Keep backward compatibility in tests/app code that expects int empresa_id.
         sub = payload.get("sub")
         if isinstance(sub, str) and sub.isdigit():
@@ -132,17 +203,28 @@ def _hash_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
 
+def _refresh_store() -> Optional[refresh_store.RedisRefreshTokenStore]:
+    return refresh_store.get_store(REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600)
+
+
 def create_refresh_token(db: Session, empresa_id: int) -> str:
-    """Create a refresh token, store hashed in DB and return token string containing jti."""
+    """Create a refresh token, store hashed in DB and return token string containing jti.
+
+    Each call starts a new token family (family_id = jti of the first token).
+    """
     raw = secrets.token_urlsafe(48)
+    token_hash = _hash_token(raw)
+    store = _refresh_store()
+    if store is not None:
+        return store.create(empresa_id, token_hash, raw)
     jti = uuid.uuid4().hex
     token_value = f"{jti}::{raw}"
-    token_hash = _hash_token(raw)
     expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     rt = models.RefreshToken(
         empresa_id=empresa_id,
         token_hash=token_hash,
         jti=jti,
+        family_id=jti,
         expires_at=expires_at,
         revoked=0
     )
@@ -151,30 +233,94 @@ def create_refresh_token(db: Session, empresa_id: int) -> str:
     return token_value
 
 
-def rotate_refresh_token(db: Session, old_jti: str, new_token_plain: str) -> Tuple[bool, Optional[str]]:
-    """Mark old token revoked and create a new refresh token. Returns new token string."""
-    old = db.query(models.RefreshToken).filter(models.RefreshToken.jti == old_jti, models.RefreshToken.revoked == 0).first()
-    if not old:
-        return False, None
-    # revoke old
-    old.revoked = 1
-    # create new
+def _rotate(db: Session, conditions: list, new_raw: str) -> Optional[Tuple[int, str]]:
+    """Revoke the single active token matching `conditions` and issue its successor.
+
+    The revoke is one conditional UPDATE (RETURNING where supported), so two
+    concurrent rotations of the same token cannot both succeed.
+    Returns (empresa_id, new token string) or None when nothing matched.
+    """
+    RT = models.RefreshToken
     new_jti = uuid.uuid4().hex
-    raw = new_token_plain
-    token_hash = _hash_token(raw)
-    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    new_rt = models.RefreshToken(
-        empresa_id=old.empresa_id,
-        token_hash=token_hash,
+    stmt = update(RT).where(RT.revoked == 0, *conditions).values(revoked=1, replaced_by=new_jti)
+    if db.get_bind().dialect.update_returning:
+        row = db.execute(stmt.returning(RT.jti, RT.empresa_id, RT.family_id)).first()
+    else:
+        row = None
+        if db.execute(stmt).rowcount:
+            row = db.execute(select(RT.jti, RT.empresa_id, RT.family_id).where(RT.replaced_by == new_jti)).first()
+    if row is None:
+        db.rollback()
+        return None
+
+    old_jti, empresa_id, family_id = row
+    db.add(models.RefreshToken(
+        empresa_id=empresa_id,
+        token_hash=_hash_token(new_raw),
         jti=new_jti,
-        expires_at=expires_at,
+        family_id=family_id or old_jti,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
         revoked=0,
         replaced_by=None
-    )
-    old.replaced_by = new_jti
-    db.add(new_rt)
+    ))
     db.commit()
-    return True, f"{new_jti}::{raw}"
+    return empresa_id, f"{new_jti}::{new_raw}"
+
+
+def rotate_refresh_token(db: Session, old_jti: str, new_token_plain: str) -> Tuple[bool, Optional[str]]:
+    """Mark old token revoked and create a new refresh token. Returns new token string."""
+    store = _refresh_store()
+    if store is not None:
+        _, rotated = store.rotate(old_jti, "", _hash_token(new_token_plain), new_token_plain)
+        return (True, rotated[1]) if rotated else (False, None)
+    rotated = _rotate(db, [models.RefreshToken.jti == old_jti], new_token_plain)
+    if rotated is None:
+        return False, None
+    return True, rotated[1]
+
+
+def exchange_refresh_token(db: Session, token: str) -> Optional[Tuple[int, str]]:
+    """Validate and rotate a '<jti>::<raw>' refresh token in one conditional UPDATE + INSERT.
+
+    Returns (empresa_id, new refresh token) or None if the token is unknown, expired,
+    revoked or does not match. Presenting an already-rotated token is treated as theft:
+    the whole family is revoked, so the legitimate holder has to log in again.
+    """
+    try:
+        jti, raw = token.split("::", 1)
+    except (AttributeError, ValueError):
+        return None
+    RT = models.RefreshToken
+    token_hash = _hash_token(raw)
+    store = _refresh_store()
+    if store is not None:
+        new_raw = create_session_token()
+        return store.rotate(jti, token_hash, _hash_token(new_raw), new_raw)[1]
+    now = datetime.now(timezone.utc)
+    rotated = _rotate(
+        db,
+        [RT.jti == jti, RT.token_hash == token_hash, or_(RT.expires_at.is_(None), RT.expires_at > now)],
+        create_session_token(),
+    )
+    if rotated is not None:
+        return rotated
+
+    # Failure path only: find out whether this was the reuse of a rotated token.
+    reused = db.execute(
+        select(RT.empresa_id, RT.family_id).where(
+            RT.jti == jti, RT.token_hash == token_hash, RT.revoked != 0, RT.replaced_by.isnot(None)
+        )
+    ).first()
+    if reused is not None:
+        empresa_id, family_id = reused
+        scope = RT.family_id == family_id if family_id else RT.empresa_id == empresa_id
+        revoked = db.execute(update(RT).where(scope, RT.revoked == 0).values(revoked=1)).rowcount
+        db.commit()
+        logger.warning(
+            "Reuso de refresh token detectado (empresa ID=%s, família=%s); %s token(s) revogado(s)",
+            empresa_id, family_id, revoked,
+        )
+    return None
 
 
 def verify_refresh_token(db: Session, token: str) -> Optional[models.RefreshToken]:
@@ -183,6 +329,9 @@ def verify_refresh_token(db: Session, token: str) -> Optional[models.RefreshToke
         jti, raw = token.split("::", 1)
     except Exception:
         return None
+    store = _refresh_store()
+    if store is not None:
+        return _verify_in_store(store, jti, raw)
     rt = db.query(models.RefreshToken).filter(models.RefreshToken.jti == jti).first()
     if not rt or rt.revoked:
         return None
@@ -199,6 +348,27 @@ def verify_refresh_token(db: Session, token: str) -> Optional[models.RefreshToke
     return rt
 
 
+def _verify_in_store(store: refresh_store.RedisRefreshTokenStore, jti: str, raw: str) -> Optional[models.RefreshToken]:
+    data = store.get(jti)
+    if not data or data.get("revoked") != "0" or data.get("token_hash") != _hash_token(raw):
+        return None
+    if int(data["expires_at"]) <= time.time():
+        return None
+    # Instância transiente (fora de sessão) com os mesmos atributos da linha SQL.
+    return models.RefreshToken(
+        jti=jti,
+        empresa_id=int(data["empresa_id"]),
+        token_hash=data["token_hash"],
+        family_id=data.get("family_id"),
+        revoked=0,
+        created_at=datetime.fromtimestamp(int(data["created_at"]), tz=timezone.utc),
+        expires_at=datetime.fromtimestamp(int(data["expires_at"]), tz=timezone.utc),
+    )
+
+
 def revoke_refresh_tokens_for_empresa(db: Session, empresa_id: int):
+    store = _refresh_store()
+    if store is not None:
+        return store.revoke_empresa(empresa_id)
     db.query(models.RefreshToken).filter(models.RefreshToken.empresa_id == empresa_id, models.RefreshToken.revoked == 0).update({models.RefreshToken.revoked: 1})
     db.commit()
@@ -0,0 +1,192 @@
+"""
+Cache de respostas por empresa (Redis, com fallback em memória)
+
+Chaves: cache:{empresa_id}:{endpoint}:{parametro normalizado}. Cada empresa mantém
+em cache:keys:{empresa_id} o conjunto das suas chaves, e as escritas chamam
+`invalidate_empresa` para apagá-las. Com o Redis fora do ar, o cache local (LRU com
+TTL) do processo atende; nesse modo a invalidação só alcança o próprio worker e o
+TTL limita a defasagem entre workers.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+import anyio
+import redis
+
+from backend.redis_client import get_redis_or_none, mark_redis_down
+
+logger = logging.getLogger("clientflow.cache")
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60"))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "1024"))
+
+_lock = threading.Lock()
+_local: "OrderedDict[str, tuple]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "local_hits": 0, "invalidations": 0, "redis_errors": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _key(empresa_id: int, endpoint: str, param: Optional[str]) -> str:
+    return f"cache:{empresa_id}:{endpoint}:{param or '-'}"
+
+
+def _index_key(empresa_id: int) -> str:
+    return f"cache:keys:{empresa_id}"
+
+
+def _redis_error(exc: Exception) -> None:
+    _count("redis_errors")
+    mark_redis_down(exc)
+
+
+def _local_get(key: str):
+    with _lock:
+        item = _local.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return value
+
+
+def _local_set(key: str, value: str, ttl: int) -> None:
+    with _lock:
+        _local[key] = (time.monotonic() + ttl, value)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def _read(key: str):
+    """(valor desserializado ou None, cliente Redis utilizável ou None)."""
+    r = get_redis_or_none()
+    if r is not None:
+        try:
+            raw = r.get(key)
+            if raw is not None:
+                _count("hits")
+                return json.loads(raw), r
+        except redis.RedisError as exc:
+            _redis_error(exc)
+            r = None
+    if r is None:
+        raw = _local_get(key)
+        if raw is not None:
+            _count("hits")
+            _count("local_hits")
+            return json.loads(raw), r
+    _count("misses")
+    return None, r
+
+
+def _write(r, empresa_id: int, key: str, value: Any, ttl: int) -> None:
+    raw = json.dumps(value, default=str)
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.set(key, raw, ex=ttl)
+            pipe.sadd(_index_key(empresa_id), key)
+            pipe.expire(_index_key(empresa_id), ttl)
+            pipe.execute()
+            return
+        except redis.RedisError as exc:
+            _redis_error(exc)
+    _local_set(key, raw, ttl)
+
+
+def get_or_compute(
+    empresa_id: int,
+    endpoint: str,
+    param: Optional[str],
+    compute: Callable[[], Any],
+    ttl: int = DASHBOARD_CACHE_TTL,
+) -> Any:
+    """Devolve o valor em cache para (empresa, endpoint, param) ou calcula e grava.
+
+    `compute` precisa devolver algo serializável em JSON.
+    """
+    if ttl <= 0:
+        return compute()
+
+    key = _key(empresa_id, endpoint, param)
+    value, r = _read(key)
+    if value is not None:
+        return value
+    value = compute()
+    _write(r, empresa_id, key, value, ttl)
+    return value
+
+
+async def get_or_compute_async(
+    empresa_id: int,
+    endpoint: str,
+    param: Optional[str],
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int = DASHBOARD_CACHE_TTL,
+) -> Any:
+    """Versão de `get_or_compute` para rotas async: `compute` é uma corrotina.
+
+    O cliente Redis é síncrono, então leitura e gravação rodam em thread (rápidas); a
+    espera pelo banco dentro de `compute` não ocupa thread.
+    """
+    if ttl <= 0:
+        return await compute()
+
+    key = _key(empresa_id, endpoint, param)
+    value, r = await anyio.to_thread.run_sync(_read, key)
+    if value is not None:
+        return value
+    value = await compute()
+    await anyio.to_thread.run_sync(_write, r, empresa_id, key, value, ttl)
+    return value
+
+
+def invalidate_empresa(empresa_id: int) -> None:
+    """Apaga todas as respostas em cache da empresa (chamar após commit de escritas)."""
+    _count("invalidations")
+    prefix = f"cache:{empresa_id}:"
+    with _lock:
+        for key in [k for k in _local if k.startswith(prefix)]:
+            del _local[key]
+
+    r = get_redis_or_none()
+    if r is None:
+        return
+    try:
+        index = _index_key(empresa_id)
+        keys = r.smembers(index)
+        pipe = r.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(index)
+        pipe.execute()
+    except redis.RedisError as exc:
+        _redis_error(exc)
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["local_entries"] = len(_local)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 3) if lookups else 0.0
+    return snapshot
+
+
+def clear_local() -> None:
+    with _lock:
+        _local.clear()
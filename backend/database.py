@@ -1,6 +1,10 @@
 import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session
+from contextlib import asynccontextmanager, contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.orm import Session, declarative_base, sessionmaker, scoped_session
+
+from backend import db_metrics
 
 # Configuração via variáveis de ambiente
 # Prioriza DATABASE_URL (Railway/Heroku), senão usa variáveis individuais
@@ -66,14 +70,137 @@ try:
 except Exception:
     connect_args = {}
 
+# Pools instrumentados (espera no checkout, ver backend/db_metrics.py). SQLite em
+# memória mantém o pool padrão (uma conexão por thread).
+_instrument_pool = ":memory:" not in (SQLALCHEMY_DATABASE_URL or "")
+_sync_pool_kwargs = {"poolclass": db_metrics.InstrumentedQueuePool} if _instrument_pool else {}
+_async_pool_kwargs = {"poolclass": db_metrics.InstrumentedAsyncQueuePool} if _instrument_pool else {}
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args=connect_args,
+    **_sync_pool_kwargs,
     **engine_kwargs,
 )
 
+
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg2://", 1)
+    return url
+
+
+# ====== Réplica de leitura (opcional) ======
+#
+# Com DATABASE_REPLICA_URL, as sessões de leitura (listagens, dashboard, analytics,
+# exportações) podem ser roteadas para a réplica via `backend.replica.route_reads`.
+# A decisão (atraso da réplica, janela read-your-writes) fica em backend/replica.py;
+# aqui ficam só os engines e a sessão que escolhe o bind.
+
+_REPLICA_BIND = "replica_bind"
+replica_engine = None
+_async_replica_engine = None
+
+
+def configure_replica(url: str = None) -> None:
+    """(Re)cria o engine da réplica; None desliga o roteamento."""
+    global replica_engine, _async_replica_engine
+    replica_engine = (
+        create_engine(_normalize_url(url), connect_args=connect_args, **_sync_pool_kwargs, **engine_kwargs)
+        if url else None
+    )
+    _async_replica_engine = None
+
+
+def get_async_replica_engine():
+    """Engine async da réplica, criado sob demanda (None sem réplica configurada)."""
+    global _async_replica_engine
+    if replica_engine is not None and _async_replica_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_replica_engine = create_async_engine(
+            _async_url(replica_engine.url.render_as_string(hide_password=False)),
+            connect_args=_async_connect_args(),
+            **_async_pool_kwargs,
+            **engine_kwargs,
+        )
+    return _async_replica_engine
+
+
+class RoutingSession(Session):
+    """Session que lê da réplica quando `info["replica_bind"]` foi definido.
+
+    Flush e instruções de escrita (INSERT/UPDATE/DELETE) sempre vão para o primário,
+    então uma sessão de leitura nunca grava na réplica por engano.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get(_REPLICA_BIND)
+        if replica is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def use_replica(db: Session, bind) -> None:
+    """Roteia as leituras da sessão para `bind` (engine síncrono da réplica)."""
+    db.info[_REPLICA_BIND] = bind
+
+
+configure_replica(os.getenv("DATABASE_REPLICA_URL"))
+
 # Session factory (scoped para threads)
-SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+SessionLocal = scoped_session(
+    sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+)
+
+
+def _async_url(url: str) -> str:
+    """URL equivalente com driver async (asyncpg para Postgres, aiosqlite para SQLite)."""
+    if url.startswith("sqlite"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+def _async_connect_args() -> dict:
+    if SQLALCHEMY_DATABASE_URL.startswith("postgresql"):
+        return {"timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5"))}
+    return {}
+
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_engine():
+    """Engine async criado sob demanda, com o mesmo banco e limites de pool do síncrono.
+
+    As rotas de leitura (listagens, dashboard, analytics) usam este engine: enquanto
+    esperam o banco não ocupam thread do threadpool.
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            _async_url(SQLALCHEMY_DATABASE_URL),
+            connect_args=_async_connect_args(),
+            **_async_pool_kwargs,
+            **engine_kwargs,
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+def pools() -> dict:
+    """Pools dos engines já criados, por nome (para /metrics)."""
+    named = {"primary": engine, "primary_async": _async_engine, "replica": replica_engine,
+             "replica_async": _async_replica_engine}
+    return {name: getattr(e, "sync_engine", e).pool for name, e in named.items() if e is not None}
 
 # Base para os modelos
 Base = declarative_base()
@@ -83,20 +210,123 @@ def create_tenant_schema(schema_name: str):
     with engine.connect() as conn:
         conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema_name}"))
 
+# ====== search_path do tenant (Postgres) ======
+#
+# Em vez de SET search_path a cada requisição e RESET no fechamento, a sessão guarda o
+# schema desejado em `session.info` e cada conexão do pool lembra (em `connection.info`)
+# o search_path que está valendo nela. Ao iniciar a transação da sessão na conexão, o SET
+# (ou RESET, para sessões sem tenant) só é emitido se os dois forem diferentes: o mesmo
+# tenant reutilizando a conexão não paga nenhuma instrução extra.
+#
+# O SET é aplicado fora da transação do ORM: direto na conexão DBAPI, seguido de commit
+# da própria conexão, antes de qualquer instrução da sessão. Assim ele sobrevive ao
+# rollback do close() de requisições só de leitura, que nunca fazem commit.
+
+_SESSION_SCHEMA = "tenant_schema"
+_CONN_SEARCH_PATH = "search_path"
+_DEFAULT = None
+
+
+def _current_search_path(connection):
+    return connection.info.get(_CONN_SEARCH_PATH, _DEFAULT)
+
+
+def _sync_search_path(connection, schema) -> None:
+    """Deixa `schema` como search_path permanente da conexão (no-op se já estiver).
+
+    Só pode ser chamada no início da transação (ver _search_path_on_begin): o commit
+    da conexão DBAPI não pode levar junto trabalho da sessão.
+    """
+    if connection.dialect.name != "postgresql" or _current_search_path(connection) == schema:
+        return
+    dbapi_connection = connection.connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    try:
+        if schema:
+            cursor.execute(f"SET search_path TO {schema}, public")
+        else:
+            cursor.execute("RESET search_path")
+    finally:
+        cursor.close()
+    dbapi_connection.commit()
+    connection.info[_CONN_SEARCH_PATH] = schema
+
+
+@event.listens_for(Session, "after_begin")
+def _search_path_on_begin(session, transaction, connection) -> None:
+    _sync_search_path(connection, session.info.get(_SESSION_SCHEMA))
+
+
+def set_search_path(db: Session, schema: str = None) -> None:
+    """Define o schema do tenant da sessão (None = search_path padrão).
+
+    Vale a partir da próxima transação. Se a sessão já estiver em uma (ex.: a
+    autenticação consultou o banco), o schema vale nela via SET LOCAL, que termina
+    junto com a transação.
+    """
+    db.info[_SESSION_SCHEMA] = schema
+    if not db.in_transaction() or db.bind is None or db.bind.dialect.name != "postgresql":
+        return
+    connection = db.connection()
+    if _current_search_path(connection) != schema:
+        if schema:
+            connection.exec_driver_sql(f"SET LOCAL search_path TO {schema}, public")
+        else:
+            connection.exec_driver_sql("SET LOCAL search_path TO DEFAULT")
+
+
+@contextmanager
+def connect(bind=None):
+    """`engine.connect()` com o search_path padrão.
+
+    Conexões do pool guardam o search_path do último tenant que as usou; uso direto de
+    `engine.connect()` (health check, lock de migração, atraso da réplica) passa por
+    aqui para não herdar o schema de outra empresa.
+    """
+    with (bind or engine).connect() as conn:
+        _sync_search_path(conn, _DEFAULT)
+        yield conn
+
+
 # Dependência para obter sessão do banco de dados
 def get_db(schema: str = None):
     db = SessionLocal()
-    dialect = db.bind.dialect.name if db.bind is not None else ""
-    if schema and dialect == "postgresql":
-        db.execute(text(f"SET search_path TO {schema}, public"))
+    set_search_path(db, schema)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_session(schema: str = None):
+    """Sessão do engine async com search_path do tenant (Postgres), fechada na saída."""
+    get_async_engine()
+    db = _async_session_factory()
+    db.sync_session.info[_SESSION_SCHEMA] = schema
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Dependência async, equivalente a get_db para rotas `async def`
+async def get_async_db(schema: str = None):
+    async with async_session(schema) as db:
+        yield db
+
+
+@contextmanager
+def standalone_session(schema: str = None):
+    """Sessão fora do registry thread-local do `SessionLocal`.
+
+    Para trabalho que sobrevive à thread da requisição (ex.: respostas em streaming),
+    onde a thread do pool pode ser reutilizada por outra requisição enquanto o
+    gerador ainda lê do banco.
+    """
+    db = SessionLocal.session_factory()
+    set_search_path(db, schema)
     try:
         yield db
     finally:
-        # Important for Postgres + connection pooling: avoid leaking tenant search_path
-        # across requests when the connection is returned to the pool.
-        if dialect == "postgresql":
-            try:
-                db.execute(text("RESET search_path"))
-            except Exception:
-                pass
         db.close()
@@ -0,0 +1,166 @@
+"""
+Instrumentação do pool de conexões e das consultas SQL
+
+- espera no checkout: `InstrumentedQueuePool` (e a variante async) cronometra quanto
+  cada requisição esperou por uma conexão livre do pool;
+- consultas: eventos before/after_cursor_execute em todos os engines medem a duração de
+  cada instrução; as acima de DB_SLOW_QUERY_MS são logadas;
+- por requisição: `start_request()` abre um contador (contextvar) que o middleware de
+  log lê no fim, com número de consultas, tempo em SQL e espera no pool. Requisições
+  com mais de DB_REQUEST_QUERY_WARN consultas geram um aviso (N+1).
+
+Os totais e o estado de cada pool (conexões em uso, overflow) saem em /metrics.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger("clientflow.db_metrics")
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_REQUEST_QUERY_WARN = int(os.getenv("DB_REQUEST_QUERY_WARN", "50"))
+
+_QUERY_START = "query_started_at"
+
+_lock = threading.Lock()
+_stats = {
+    "checkouts": 0,
+    "checkout_wait_ms_total": 0.0,
+    "checkout_wait_ms_max": 0.0,
+    "checkout_timeouts": 0,
+    "queries": 0,
+    "query_ms_total": 0.0,
+    "query_ms_max": 0.0,
+    "slow_queries": 0,
+}
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    db_ms: float = 0.0
+    pool_wait_ms: float = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar("request_db_stats", default=None)
+
+
+def start_request() -> RequestDbStats:
+    """Abre o contador da requisição atual (o objeto é compartilhado com as threads do
+    threadpool, que copiam o contexto)."""
+    request_stats = RequestDbStats()
+    _current.set(request_stats)
+    return request_stats
+
+
+def warn_if_chatty(method: str, path: str, request_stats: RequestDbStats) -> None:
+    if DB_REQUEST_QUERY_WARN > 0 and request_stats.queries > DB_REQUEST_QUERY_WARN:
+        logger.warning("%s %s executou %s consultas (possível N+1)", method, path, request_stats.queries)
+
+
+# ====== Pool ======
+
+def _record_checkout(wait_ms: float, timed_out: bool) -> None:
+    with _lock:
+        if timed_out:
+            _stats["checkout_timeouts"] += 1
+        else:
+            _stats["checkouts"] += 1
+        _stats["checkout_wait_ms_total"] += wait_ms
+        _stats["checkout_wait_ms_max"] = max(_stats["checkout_wait_ms_max"], wait_ms)
+    request_stats = _current.get()
+    if request_stats is not None:
+        request_stats.pool_wait_ms += wait_ms
+
+
+class _CheckoutTimer:
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            _record_checkout((time.perf_counter() - started) * 1000, timed_out)
+
+
+class InstrumentedQueuePool(_CheckoutTimer, QueuePool):
+    """QueuePool que mede a espera por conexão em cada checkout."""
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    """Variante para os engines async."""
+
+
+def pool_status(pool) -> dict:
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            idle=pool.checkedin(),
+        )
+    return status
+
+
+# ====== Consultas ======
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get(_QUERY_START)
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    slow = elapsed_ms >= DB_SLOW_QUERY_MS
+    with _lock:
+        _stats["queries"] += 1
+        _stats["query_ms_total"] += elapsed_ms
+        _stats["query_ms_max"] = max(_stats["query_ms_max"], elapsed_ms)
+        if slow:
+            _stats["slow_queries"] += 1
+    request_stats = _current.get()
+    if request_stats is not None:
+        request_stats.queries += 1
+        request_stats.db_ms += elapsed_ms
+    if slow:
+        logger.warning("Consulta lenta (%.0fms): %s", elapsed_ms, " ".join(statement.split())[:500])
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_query_start(exception_context) -> None:
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_QUERY_START):
+        conn.info[_QUERY_START].pop()
+
+
+def stats(pools: Optional[Dict[str, object]] = None) -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+    checkouts = snapshot["checkouts"] + snapshot["checkout_timeouts"]
+    queries = snapshot["queries"]
+    snapshot.update(
+        checkout_wait_ms_avg=round(snapshot.pop("checkout_wait_ms_total") / checkouts, 2) if checkouts else 0.0,
+        checkout_wait_ms_max=round(snapshot["checkout_wait_ms_max"], 2),
+        query_ms_avg=round(snapshot.pop("query_ms_total") / queries, 2) if queries else 0.0,
+        query_ms_max=round(snapshot["query_ms_max"], 2),
+    )
+    if pools:
+        snapshot["pools"] = {name: pool_status(pool) for name, pool in pools.items()}
+    return snapshot
@@ -1,26 +1,78 @@
-from fastapi import Depends, Request
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.database import get_db
-from backend import auth, models
+from backend.database import async_session, get_db, set_search_path
+from backend import auth, empresa_cache, replica
 import logging
+import os
+import secrets
 
 logger = logging.getLogger("clientflow.dependencies")
 
-def require_authenticated_empresa(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(get_db)) -> models.Empresa:
+# Token exigido em /metrics (header X-Metrics-Token); sem ele o endpoint fica desligado
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+def _verified_claims(request: Request, token: str):
     logger.info("Token recebido: %s...", token[:20] if token else "VAZIO")
-    empresa = auth.get_current_empresa_jwt(token, db)
+    # Claims já verificadas pelo middleware inject_empresa_id_jwt para este mesmo token
+    if getattr(request.state, "jwt_token", None) != token:
+        return None
+    return getattr(request.state, "jwt_claims", None)
+
+
+def require_authenticated_empresa(
+    request: Request,
+    token: str = Depends(auth.oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> empresa_cache.EmpresaSnapshot:
+    empresa = auth.get_current_empresa_jwt(token, db, claims=_verified_claims(request, token))
     logger.info("Usuário autenticado: empresa %s (%s)", empresa.id, empresa.nome_empresa)
     return empresa
 
 
 def get_tenant_db(request: Request, db: Session = Depends(get_db)):
     """Return a DB session with search_path set to the tenant schema derived from request.state.empresa_id.
-    Falls back to public if not set."""
-    from sqlalchemy import text
+    Falls back to public if not set. SET is only issued when the pooled connection is on
+    a different schema (see database.set_search_path)."""
     schema = None
     if hasattr(request.state, "empresa_id") and request.state.empresa_id:
         schema = f"empresa_{request.state.empresa_id}"
-    dialect = db.bind.dialect.name if db.bind is not None else ""
-    if schema and dialect == "postgresql":
-        db.execute(text(f"SET search_path TO {schema}, public"))
+    set_search_path(db, schema)
     yield db
+
+
+async def get_tenant_async_db(request: Request):
+    """Async counterpart of get_tenant_db (AsyncSession on the async engine), for
+    read-heavy `async def` routes. Reads go to the replica when one is configured and
+    fresh enough (see backend.replica)."""
+    # The JWT "sub" claim arrives as a string
+    empresa_id = getattr(request.state, "empresa_id", None)
+    empresa_id = int(empresa_id) if empresa_id else None
+    schema = f"empresa_{empresa_id}" if empresa_id else None
+    async with async_session(schema) as db:
+        await replica.route_reads_async(db, empresa_id)
+        yield db
+
+
+async def require_authenticated_empresa_async(
+    request: Request,
+    token: str = Depends(auth.oauth2_scheme),
+    db: AsyncSession = Depends(get_tenant_async_db),
+) -> empresa_cache.EmpresaSnapshot:
+    """Async counterpart of require_authenticated_empresa for `async def` routes: the
+    lookup (on a cache miss) reuses the route's AsyncSession, so the request holds
+    neither a threadpool thread nor a sync-pool connection."""
+    empresa = await auth.get_current_empresa_jwt_async(token, db, claims=_verified_claims(request, token))
+    logger.info("Usuário autenticado: empresa %s (%s)", empresa.id, empresa.nome_empresa)
+    return empresa
+
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)) -> None:
+    """Protege /metrics (pools, tempos de consulta, caches): 404 sem METRICS_TOKEN
+    configurado, 401 se o header X-Metrics-Token não confere."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_metrics_token or not secrets.compare_digest(x_metrics_token, METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
@@ -0,0 +1,279 @@
+"""
+Cache de snapshots de Empresa para a autenticação (memória do processo + Redis opcional)
+
+Toda requisição autenticada resolve a empresa do JWT. Em vez de um SELECT por
+requisição, guardamos um `EmpresaSnapshot` imutável e desligado de sessão (sem
+senha_hash). Camadas:
+
+- memória do processo: TTL curto (EMPRESA_CACHE_LOCAL_TTL_SECONDS), LRU limitado;
+- Redis (empresa:{id}): TTL maior (EMPRESA_CACHE_TTL_SECONDS), compartilhado entre workers.
+
+Alterações em Empresa via ORM (flush de update/delete, ou UPDATE/DELETE em massa)
+invalidam as entradas quando a transação faz commit. Outros workers enxergam a
+mudança assim que a cópia local deles expira.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Optional
+
+import anyio
+import redis
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.redis_client import get_redis_or_none, mark_redis_down
+
+logger = logging.getLogger("clientflow.empresa_cache")
+
+EMPRESA_CACHE_TTL = int(os.getenv("EMPRESA_CACHE_TTL_SECONDS", "300"))
+EMPRESA_CACHE_LOCAL_TTL = int(os.getenv("EMPRESA_CACHE_LOCAL_TTL_SECONDS", "30"))
+EMPRESA_CACHE_MAX_ENTRIES = int(os.getenv("EMPRESA_CACHE_MAX_ENTRIES", "2048"))
+EMPRESA_CACHE_REDIS = os.getenv("EMPRESA_CACHE_REDIS", "1").lower() not in ("0", "false", "no")
+
+_PENDING_KEY = "empresa_cache_invalidate"
+_ALL = "*"
+
+_lock = threading.Lock()
+_local: "OrderedDict[int, tuple]" = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "local_hits": 0, "invalidations": 0, "redis_errors": 0}
+
+
+@dataclass(frozen=True)
+class EmpresaSnapshot:
+    """Cópia somente leitura das colunas de Empresa usadas pelas rotas (sem senha_hash)."""
+
+    id: int
+    nome_empresa: str
+    nicho: str
+    tipo_empresa: Optional[str]
+    telefone: Optional[str]
+    email_login: str
+    plano_empresa: Optional[str]
+    limite_clientes: Optional[int]
+    limite_atendimentos: Optional[int]
+    ativo: Optional[int]
+    data_cadastro: Optional[datetime]
+    data_inicio_plano: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, empresa: models.Empresa) -> "EmpresaSnapshot":
+        return cls(**{f.name: getattr(empresa, f.name) for f in fields(cls)})
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=lambda v: v.isoformat())
+
+    @classmethod
+    def from_json(cls, raw: str) -> "EmpresaSnapshot":
+        data = json.loads(raw)
+        for name in ("data_cadastro", "data_inicio_plano"):
+            if data.get(name):
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+_COLUMNS = tuple(getattr(models.Empresa, f.name) for f in fields(EmpresaSnapshot))
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _redis_key(empresa_id: int) -> str:
+    return f"empresa:{empresa_id}"
+
+
+def _redis():
+    return get_redis_or_none() if EMPRESA_CACHE_REDIS else None
+
+
+def _local_get(empresa_id: int) -> Optional[EmpresaSnapshot]:
+    with _lock:
+        item = _local.get(empresa_id)
+        if item is None:
+            return None
+        expires_at, snapshot = item
+        if expires_at < time.monotonic():
+            del _local[empresa_id]
+            return None
+        _local.move_to_end(empresa_id)
+        return snapshot
+
+
+def _local_set(snapshot: EmpresaSnapshot) -> None:
+    with _lock:
+        _local[snapshot.id] = (time.monotonic() + EMPRESA_CACHE_LOCAL_TTL, snapshot)
+        _local.move_to_end(snapshot.id)
+        while len(_local) > EMPRESA_CACHE_MAX_ENTRIES:
+            _local.popitem(last=False)
+
+
+def _local_hit(empresa_id: int) -> Optional[EmpresaSnapshot]:
+    snapshot = _local_get(empresa_id)
+    if snapshot is not None:
+        _count("hits")
+        _count("local_hits")
+    return snapshot
+
+
+def _redis_get(empresa_id: int):
+    """(snapshot do Redis ou None, cliente Redis utilizável ou None)."""
+    r = _redis()
+    if r is None:
+        return None, None
+    try:
+        raw = r.get(_redis_key(empresa_id))
+    except redis.RedisError as exc:
+        _count("redis_errors")
+        mark_redis_down(exc)
+        return None, None
+    if raw is None:
+        return None, r
+    snapshot = EmpresaSnapshot.from_json(raw)
+    _local_set(snapshot)
+    _count("hits")
+    return snapshot, r
+
+
+def _store(r, row) -> Optional[EmpresaSnapshot]:
+    if row is None:
+        return None
+    snapshot = EmpresaSnapshot(*row)
+    _local_set(snapshot)
+    if r is not None:
+        try:
+            r.set(_redis_key(snapshot.id), snapshot.to_json(), ex=EMPRESA_CACHE_TTL)
+        except redis.RedisError as exc:
+            _count("redis_errors")
+            mark_redis_down(exc)
+    return snapshot
+
+
+def _select(empresa_id: int):
+    return select(*_COLUMNS).where(models.Empresa.id == empresa_id)
+
+
+def get_empresa(db: Session, empresa_id: int) -> Optional[EmpresaSnapshot]:
+    """Snapshot da empresa `empresa_id`, ou None se ela não existir (None não é cacheado)."""
+    if EMPRESA_CACHE_TTL <= 0:
+        row = db.execute(_select(empresa_id)).first()
+        return EmpresaSnapshot(*row) if row else None
+
+    snapshot = _local_hit(empresa_id)
+    if snapshot is not None:
+        return snapshot
+    snapshot, r = _redis_get(empresa_id)
+    if snapshot is not None:
+        return snapshot
+
+    _count("misses")
+    return _store(r, db.execute(_select(empresa_id)).first())
+
+
+async def get_empresa_async(db: AsyncSession, empresa_id: int) -> Optional[EmpresaSnapshot]:
+    """`get_empresa` para rotas async: consulta pela AsyncSession; o cliente Redis é
+    síncrono, então leitura e gravação nele rodam em thread (rápidas)."""
+    if EMPRESA_CACHE_TTL <= 0:
+        row = (await db.execute(_select(empresa_id))).first()
+        return EmpresaSnapshot(*row) if row else None
+
+    snapshot = _local_hit(empresa_id)
+    if snapshot is not None:
+        return snapshot
+    snapshot, r = await anyio.to_thread.run_sync(_redis_get, empresa_id)
+    if snapshot is not None:
+        return snapshot
+
+    _count("misses")
+    row = (await db.execute(_select(empresa_id))).first()
+    if row is None:
+        return None
+    return await anyio.to_thread.run_sync(_store, r, row)
+
+
+def invalidate(empresa_id: Optional[int] = None) -> None:
+    """Descarta o snapshot de uma empresa (ou de todas, com empresa_id=None)."""
+    _count("invalidations")
+    with _lock:
+        if empresa_id is None:
+            _local.clear()
+        else:
+            _local.pop(empresa_id, None)
+
+    r = _redis()
+    if r is None:
+        return
+    try:
+        if empresa_id is None:
+            keys = list(r.scan_iter(match=_redis_key("*"), count=500))
+            if keys:
+                r.delete(*keys)
+        else:
+            r.delete(_redis_key(empresa_id))
+    except redis.RedisError as exc:
+        _count("redis_errors")
+        mark_redis_down(exc)
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["local_entries"] = len(_local)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_ratio"] = round(snapshot["hits"] / lookups, 3) if lookups else 0.0
+    return snapshot
+
+
+def clear_local() -> None:
+    with _lock:
+        _local.clear()
+
+
+# ====== Invalidação automática ======
+
+def _mark(session: Session, empresa_id) -> None:
+    session.info.setdefault(_PENDING_KEY, set()).add(empresa_id)
+
+
+@event.listens_for(models.Empresa, "after_update")
+@event.listens_for(models.Empresa, "after_delete")
+def _empresa_alterada(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        _mark(session, target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _empresa_alterada_em_massa(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is models.Empresa:
+        _mark(orm_execute_state.session, _ALL)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_invalidacoes(session: Session) -> None:
+    pendentes = session.info.pop(_PENDING_KEY, None)
+    if not pendentes:
+        return
+    if _ALL in pendentes:
+        invalidate(None)
+        return
+    for empresa_id in pendentes:
+        invalidate(empresa_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_invalidacoes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,92 @@
+"""
+Exportação em streaming (CSV/NDJSON) de dados de uma empresa
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Callable, Iterator, Optional, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from backend import replica
+from backend.database import standalone_session
+
+# Linhas buscadas por ida ao banco; com psycopg2 yield_per usa um cursor server-side.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows, columns: Sequence[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # Cabeçalho sai antes da consulta, para o primeiro byte não esperar o banco.
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    pending = 0
+    for row in rows:
+        writer.writerow(["" if v is None else _plain(v) for v in row])
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, columns: Sequence[str]) -> Iterator[str]:
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps({c: _plain(v) for c, v in zip(columns, row)}, ensure_ascii=False))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def stream_export(
+    build_query: Callable[[Session], object],
+    columns: Sequence[str],
+    formato: str,
+    filename: str,
+    schema: str = None,
+    empresa_id: Optional[int] = None,
+) -> StreamingResponse:
+    """Monta um StreamingResponse que lê `build_query(db)` em lotes de EXPORT_BATCH_SIZE.
+
+    A sessão é aberta dentro do gerador (fora do registry thread-local) e vive só
+    enquanto o corpo é enviado, então a memória do worker fica constante. Com
+    `empresa_id`, a leitura pode ir para a réplica (backend.replica).
+    """
+    serializer = iter_csv if formato == "csv" else iter_ndjson
+
+    def body():
+        with standalone_session(schema) as db:
+            replica.route_reads(db, empresa_id)
+            rows = build_query(db).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            yield from serializer(rows, columns)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_FORMATS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{formato}"'},
+    )
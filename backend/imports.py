@@ -0,0 +1,193 @@
+"""
+Importação em lote de clientes (CSV ou JSON)
+
+Em vez de uma requisição por cliente (SELECT de telefone duplicado + COUNT do plano +
+commit por linha), o arquivo inteiro é validado de uma vez com um TypeAdapter, os
+telefones já cadastrados (normalizados, ver backend.telefone) saem de uma única
+consulta e as linhas válidas são inseridas em lotes de CLIENTES_IMPORT_BATCH_SIZE
+(executemany; no Postgres o SQLAlchemy agrupa em INSERT multi-VALUES). O limite do
+plano é conferido uma vez por lote, pelos contadores de uso_empresa. Cada lote é uma
+transação.
+
+A resposta traz um relatório por linha com o motivo de cada linha não importada.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend import cache, models, rollups
+from backend.plan_limits import limit_message, registrar_uso, vagas_restantes
+from backend.schemas import ClienteCreate
+from backend.telefone import TELEFONE_DUPLICADO, normalizar_telefone, violou_telefone_unico
+
+CLIENTES_IMPORT_BATCH_SIZE = int(os.getenv("CLIENTES_IMPORT_BATCH_SIZE", "500"))
+CLIENTES_IMPORT_MAX_ROWS = int(os.getenv("CLIENTES_IMPORT_MAX_ROWS", "10000"))
+
+CSV_COLUMNS = ("nome", "telefone", "anotacoes_rapidas")
+
+_clientes_adapter = TypeAdapter(List[ClienteCreate])
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+
+def parse_csv(body: bytes) -> List[dict]:
+    """Linhas de um CSV com cabeçalho (nome, telefone[, anotacoes_rapidas]); aceita , ou ;."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise _bad_request("CSV deve estar em UTF-8")
+    first_line = text.split("\n", 1)[0]
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    header = {(name or "").strip().lower() for name in reader.fieldnames or ()}
+    if not {"nome", "telefone"} <= header:
+        raise _bad_request("CSV precisa das colunas nome e telefone")
+    rows = []
+    for raw in reader:
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in raw.items() if k}
+        rows.append({k: row[k] for k in CSV_COLUMNS if row.get(k)})
+    return rows
+
+
+def parse_json(body: bytes) -> List[dict]:
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        raise _bad_request("JSON inválido")
+    if not isinstance(data, list):
+        raise _bad_request("Envie uma lista de clientes")
+    return data
+
+
+def parse_rows(body: bytes, content_type: str) -> List[dict]:
+    if "csv" in (content_type or "").lower():
+        rows = parse_csv(body)
+    else:
+        rows = parse_json(body)
+    if len(rows) > CLIENTES_IMPORT_MAX_ROWS:
+        raise _bad_request(f"Máximo de {CLIENTES_IMPORT_MAX_ROWS} clientes por importação")
+    return rows
+
+
+def _validate(rows: List[dict]):
+    """Valida todas as linhas com um TypeAdapter; devolve ({índice: cliente}, {índice: erro})."""
+    erros: Dict[int, str] = {}
+    try:
+        return dict(enumerate(_clientes_adapter.validate_python(rows))), erros
+    except ValidationError as exc:
+        for err in exc.errors():
+            loc = err["loc"]
+            if not loc or not isinstance(loc[0], int):
+                raise _bad_request("Envie uma lista de clientes")
+            campo = ".".join(str(p) for p in loc[1:])
+            erros.setdefault(loc[0], f"{campo}: {err['msg']}" if campo else err["msg"])
+    indices = [i for i in range(len(rows)) if i not in erros]
+    validos = _clientes_adapter.validate_python([rows[i] for i in indices])
+    return dict(zip(indices, validos)), erros
+
+
+def _telefones_existentes(db: Session, empresa_id: int, telefones) -> set:
+    """Telefones normalizados já cadastrados (busca no índice único da empresa)."""
+    if not telefones:
+        return set()
+    consulta = db.query(models.Cliente.telefone_normalizado).filter(
+        models.Cliente.empresa_id == empresa_id,
+        models.Cliente.telefone_normalizado.in_(telefones),
+    )
+    return {telefone for (telefone,) in consulta}
+
+
+def _inserir_lote(db: Session, empresa_id: int, lote, erros: Dict[int, str]) -> list:
+    """INSERT do lote; se outra requisição gravou um dos telefones nesse meio tempo, o
+    lote inteiro falha no índice único: marca as duplicatas e tenta de novo sem elas.
+    Devolve as linhas inseridas (transação ainda aberta)."""
+    tabela = models.Cliente.__table__
+    while lote:
+        agora = datetime.now(timezone.utc)
+        try:
+            db.execute(insert(tabela), [
+                {
+                    "empresa_id": empresa_id,
+                    "nome": cliente.nome,
+                    "telefone": cliente.telefone,
+                    "telefone_normalizado": telefone,
+                    "anotacoes_rapidas": cliente.anotacoes_rapidas,
+                    "data_primeiro_contato": agora,
+                }
+                for _, cliente, telefone in lote
+            ])
+            return lote
+        except IntegrityError as exc:
+            db.rollback()
+            if not violou_telefone_unico(exc):
+                raise
+            existentes = _telefones_existentes(db, empresa_id, {telefone for _, _, telefone in lote})
+            if not existentes:
+                raise
+            for indice, _, telefone in lote:
+                if telefone in existentes:
+                    erros[indice] = TELEFONE_DUPLICADO
+            lote = [item for item in lote if item[2] not in existentes]
+    return lote
+
+
+def importar_clientes(db: Session, empresa: models.Empresa, rows: List[dict]) -> dict:
+    """Importa `rows` para a empresa. Linhas do relatório são numeradas a partir de 1."""
+    validos, erros = _validate(rows)
+
+    telefones = {indice: normalizar_telefone(cliente.telefone) for indice, cliente in validos.items()}
+    existentes = _telefones_existentes(db, empresa.id, set(telefones.values()))
+    vistos = set()
+    pendentes = []
+    for indice, cliente in validos.items():
+        telefone = telefones[indice]
+        if telefone in existentes:
+            erros[indice] = TELEFONE_DUPLICADO
+        elif telefone in vistos:
+            erros[indice] = "Telefone repetido no arquivo."
+        else:
+            vistos.add(telefone)
+            pendentes.append((indice, cliente, telefone))
+
+    importados = 0
+    for inicio in range(0, len(pendentes), CLIENTES_IMPORT_BATCH_SIZE):
+        lote = pendentes[inicio:inicio + CLIENTES_IMPORT_BATCH_SIZE]
+        vagas = vagas_restantes(empresa, "clientes", db)
+        if vagas is not None and vagas < len(lote):
+            for indice, _, _ in lote[vagas:]:
+                erros[indice] = limit_message(empresa)
+            lote = lote[:vagas]
+        if not lote:
+            db.rollback()
+            continue
+        lote = _inserir_lote(db, empresa.id, lote, erros)
+        if not lote:
+            continue
+        rollups.registrar(db, empresa.id, datetime.now(timezone.utc), novos_clientes=len(lote))
+        registrar_uso(db, empresa.id, clientes=len(lote))
+        db.commit()
+        importados += len(lote)
+
+    if importados:
+        cache.invalidate_empresa(empresa.id)
+
+    return {
+        "total": len(rows),
+        "importados": importados,
+        "rejeitados": len(erros),
+        "erros": [{"linha": i + 1, "erro": erros[i]} for i in sorted(erros)],
+    }
@@ -0,0 +1,133 @@
+"""
+Jobs de manutenção executados fora do ciclo de requisição
+
+Uso:
+    python -m backend.jobs backfill-valor-centavos [--batch-size 1000] [--sleep 0.1]
+    python -m backend.jobs rebuild-metricas [--empresa-id ID]
+    python -m backend.jobs reconcile-uso [--empresa-id ID]
+    python -m backend.jobs purge-refresh-tokens [--batch-size 1000]
+    python -m backend.jobs index-sessions [--batch-size 500]
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from backend import database, models, plan_limits, rollups, sessions
+from backend.analytics import brl_to_centavos
+
+logger = logging.getLogger("clientflow.jobs")
+
+
+def backfill_valor_centavos(db: Session, batch_size: int = 1000, sleep_seconds: float = 0.1) -> int:
+    """Preenche Atendimento.valor_centavos a partir de valor_cobrado.
+
+    Percorre a tabela por id em lotes de `batch_size`, com commit e pausa de
+    `sleep_seconds` entre lotes para não disputar I/O e locks com o tráfego online.
+    Usa as mesmas regras de `analytics.parse_brl_number`; valores ilegíveis viram 0
+    para que a linha não seja revisitada. Retorna o número de linhas atualizadas.
+    """
+    last_id = 0
+    total = 0
+    while True:
+        rows = (
+            db.query(models.Atendimento.id, models.Atendimento.valor_cobrado)
+            .filter(
+                models.Atendimento.id > last_id,
+                models.Atendimento.valor_centavos.is_(None),
+                models.Atendimento.valor_cobrado.isnot(None),
+            )
+            .order_by(models.Atendimento.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        db.execute(
+            update(models.Atendimento),
+            [{"id": r.id, "valor_centavos": brl_to_centavos(r.valor_cobrado) or 0} for r in rows],
+        )
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1].id
+        logger.info("backfill valor_centavos: %s linhas (ultimo id=%s)", total, last_id)
+        if sleep_seconds > 0:
+            time.sleep(sleep_seconds)
+    return total
+
+
+def purge_refresh_tokens(db: Session, batch_size: int = 1000, sleep_seconds: float = 0.1) -> int:
+    """Apaga de refresh_tokens as linhas já expiradas (ativas ou revogadas).
+
+    Depois do exp um token não pode ser usado nem serve para detectar reuso, então a
+    linha só ocupa espaço e índice. Apaga por id em lotes, com commit entre eles.
+    Retorna o número de linhas removidas.
+    """
+    now = datetime.now(timezone.utc)
+    total = 0
+    while True:
+        ids = [
+            row.id
+            for row in db.query(models.RefreshToken.id)
+            .filter(models.RefreshToken.expires_at < now)
+            .order_by(models.RefreshToken.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            break
+        db.execute(delete(models.RefreshToken).where(models.RefreshToken.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+        logger.info("purge refresh_tokens: %s linhas", total)
+        if sleep_seconds > 0:
+            time.sleep(sleep_seconds)
+    return total
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend.jobs", description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="job", required=True)
+
+    backfill = sub.add_parser("backfill-valor-centavos", help="preenche atendimentos.valor_centavos")
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.add_argument("--sleep", type=float, default=0.1, help="pausa em segundos entre lotes")
+
+    rebuild = sub.add_parser("rebuild-metricas", help="recalcula metricas_diarias a partir dos dados brutos")
+    rebuild.add_argument("--empresa-id", type=int, default=None, help="somente esta empresa (padrão: todas)")
+
+    reconcile = sub.add_parser("reconcile-uso", help="recalcula uso_empresa (contadores dos limites do plano)")
+    reconcile.add_argument("--empresa-id", type=int, default=None, help="somente esta empresa (padrão: todas)")
+
+    purge = sub.add_parser("purge-refresh-tokens", help="apaga refresh tokens expirados")
+    purge.add_argument("--batch-size", type=int, default=1000)
+    purge.add_argument("--sleep", type=float, default=0.1, help="pausa em segundos entre lotes")
+
+    index = sub.add_parser("index-sessions", help="indexa por empresa as sessões Redis criadas antes do índice")
+    index.add_argument("--batch-size", type=int, default=500)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    with database.standalone_session() as db:
+        if args.job == "backfill-valor-centavos":
+            total = backfill_valor_centavos(db, batch_size=args.batch_size, sleep_seconds=args.sleep)
+            logger.info("backfill valor_centavos concluido: %s linhas", total)
+        elif args.job == "rebuild-metricas":
+            total = rollups.rebuild(db, empresa_id=args.empresa_id)
+            logger.info("metricas_diarias recalculadas: %s linhas", total)
+        elif args.job == "reconcile-uso":
+            total = plan_limits.reconciliar_uso(db, empresa_id=args.empresa_id)
+            logger.info("uso_empresa recalculado: %s empresas", total)
+        elif args.job == "purge-refresh-tokens":
+            total = purge_refresh_tokens(db, batch_size=args.batch_size, sleep_seconds=args.sleep)
+            logger.info("refresh tokens expirados removidos: %s", total)
+        elif args.job == "index-sessions":
+            total = sessions.index_legacy_sessions(batch_size=args.batch_size)
+            logger.info("sessões indexadas por empresa: %s", total)
+
+
+if __name__ == "__main__":
+    main()
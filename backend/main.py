@@ -6,7 +6,6 @@
 
 import logging
 import os
-import re
 from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, Request, Depends, Query
@@ -14,40 +13,24 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime, timedelta
 
 # Routers e módulos
-from backend.routers import empresa, clientes, atendimentos, public, dashboard, auth_routes
-from backend import models, database, ai_module
-from backend.dependencies import require_authenticated_empresa, get_tenant_db
+from backend.routers import empresa, clientes, atendimentos, public, dashboard, auth_routes, painel, financeiro
+from backend import models, database, ai_module, cache, empresa_cache, password_pool, rate_limit, replica, db_metrics
+from backend.dependencies import (
+    get_tenant_async_db,
+    get_tenant_db,
+    require_authenticated_empresa,
+    require_authenticated_empresa_async,
+    require_metrics_token,
+)
 from backend import auth
 from backend.schemas import PerguntaIA
-from backend.analytics import get_date_range, build_metric_change, normalize_period
-
-
-def _parse_brl_number(value) -> float:
-    if value is None:
-        return 0.0
-    if isinstance(value, (int, float)):
-        return float(value)
-    raw = str(value).strip()
-    if not raw:
-        return 0.0
-    raw = raw.replace("R$", "").strip()
-    raw = re.sub(r"[^0-9,\.\-]", "", raw)
-    if not raw or raw == "-":
-        return 0.0
-
-    if "," in raw and "." in raw:
-        raw = raw.replace(".", "").replace(",", ".")
-    elif "," in raw:
-        raw = raw.replace(",", ".")
-
-    try:
-        return float(raw)
-    except ValueError:
-        return 0.0
+from backend.analytics import get_date_range, compute_dashboard_analytics, normalize_period
+from backend.pagination import NEXT_CURSOR_HEADER
 
 
 def _period_key(raw: Optional[str]) -> str:
@@ -234,6 +217,7 @@ app.add_middleware(
     allow_credentials=allow_credentials,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Mount static files for logo uploads
@@ -260,7 +244,7 @@ def _run_startup_migrations_if_needed() -> None:
 
     try:
         from sqlalchemy import text
-        from backend.database import engine, SQLALCHEMY_DATABASE_URL
+        from backend.database import SQLALCHEMY_DATABASE_URL, connect
     except Exception as e:
         logger.warning(f"Skipping migrations (database not ready): {e}")
         return
@@ -275,7 +259,7 @@ def _run_startup_migrations_if_needed() -> None:
     # Hold lock on a dedicated connection while running Alembic.
     # Set short timeout to avoid blocking app startup
     
-    with engine.connect() as conn:
+    with connect() as conn:
         try:
             # Try to acquire lock with 5 second timeout
             locked = conn.execute(
@@ -327,6 +311,8 @@ app.include_router(auth_routes.public_router)
 app.include_router(clientes.router)
 app.include_router(atendimentos.router)
 app.include_router(dashboard.router)
+app.include_router(painel.router)
+app.include_router(financeiro.router)
 app.include_router(public.router)
 
 # Serve frontend SPA only when explicitly enabled (frontend is typically deployed on Vercel)
@@ -347,10 +333,16 @@ def readiness():
 @app.middleware("http")
 async def request_logging_middleware(request: Request, call_next):
     started_at = datetime.now()
+    db_stats = db_metrics.start_request()
     try:
         response = await call_next(request)
         duration_ms = int((datetime.now() - started_at).total_seconds() * 1000)
-        logger.info("%s %s -> %s (%sms)", request.method, request.url.path, response.status_code, duration_ms)
+        logger.info(
+            "%s %s -> %s (%sms, db: %s queries %.0fms, pool wait %.0fms)",
+            request.method, request.url.path, response.status_code, duration_ms,
+            db_stats.queries, db_stats.db_ms, db_stats.pool_wait_ms,
+        )
+        db_metrics.warn_if_chatty(request.method, request.url.path, db_stats)
         return response
     except Exception as exc:
         duration_ms = int((datetime.now() - started_at).total_seconds() * 1000)
@@ -367,8 +359,10 @@ async def inject_empresa_id_jwt(request: Request, call_next):
         token = auth_header.split()[1]
         logger.info("Token recebido na requisição: %s... (rota: %s)", token[:20], request.url.path)
         try:
-            from backend.auth import jwt, SECRET_KEY, ALGORITHM
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = auth.verify_access_token(token)
+            # As dependências reaproveitam as claims em vez de verificar o token de novo.
+            request.state.jwt_token = token
+            request.state.jwt_claims = payload
             empresa_id = payload.get("sub")
             if empresa_id:
                 request.state.empresa_id = empresa_id
@@ -387,7 +381,7 @@ def health():
     """Full health check with database validation"""
     try:
         from sqlalchemy import text
-        with database.engine.connect() as conn:
+        with database.connect() as conn:
             conn.execute(text("SELECT 1"))
         return {"status": "ok", "version": "1.0.0", "database": "connected"}
     except Exception as e:
@@ -399,6 +393,19 @@ def api_health():
     """Simple health check for load balancers (no DB check)"""
     return {"status": "ok", "version": "1.0.0"}
 
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """Internal performance counters (no DB check); requires X-Metrics-Token"""
+    return {
+        "cache": cache.stats(),
+        "empresa_cache": empresa_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "rate_limit": rate_limit.stats(),
+        "replica": replica.stats(),
+        "db": db_metrics.stats(database.pools()),
+    }
+
 # Assistente IA Interno
 @app.post("/ia/perguntar")
 def ia_perguntar(
@@ -417,8 +424,7 @@ def ia_perguntar(
                     empresa = db.query(models.Empresa).filter(models.Empresa.id == empresa_id).first()
                     if not empresa:
                         return JSONResponse(status_code=401, content={"error": "Empresa não encontrada"})
-            from sqlalchemy import text
-            tenant_db.execute(text(f"SET search_path TO empresa_{empresa.id}, public"))
+            database.set_search_path(tenant_db, f"empresa_{empresa.id}")
         clients = tenant_db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa.id).all()
         atendimentos = tenant_db.query(models.Atendimento).filter(models.Atendimento.empresa_id == empresa.id).all()
         contexto = f"Clients: {[c.nome for c in clients]}\nAtendimentos: {len(atendimentos)}"
@@ -429,10 +435,10 @@ def ia_perguntar(
 
 
 @app.get("/api/dashboard/analytics")
-def obter_dashboard_analytics(
+async def obter_dashboard_analytics(
     period: str = Query("7d"),
-    empresa: models.Empresa = Depends(require_authenticated_empresa),
-    tenant_db: Session = Depends(get_tenant_db),
+    empresa: models.Empresa = Depends(require_authenticated_empresa_async),
+    tenant_db: AsyncSession = Depends(get_tenant_async_db),
 ):
     """Professional analytics endpoint for the premium dashboard.
 
@@ -441,134 +447,20 @@ def obter_dashboard_analytics(
     - Never trusts empresa_id from the frontend
 
     Performance:
-    - Uses aggregated SQL queries (no N+1)
-    - Groups series by day
+    - Reads the daily rollup (metricas_diarias): one query, ~2 rows per day of the window
+    - Previous period is the same number of whole days right before the current one
     """
     logger.info("Dashboard Analytics requisitado para empresa ID=%s (%s), period=%s", 
                 empresa.id, empresa.nome_empresa, period)
     
-    from sqlalchemy import func, case, cast
-    from sqlalchemy.types import Numeric
-
     period_key = normalize_period(period)
-    dr = get_date_range(period_key)
-
-    dialect = tenant_db.bind.dialect.name if tenant_db.bind is not None else ""
-
-    def revenue_expr(col):
-        # Atendimento.valor_cobrado is a string; normalize to numeric at SQL-level.
-        # Handles common formats:
-        # - "1234.56" (decimal '.')
-        # - "1.234,56" (thousands '.', decimal ',')
-        # - "1234,56" (decimal ',')
-        cleaned = func.regexp_replace(col, r"[^0-9,\.\-]", "", "g") if dialect == "postgresql" else col
-        if dialect == "postgresql":
-            has_comma = func.strpos(cleaned, ",") > 0
-            normalized = case(
-                (has_comma, func.replace(func.replace(cleaned, ".", ""), ",", ".")),
-                else_=cleaned,
-            )
-            return cast(normalized, Numeric)
-
-        # Fallback for non-Postgres dialects: try a simple replace and cast.
-        normalized = func.replace(cleaned, ",", ".")
-        return cast(normalized, Numeric)
-
-    revenue_col = revenue_expr(models.Atendimento.valor_cobrado)
-
-    # Appointments + revenue (current)
-    appt_current_count, appt_current_revenue = tenant_db.query(
-        func.count(models.Atendimento.id),
-        func.coalesce(func.sum(revenue_col), 0),
-    ).filter(
-        models.Atendimento.empresa_id == empresa.id,
-        models.Atendimento.data_atendimento >= dr.start_date,
-        models.Atendimento.data_atendimento < dr.end_date,
-    ).one()
-
-    # Appointments + revenue (previous)
-    appt_prev_count, appt_prev_revenue = tenant_db.query(
-        func.count(models.Atendimento.id),
-        func.coalesce(func.sum(revenue_col), 0),
-    ).filter(
-        models.Atendimento.empresa_id == empresa.id,
-        models.Atendimento.data_atendimento >= dr.start_date_previous,
-        models.Atendimento.data_atendimento < dr.end_date_previous,
-    ).one()
-
-    # New clients (current/previous)
-    clients_current = tenant_db.query(func.count(models.Cliente.id)).filter(
-        models.Cliente.empresa_id == empresa.id,
-        models.Cliente.data_primeiro_contato >= dr.start_date,
-        models.Cliente.data_primeiro_contato < dr.end_date,
-    ).scalar() or 0
-
-    clients_previous = tenant_db.query(func.count(models.Cliente.id)).filter(
-        models.Cliente.empresa_id == empresa.id,
-        models.Cliente.data_primeiro_contato >= dr.start_date_previous,
-        models.Cliente.data_primeiro_contato < dr.end_date_previous,
-    ).scalar() or 0
-
-    # Revenue series by day
-    appt_date = func.date(models.Atendimento.data_atendimento)
-    revenue_series_rows = (
-        tenant_db.query(
-            appt_date.label("date"),
-            func.coalesce(func.sum(revenue_col), 0).label("value"),
-        )
-        .filter(
-            models.Atendimento.empresa_id == empresa.id,
-            models.Atendimento.data_atendimento >= dr.start_date,
-            models.Atendimento.data_atendimento < dr.end_date,
-        )
-        .group_by(appt_date)
-        .order_by(appt_date)
-        .all()
+    return await cache.get_or_compute_async(
+        empresa.id,
+        "analytics",
+        period_key,
+        lambda: tenant_db.run_sync(compute_dashboard_analytics, empresa.id, get_date_range(period_key)),
     )
 
-    revenue_series = [
-        {
-            "date": (r.date.isoformat() if hasattr(r.date, "isoformat") else str(r.date)),
-            "value": float(r.value or 0),
-        }
-        for r in revenue_series_rows
-    ]
-
-    # New clients series by day
-    client_date = func.date(models.Cliente.data_primeiro_contato)
-    clients_series_rows = (
-        tenant_db.query(
-            client_date.label("date"),
-            func.count(models.Cliente.id).label("value"),
-        )
-        .filter(
-            models.Cliente.empresa_id == empresa.id,
-            models.Cliente.data_primeiro_contato >= dr.start_date,
-            models.Cliente.data_primeiro_contato < dr.end_date,
-        )
-        .group_by(client_date)
-        .order_by(client_date)
-        .all()
-    )
-
-    clients_series = [
-        {
-            "date": (r.date.isoformat() if hasattr(r.date, "isoformat") else str(r.date)),
-            "value": int(r.value or 0),
-        }
-        for r in clients_series_rows
-    ]
-
-    return {
-        "metrics": {
-            "revenue": build_metric_change(float(appt_current_revenue or 0), float(appt_prev_revenue or 0)),
-            "clients": build_metric_change(float(clients_current), float(clients_previous)),
-            "appointments": build_metric_change(float(appt_current_count), float(appt_prev_count)),
-        },
-        "revenue_series": revenue_series,
-        "clients_series": clients_series,
-    }
-
 # Rota raiz
 @app.get("/")
 def root():
@@ -590,7 +482,7 @@ def status():
     service_env = os.getenv("ENVIRONMENT", "development")
     try:
         from sqlalchemy import text
-        with database.engine.connect() as conn:
+        with database.connect() as conn:
             conn.execute(text("SELECT 1"))
         return {
             "status": "ready",
@@ -2,10 +2,11 @@
 """
 Modelos do banco de dados representando empresas, clientes e atendimentos
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship, declared_attr
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import relationship, declared_attr, validates
 from datetime import datetime, timezone
 from backend.database import Base
+from backend.telefone import TELEFONE_UNICO, normalizar_telefone
 
 # Constantes de configuração de relacionamentos
 CASCADE_DELETE_ORPHAN = "all, delete-orphan"
@@ -63,6 +64,8 @@ class RefreshToken(BaseModel):
     expires_at = Column(DateTime, nullable=True, index=True)
     revoked = Column(Integer, default=0)
     replaced_by = Column(String(64), nullable=True, index=True)
+    # Cadeia de rotação: todos os tokens derivados do mesmo login compartilham o family_id
+    family_id = Column(String(64), nullable=True, index=True)
     user_agent = Column(String, nullable=True)
     ip_address = Column(String, nullable=True)
     empresa = relationship("Empresa", backref="refresh_tokens")
@@ -88,9 +91,23 @@ class Cliente(BaseModel):
     inativo = Column(Integer, default=0)
     importante = Column(Integer, default=0)
     anotacoes_rapidas = Column(Text, default="")
+    # Dígitos com código do país (backend.telefone); chave de deduplicação por empresa
+    telefone_normalizado = Column(String(20), nullable=True)
     empresa = relationship("Empresa", back_populates="clientes")
     atendimentos = relationship("Atendimento", back_populates="cliente", cascade=CASCADE_DELETE_ORPHAN)
 
+    @validates("telefone")
+    def _normalizar_telefone(self, key, value):
+        self.telefone_normalizado = normalizar_telefone(value)
+        return value
+
+
+# Um telefone por empresa; NULL (sem telefone ou duplicata legada) não conflita
+Index(TELEFONE_UNICO, Cliente.empresa_id, Cliente.telefone_normalizado, unique=True)
+
+# Keyset pagination of GET /api/clientes: (empresa_id, data_primeiro_contato, id)
+Index("ix_clientes_empresa_contato_id", Cliente.empresa_id, Cliente.data_primeiro_contato, Cliente.id)
+
 
 class Atendimento(BaseModel):
     __tablename__ = "atendimentos"
@@ -101,6 +118,7 @@ class Atendimento(BaseModel):
     status_atendimento = Column(String, default="Novo")
     descricao_servico = Column(Text)
     valor_cobrado = Column(String)
+    valor_centavos = Column(Integer, nullable=True)
     forma_pagamento = Column(String)
     funcionario_responsavel = Column(String)
     duracao_servico = Column(String)
@@ -112,3 +130,33 @@ class Atendimento(BaseModel):
     data_atendimento = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     empresa = relationship("Empresa", back_populates="atendimentos")
     cliente = relationship("Cliente", back_populates="atendimentos")
+
+
+# Filtered/keyset listing of GET /api/atendimentos
+Index("ix_atendimentos_empresa_data_id", Atendimento.empresa_id, Atendimento.data_atendimento, Atendimento.id)
+Index(
+    "ix_atendimentos_empresa_status_data_id",
+    Atendimento.empresa_id, Atendimento.status_atendimento, Atendimento.data_atendimento, Atendimento.id,
+)
+Index(
+    "ix_atendimentos_empresa_cliente_data_id",
+    Atendimento.empresa_id, Atendimento.cliente_id, Atendimento.data_atendimento, Atendimento.id,
+)
+
+
+class MetricaDiaria(BaseModel):
+    """Rollup diário por empresa, mantido na mesma transação das escritas (ver backend/rollups.py)."""
+    __tablename__ = "metricas_diarias"
+    empresa_id = Column(Integer, ForeignKey(EMPRESA_FK), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    atendimentos = Column(Integer, nullable=False, default=0)
+    receita_centavos = Column(Integer, nullable=False, default=0)
+    novos_clientes = Column(Integer, nullable=False, default=0)
+
+
+class UsoEmpresa(BaseModel):
+    """Contadores de uso por empresa para os limites do plano (ver backend/plan_limits.py)."""
+    __tablename__ = "uso_empresa"
+    empresa_id = Column(Integer, ForeignKey(EMPRESA_FK), primary_key=True)
+    clientes = Column(Integer, nullable=False, default=0)
+    atendimentos = Column(Integer, nullable=False, default=0)
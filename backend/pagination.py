@@ -0,0 +1,91 @@
+"""
+Paginação por cursor (keyset) para listagens ordenadas por (data, id) decrescente
+
+A data pode ser NULL (linhas antigas). Essas linhas vêm primeiro, como no DESC padrão
+do Postgres, que é também a ordem da leitura reversa do índice (empresa_id, data, id):
+o cursor guarda a data NULL e a página seguinte continua pelas NULL restantes e
+depois pelas datadas.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Teto da listagem "completa" (sem limit/cursor): acima disso a resposta é cortada e o
+# cursor da continuação vai no header NEXT_CURSOR_HEADER.
+UNPAGED_LIST_MAX_ITEMS = int(os.getenv("UNPAGED_LIST_MAX_ITEMS", "1000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+logger = logging.getLogger("clientflow.pagination")
+
+
+def encode_cursor(data: Optional[datetime], item_id: int) -> str:
+    """Gera um cursor opaco a partir da chave de ordenação (data, id)."""
+    payload = json.dumps([data.isoformat() if data else None, int(item_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decodifica um cursor gerado por `encode_cursor`.
+
+    Raises:
+        HTTPException(400) quando o cursor é inválido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_data, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(raw_data) if raw_data is not None else None), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def apply_keyset(query, date_col, id_col, cursor: Optional[str], limit: int):
+    """Ordena por (date_col, id_col) decrescente e posiciona a consulta após o cursor.
+
+    Busca `limit + 1` linhas para saber se existe próxima página sem um COUNT extra.
+    A comparação por tupla usa o índice composto (empresa_id, data, id), então o custo
+    de cada página não depende da profundidade.
+    """
+    if cursor:
+        cursor_data, cursor_id = decode_cursor(cursor)
+        if cursor_data is None:
+            # Ainda nas linhas sem data: as NULL restantes e depois todas as datadas.
+            query = query.filter(or_(and_(date_col.is_(None), id_col < cursor_id), date_col.isnot(None)))
+        else:
+            # NULL na tupla nunca satisfaz o <, e elas já passaram.
+            query = query.filter(tuple_(date_col, id_col) < tuple_(cursor_data, cursor_id))
+    return query.order_by(date_col.desc().nulls_first(), id_col.desc()).limit(limit + 1)
+
+
+def build_page(rows: List[Any], limit: int, key: Callable[[Any], Tuple[Optional[datetime], int]]):
+    """Corta a linha extra buscada por `apply_keyset` e calcula o próximo cursor."""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor(*key(items[-1]))
+    return items, next_cursor
+
+
+def unpaged_list(query, date_col, id_col, key, response=None) -> List[Any]:
+    """Listagem sem limit/cursor, limitada a UNPAGED_LIST_MAX_ITEMS linhas.
+
+    Mantém o formato de lista das rotas antigas sem hidratar a tabela inteira de uma
+    empresa grande. Se houver mais linhas, o cursor da continuação vai no header
+    NEXT_CURSOR_HEADER de `response` (use `?cursor=` para seguir paginando).
+    """
+    rows = apply_keyset(query, date_col, id_col, None, UNPAGED_LIST_MAX_ITEMS).all()
+    items, next_cursor = build_page(rows, UNPAGED_LIST_MAX_ITEMS, key)
+    if next_cursor is not None:
+        logger.warning("Listagem sem paginação cortada em %s itens", UNPAGED_LIST_MAX_ITEMS)
+        if response is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
@@ -0,0 +1,135 @@
+"""
+Executor dedicado e limitado para bcrypt (hash e verificação de senha)
+
+bcrypt é CPU puro e leva dezenas de milissegundos por chamada. Executado direto nas
+rotas sync, ocupa o threadpool do AnyIO compartilhado com todas as outras rotas e uma
+rajada de logins atrasa dashboard e listagens. Aqui o trabalho roda em um pool próprio
+de PASSWORD_HASH_WORKERS threads e as rotas (async) aguardam o resultado no event loop,
+sem prender thread do AnyIO durante a fila e o hash. No máximo PASSWORD_HASH_QUEUE
+chamadas esperam na fila, e o excedente (ou quem espera mais que
+PASSWORD_HASH_MAX_WAIT_SECONDS) recebe 503 com Retry-After na hora.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException, status
+
+from backend import auth
+
+logger = logging.getLogger("clientflow.password_pool")
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "8"))
+PASSWORD_HASH_MAX_WAIT = float(os.getenv("PASSWORD_HASH_MAX_WAIT_SECONDS", "2.0"))
+RETRY_AFTER_SECONDS = 1
+
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+_lock = threading.Lock()
+_stats = {
+    "completed": 0,
+    "rejected": 0,
+    "timeouts": 0,
+    "in_flight": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "run_ms_total": 0.0,
+}
+
+
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado. Tente novamente em instantes.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+async def run(fn: Callable[..., T], *args) -> T:
+    """Executa `fn(*args)` no pool de bcrypt e devolve o resultado, sem bloquear o loop.
+
+    Levanta HTTPException(503) quando a fila está cheia ou a espera passa do limite.
+    """
+    if not _slots.acquire(blocking=False):
+        with _lock:
+            _stats["rejected"] += 1
+        logger.warning("Fila de bcrypt cheia; requisição rejeitada")
+        raise _overloaded()
+
+    enqueued = time.perf_counter()
+    started = {}
+
+    def task():
+        started["at"] = time.perf_counter()
+        return fn(*args)
+
+    def done(_future):
+        # A vaga só volta quando o job sai do executor (terminou ou foi cancelado na
+        # fila), não quando quem aguardava desiste: senão a fila real passaria do limite.
+        finished = time.perf_counter()
+        with _lock:
+            _stats["in_flight"] -= 1
+            if "at" in started:
+                wait_ms = (started["at"] - enqueued) * 1000
+                _stats["completed"] += 1
+                _stats["wait_ms_total"] += wait_ms
+                _stats["wait_ms_max"] = max(_stats["wait_ms_max"], wait_ms)
+                _stats["run_ms_total"] += (finished - started["at"]) * 1000
+        _slots.release()
+
+    with _lock:
+        _stats["in_flight"] += 1
+    try:
+        future = _executor.submit(task)
+    except BaseException:
+        done(None)
+        raise
+    future.add_done_callback(done)
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), PASSWORD_HASH_MAX_WAIT)
+    except asyncio.TimeoutError:
+        if future.cancel():
+            with _lock:
+                _stats["timeouts"] += 1
+            raise _overloaded()
+        # Já começou: bcrypt termina em milissegundos, então aguardamos.
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        # Cliente desconectou: ainda na fila, o job sai dela; já rodando, termina e libera.
+        future.cancel()
+        raise
+
+
+async def hash_password(password: str) -> str:
+    return await run(auth.get_password_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run(auth.verify_password, plain_password, hashed_password)
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+    completed = snapshot.pop("completed")
+    wait_total = snapshot.pop("wait_ms_total")
+    run_total = snapshot.pop("run_ms_total")
+    snapshot.update(
+        completed=completed,
+        workers=PASSWORD_HASH_WORKERS,
+        queue_limit=PASSWORD_HASH_QUEUE,
+        wait_ms_avg=round(wait_total / completed, 2) if completed else 0.0,
+        wait_ms_max=round(snapshot["wait_ms_max"], 2),
+        run_ms_avg=round(run_total / completed, 2) if completed else 0.0,
+    )
+    return snapshot
@@ -1,15 +1,112 @@
+"""
+Limites do plano e contadores de uso por empresa (tabela uso_empresa)
+
+A linha da empresa é criada junto com o cadastro (`inicializar_uso`); as existentes
+vieram da migração 007. As escritas de clientes e atendimentos chamam `registrar_uso`
+antes do commit, então o contador anda na mesma transação que o dado bruto e a
+checagem do limite é a leitura de uma linha, em vez de um COUNT(*) que cresce com a
+empresa. Não há rotas de remoção; uma que venha a existir deve registrar o delta
+negativo. Contadores divergentes (ou uma linha faltando) são recalculados a partir
+das tabelas brutas por `reconciliar_uso` (`python -m backend.jobs reconcile-uso`).
+"""
 from __future__ import annotations
 
-from typing import Optional
+import logging
+from typing import Dict, Optional
 
 from fastapi import HTTPException, status
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from backend import database, models
 
+logger = logging.getLogger("clientflow.plan_limits")
 
 FREE_LIMIT_MESSAGE = "Você atingiu o limite do plano FREE."
 
+RECURSOS = {
+    "clientes": models.Cliente,
+    "atendimentos": models.Atendimento,
+}
+
+_INSERT_IGNORE_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _contagens(empresa_id):
+    """Selects escalares com o total atual de cada recurso (empresa_id: valor ou coluna)."""
+    return {
+        nome: select(func.count()).select_from(model).where(model.empresa_id == empresa_id).scalar_subquery()
+        for nome, model in RECURSOS.items()
+    }
+
+
+def inicializar_uso(db: Session, empresa_id: int) -> bool:
+    """Cria a linha de uso a partir das tabelas brutas (no cadastro: zeros). False se
+    ela já existia. Não faz commit."""
+    tabela = models.UsoEmpresa.__table__
+    dialect_insert = _INSERT_IGNORE_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        db.execute(insert(tabela).values(empresa_id=empresa_id, **_contagens(empresa_id)))
+        return True
+    stmt = dialect_insert(tabela).values(empresa_id=empresa_id, **_contagens(empresa_id))
+    return bool(db.execute(stmt.on_conflict_do_nothing(index_elements=[tabela.c.empresa_id])).rowcount)
+
+
+def registrar_uso(db: Session, empresa_id: int, clientes: int = 0, atendimentos: int = 0) -> None:
+    """Soma deltas aos contadores da empresa (após o flush da escrita, antes do commit).
+
+    Sem linha ainda, ela é criada com as contagens atuais, que já incluem a escrita.
+    """
+    tabela = models.UsoEmpresa.__table__
+    atualizar = (
+        tabela.update()
+        .where(tabela.c.empresa_id == empresa_id)
+        .values(clientes=tabela.c.clientes + clientes, atendimentos=tabela.c.atendimentos + atendimentos)
+    )
+    if db.execute(atualizar).rowcount:
+        return
+    if not inicializar_uso(db, empresa_id):
+        # Outra transação criou a linha entre o UPDATE e o INSERT.
+        db.execute(atualizar)
+
+
+def obter_uso(db: Session, empresa_id: int) -> Dict[str, int]:
+    """Contadores de uso da empresa ({"clientes": n, "atendimentos": n}). Só lê: sem a
+    linha, conta nas tabelas brutas (e avisa para rodar reconcile-uso)."""
+    tabela = models.UsoEmpresa.__table__
+    linha = db.execute(
+        select(tabela.c.clientes, tabela.c.atendimentos).where(tabela.c.empresa_id == empresa_id)
+    ).first()
+    if linha is None:
+        logger.warning("uso_empresa sem linha para a empresa %s; rode reconcile-uso", empresa_id)
+        linha = db.execute(select(*(c.label(nome) for nome, c in _contagens(empresa_id).items()))).one()
+    return {"clientes": linha.clientes, "atendimentos": linha.atendimentos}
+
+
+def reconciliar_uso(db: Session, empresa_id: Optional[int] = None) -> int:
+    """Recalcula uso_empresa a partir de clientes/atendimentos numa transação.
+
+    Retorna o número de empresas gravadas.
+    """
+    tabela = models.UsoEmpresa.__table__
+    e = models.Empresa
+    contagens = _contagens(e.id)
+    origem = select(e.id, contagens["clientes"], contagens["atendimentos"])
+    apagar = tabela.delete()
+    if empresa_id is not None:
+        origem = origem.where(e.id == empresa_id)
+        apagar = apagar.where(tabela.c.empresa_id == empresa_id)
+    db.execute(apagar)
+    gravadas = db.execute(
+        insert(tabela).from_select(["empresa_id", "clientes", "atendimentos"], origem)
+    ).rowcount
+    db.commit()
+    return gravadas
+
 
 def check_plan_limits(
     empresa: models.Empresa,
@@ -23,6 +120,7 @@ def check_plan_limits(
 
     Notes:
         - Always filters by empresa_id.
+        - Reads the maintained uso_empresa row, not a COUNT(*) of the tenant's rows.
         - Never trusts the frontend for limit values.
         - PRO is treated as unlimited.
     """
@@ -30,36 +128,55 @@ def check_plan_limits(
     if not empresa:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Não autenticado")
 
+    limit = _limite(empresa, resource_type)
+    if limit is None:
+        return
+
+    close_db = False
+    if db is None:
+        db = database.SessionLocal()
+        close_db = True
+
+    try:
+        total = obter_uso(db, empresa.id)[resource_type]
+        if total >= limit:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=limit_message(empresa))
+    finally:
+        if close_db:
+            db.close()
+
+
+def _limite(empresa: models.Empresa, resource_type: str) -> Optional[int]:
+    """Limite do plano para o recurso; None = ilimitado."""
     plano = (empresa.plano_empresa or "free").strip().lower()
 
     # PRO is unlimited by definition.
     if plano == "pro":
-        return
+        return None
 
     if resource_type == "clientes":
         limit = empresa.limite_clientes
-        model = models.Cliente
     elif resource_type == "atendimentos":
         limit = empresa.limite_atendimentos
-        model = models.Atendimento
     else:
         raise HTTPException(status_code=400, detail="resource_type inválido")
 
     # Treat unset/invalid limits as unlimited.
     if limit is None or int(limit) <= 0:
-        return
+        return None
+    return int(limit)
 
-    close_db = False
-    if db is None:
-        db = database.SessionLocal()
-        close_db = True
 
-    try:
-        total = db.query(model).filter(model.empresa_id == empresa.id).count()
-        if total >= int(limit):
-            if plano == "free":
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=FREE_LIMIT_MESSAGE)
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Você atingiu o limite do seu plano.")
-    finally:
-        if close_db:
-            db.close()
+def limit_message(empresa: models.Empresa) -> str:
+    if (empresa.plano_empresa or "free").strip().lower() == "free":
+        return FREE_LIMIT_MESSAGE
+    return "Você atingiu o limite do seu plano."
+
+
+def vagas_restantes(empresa: models.Empresa, resource_type: str, db: Session) -> Optional[int]:
+    """Quantos itens ainda cabem no plano (None = ilimitado). Para escritas em lote,
+    que checam o limite uma vez por lote em vez de uma vez por linha."""
+    limit = _limite(empresa, resource_type)
+    if limit is None:
+        return None
+    return max(limit - obter_uso(db, empresa.id)[resource_type], 0)
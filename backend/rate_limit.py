@@ -0,0 +1,212 @@
+"""
+Rate limit por janela deslizante (Redis + fallback em memória)
+
+Uma política por rota sensível (login, cadastro, refresh). No Redis cada chave é um
+ZSET com os instantes das tentativas dentro da janela; um script Lua limpa, conta e
+registra de forma atômica, então o limite vale para todos os workers e réplicas.
+Sem Redis, cada processo usa um dicionário LRU limitado (RATE_LIMIT_LOCAL_MAX_KEYS),
+que não cresce com a quantidade de pares ip:email distintos.
+
+Política configurável por env: RATE_LIMIT_<NOME>="<limite>/<janela em segundos>",
+por exemplo RATE_LIMIT_LOGIN=5/60.
+
+Atrás de proxy (Railway), o IP da conexão é o do proxy: com TRUSTED_PROXIES (IPs ou
+CIDRs separados por vírgula) o IP do cliente sai do X-Forwarded-For, ignorando os
+saltos que são proxies confiáveis. Sem a variável, o header é ignorado (não dá para
+confiar nele vindo direto do cliente).
+"""
+from __future__ import annotations
+
+import hashlib
+import ipaddress
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Tuple
+
+import redis
+from fastapi import HTTPException, Request, status
+
+from backend.redis_client import get_redis_or_none, mark_redis_down
+
+logger = logging.getLogger("clientflow.rate_limit")
+
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))
+
+
+def _networks(raw: str) -> tuple:
+    networks = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning("TRUSTED_PROXIES: entrada inválida %r ignorada", item)
+    return tuple(networks)
+
+
+TRUSTED_PROXIES = _networks(os.getenv("TRUSTED_PROXIES", ""))
+
+
+@dataclass(frozen=True)
+class Policy:
+    name: str
+    limit: int
+    window_seconds: int
+    detail: str = "Muitas requisições. Tente novamente em instantes."
+
+
+def _policy(name: str, default: str, detail: str) -> Policy:
+    raw = os.getenv(f"RATE_LIMIT_{name.upper()}", default)
+    try:
+        limit, window = (int(v) for v in raw.split("/", 1))
+    except ValueError:
+        logger.warning("RATE_LIMIT_%s inválido (%r); usando %s", name.upper(), raw, default)
+        limit, window = (int(v) for v in default.split("/", 1))
+    return Policy(name=name, limit=limit, window_seconds=window, detail=detail)
+
+
+POLICIES = {
+    p.name: p
+    for p in (
+        _policy("login", "5/60", "Muitas tentativas de login. Tente novamente em instantes."),
+        _policy("register", "10/3600", "Muitos cadastros a partir deste endereço. Tente novamente mais tarde."),
+        _policy("refresh", "30/60", "Muitas renovações de sessão. Tente novamente em instantes."),
+    )
+}
+
+# KEYS[1] = chave; ARGV = agora (ms), janela (ms), limite, membro único.
+# Devolve {1, 0} quando permitido ou {0, ms até liberar} quando bloqueado.
+_SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) >= limit then
+  local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+  return {0, tonumber(oldest[2]) + window - now}
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return {1, 0}
+"""
+
+_lock = threading.Lock()
+_local: "OrderedDict[str, deque]" = OrderedDict()
+_script = None
+_stats = {"allowed": 0, "limited": 0, "redis_errors": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _key(policy: Policy, identity: str) -> str:
+    # Hash para não guardar e-mails/IPs em claro e manter o tamanho da chave fixo.
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:32]
+    return f"ratelimit:{policy.name}:{digest}"
+
+
+def _hit_redis(r, key: str, policy: Policy, now: float) -> Tuple[bool, float]:
+    global _script
+    if _script is None:
+        _script = r.register_script(_SLIDING_WINDOW_LUA)
+    allowed, retry_ms = _script(
+        keys=[key],
+        args=[int(now * 1000), policy.window_seconds * 1000, policy.limit, uuid.uuid4().hex],
+    )
+    return bool(allowed), int(retry_ms) / 1000
+
+
+def _hit_local(key: str, policy: Policy, now: float) -> Tuple[bool, float]:
+    with _lock:
+        attempts = _local.get(key)
+        if attempts is None:
+            attempts = _local[key] = deque()
+        _local.move_to_end(key)
+        while attempts and now - attempts[0] >= policy.window_seconds:
+            attempts.popleft()
+        if len(attempts) >= policy.limit:
+            return False, attempts[0] + policy.window_seconds - now
+        attempts.append(now)
+        while len(_local) > RATE_LIMIT_LOCAL_MAX_KEYS:
+            _local.popitem(last=False)
+        return True, 0.0
+
+
+def hit(policy_name: str, identity: str) -> Tuple[bool, float]:
+    """Registra uma tentativa. Devolve (permitido, segundos até liberar)."""
+    policy = POLICIES[policy_name]
+    key = _key(policy, identity)
+    now = time.time()
+    result = None
+    r = get_redis_or_none()
+    if r is not None:
+        try:
+            result = _hit_redis(r, key, policy, now)
+        except redis.RedisError as exc:
+            _count("redis_errors")
+            mark_redis_down(exc)
+    if result is None:
+        result = _hit_local(key, policy, now)
+    _count("allowed" if result[0] else "limited")
+    return result
+
+
+def _trusted(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """IP do cliente: o da conexão ou, vindo de um proxy confiável, o primeiro salto não
+    confiável do X-Forwarded-For (lido da direita para a esquerda)."""
+    peer = request.client.host if request.client else "unknown"
+    if not TRUSTED_PROXIES or not _trusted(peer):
+        return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def enforce(request: Request, policy_name: str, *parts: str) -> None:
+    """Levanta HTTPException(429) com Retry-After se o cliente passou do limite.
+
+    A identidade é o IP do cliente mais `parts` (ex.: e-mail normalizado).
+    """
+    identity = ":".join([client_ip(request), *(p.lower().strip() for p in parts)])
+    allowed, retry_after = hit(policy_name, identity)
+    if allowed:
+        return
+    logger.warning("Rate limit %s atingido para %s", policy_name, client_ip(request))
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=POLICIES[policy_name].detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["local_keys"] = len(_local)
+    return snapshot
+
+
+def clear_local() -> None:
+    with _lock:
+        _local.clear()
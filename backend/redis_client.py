@@ -1,8 +1,19 @@
+import logging
 import os
+import time
 from typing import Optional
 import redis
 
+logger = logging.getLogger("clientflow.redis")
+
 _redis_client: Optional[redis.Redis] = None
+_down_until = 0.0
+
+# Short socket timeouts so a Redis outage degrades to the in-process fallbacks
+# instead of holding request threads.
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0"))
+# After a failure, callers that have a fallback skip Redis for this many seconds.
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", "30"))
 
 
 def get_redis() -> redis.Redis:
@@ -10,5 +21,27 @@ def get_redis() -> redis.Redis:
     if _redis_client is not None:
         return _redis_client
     url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    _redis_client = redis.from_url(url, decode_responses=True)
+    _redis_client = redis.from_url(
+        url,
+        decode_responses=True,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    )
     return _redis_client
+
+
+def get_redis_or_none() -> Optional[redis.Redis]:
+    """Return the client, or None while Redis is in the backoff window after a failure.
+
+    For callers with an in-process fallback (caches, limiters).
+    """
+    if time.monotonic() < _down_until:
+        return None
+    return get_redis()
+
+
+def mark_redis_down(exc: Optional[Exception] = None) -> None:
+    global _down_until
+    if time.monotonic() >= _down_until:
+        logger.warning("Redis indisponivel (%s); usando fallback local por %ss", exc, REDIS_RETRY_SECONDS)
+    _down_until = time.monotonic() + REDIS_RETRY_SECONDS
@@ -0,0 +1,262 @@
+"""
+Armazenamento de refresh tokens no Redis (REFRESH_TOKEN_STORE=redis)
+
+Com o padrão (REFRESH_TOKEN_STORE=sql) os tokens ficam na tabela refresh_tokens e
+`backend.auth` usa o SQL diretamente. Com "redis", as funções de refresh token de
+`backend.auth` delegam para `RedisRefreshTokenStore` e o caminho de refresh não toca
+o Postgres:
+
+- refresh:{jti}             HASH (empresa_id, token_hash, family_id, revoked,
+                            replaced_by, created_at, expires_at), expira com o token;
+- refresh:empresa:{id}      SET de jtis da empresa (revogação em massa);
+- refresh:family:{family}   SET de jtis da cadeia de rotação (detecção de reuso).
+
+Tokens rotacionados continuam no Redis (revoked=1) até o exp original, para que o
+reuso seja detectado; depois somem pelo TTL. Membros de SET já expirados são
+removidos na próxima revogação.
+
+Com REFRESH_TOKEN_AUDIT_SQL=1 as criações/rotações/revogações também são gravadas na
+tabela refresh_tokens por uma thread em segundo plano (write-behind, só auditoria:
+nunca é lida no caminho de refresh).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+import redis
+from fastapi import HTTPException, status
+from sqlalchemy import update
+
+from backend import models
+from backend.redis_client import get_redis
+
+logger = logging.getLogger("clientflow.refresh_store")
+
+REFRESH_TOKEN_STORE = os.getenv("REFRESH_TOKEN_STORE", "sql").lower().strip()
+REFRESH_TOKEN_AUDIT_SQL = os.getenv("REFRESH_TOKEN_AUDIT_SQL", "0").lower() in ("1", "true", "yes", "on")
+AUDIT_QUEUE_SIZE = int(os.getenv("REFRESH_TOKEN_AUDIT_QUEUE", "10000"))
+
+_PREFIX = "refresh:"
+
+# KEYS[1] = token antigo, KEYS[2] = token novo; ARGV = hash esperado ('' = não conferir),
+# agora, novo jti, novo hash, ttl, prefixo. Os SETs de empresa/família são montados no
+# script a partir do hash antigo (Redis standalone; não compatível com Redis Cluster).
+# Devolve {1, empresa_id, family_id} na rotação, {-1, empresa_id, family_id} no reuso
+# de um token já rotacionado e {0} nos demais casos.
+_ROTATE_LUA = """
+local data = redis.call('HMGET', KEYS[1], 'empresa_id', 'token_hash', 'family_id', 'revoked', 'expires_at', 'replaced_by')
+if not data[1] then return {0} end
+if ARGV[1] ~= '' and data[2] ~= ARGV[1] then return {0} end
+if data[4] ~= '0' then
+  if ARGV[1] ~= '' and data[6] and data[6] ~= '' then return {-1, data[1], data[3]} end
+  return {0}
+end
+local now = tonumber(ARGV[2])
+if tonumber(data[5]) <= now then return {0} end
+local ttl = tonumber(ARGV[5])
+local prefix = ARGV[6]
+redis.call('HSET', KEYS[1], 'revoked', '1', 'replaced_by', ARGV[3])
+redis.call('HSET', KEYS[2], 'empresa_id', data[1], 'token_hash', ARGV[4], 'family_id', data[3],
+  'revoked', '0', 'replaced_by', '', 'created_at', now, 'expires_at', now + ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+for _, index in ipairs({prefix .. 'empresa:' .. data[1], prefix .. 'family:' .. data[3]}) do
+  redis.call('SADD', index, ARGV[3])
+  redis.call('EXPIRE', index, ttl)
+end
+return {1, data[1], data[3]}
+"""
+
+# KEYS[1] = set de jtis; ARGV[1] = prefixo. Marca como revogados os tokens ainda
+# ativos do set, remove do set os que já expiraram e devolve quantos foram revogados.
+_REVOKE_SET_LUA = """
+local revoked = {}
+for _, jti in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+  local key = ARGV[1] .. jti
+  local state = redis.call('HGET', key, 'revoked')
+  if not state then
+    redis.call('SREM', KEYS[1], jti)
+  elseif state == '0' then
+    redis.call('HSET', key, 'revoked', '1')
+    table.insert(revoked, jti)
+  end
+end
+return revoked
+"""
+
+
+def _unavailable(exc: Exception) -> HTTPException:
+    logger.error("Redis indisponível para refresh tokens: %s", exc)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Serviço de sessão indisponível. Tente novamente em instantes.",
+    )
+
+
+class _AuditWriter:
+    """Fila limitada + thread que replica eventos de refresh token na tabela SQL."""
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, *event) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="refresh-audit", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        from backend.database import standalone_session
+
+        while True:
+            event = self._queue.get()
+            try:
+                with standalone_session() as db:
+                    self._apply(db, *event)
+                    db.commit()
+            except Exception:
+                logger.exception("Falha ao gravar auditoria de refresh token (%s)", event[0])
+
+    @staticmethod
+    def _apply(db, kind, *args) -> None:
+        RT = models.RefreshToken
+        if kind == "create":
+            jti, empresa_id, token_hash, family_id, expires_at, replaces = args
+            db.add(RT(jti=jti, empresa_id=empresa_id, token_hash=token_hash, family_id=family_id,
+                      expires_at=expires_at, revoked=0))
+            if replaces:
+                db.execute(update(RT).where(RT.jti == replaces).values(revoked=1, replaced_by=jti))
+        elif kind == "revoke":
+            (jtis,) = args
+            if jtis:
+                db.execute(update(RT).where(RT.jti.in_(jtis)).values(revoked=1))
+
+
+class RedisRefreshTokenStore:
+    """Refresh tokens no Redis com expiração nativa (TTL)."""
+
+    def __init__(self, ttl_seconds: int, audit: bool = False) -> None:
+        self.ttl = ttl_seconds
+        self._audit = _AuditWriter() if audit else None
+        self._rotate_script = None
+        self._revoke_script = None
+
+    def _redis(self):
+        r = get_redis()
+        if self._rotate_script is None:
+            self._rotate_script = r.register_script(_ROTATE_LUA)
+            self._revoke_script = r.register_script(_REVOKE_SET_LUA)
+        return r
+
+    def _expires_at(self, now: int) -> datetime:
+        return datetime.fromtimestamp(now + self.ttl, tz=timezone.utc)
+
+    def create(self, empresa_id: int, token_hash: str, raw: str) -> str:
+        jti = uuid.uuid4().hex
+        now = int(time.time())
+        try:
+            r = self._redis()
+            pipe = r.pipeline(transaction=True)
+            pipe.hset(f"{_PREFIX}{jti}", mapping={
+                "empresa_id": empresa_id,
+                "token_hash": token_hash,
+                "family_id": jti,
+                "revoked": 0,
+                "replaced_by": "",
+                "created_at": now,
+                "expires_at": now + self.ttl,
+            })
+            pipe.expire(f"{_PREFIX}{jti}", self.ttl)
+            for index in (f"{_PREFIX}empresa:{empresa_id}", f"{_PREFIX}family:{jti}"):
+                pipe.sadd(index, jti)
+                pipe.expire(index, self.ttl)
+            pipe.execute()
+        except redis.RedisError as exc:
+            raise _unavailable(exc)
+        if self._audit:
+            self._audit.submit("create", jti, empresa_id, token_hash, jti, self._expires_at(now), None)
+        return f"{jti}::{raw}"
+
+    def get(self, jti: str) -> Optional[dict]:
+        try:
+            data = self._redis().hgetall(f"{_PREFIX}{jti}")
+        except redis.RedisError as exc:
+            raise _unavailable(exc)
+        return data or None
+
+    def rotate(self, old_jti: str, expected_hash: str, new_hash: str, new_raw: str) -> Tuple[int, Optional[Tuple[int, str]]]:
+        """Executa o script de rotação. Devolve (status, (empresa_id, novo token) | None).
+
+        status: 1 rotacionado, 0 inválido, -1 reuso detectado (família já revogada).
+        """
+        new_jti = uuid.uuid4().hex
+        now = int(time.time())
+        try:
+            r = self._redis()
+            result = self._rotate_script(
+                keys=[f"{_PREFIX}{old_jti}", f"{_PREFIX}{new_jti}"],
+                args=[expected_hash, now, new_jti, new_hash, self.ttl, _PREFIX],
+                client=r,
+            )
+        except redis.RedisError as exc:
+            raise _unavailable(exc)
+        code = int(result[0])
+        if code == 1:
+            empresa_id, family_id = int(result[1]), result[2]
+            if self._audit:
+                self._audit.submit("create", new_jti, empresa_id, new_hash, family_id, self._expires_at(now), old_jti)
+            return 1, (empresa_id, f"{new_jti}::{new_raw}")
+        if code == -1:
+            empresa_id, family_id = int(result[1]), result[2]
+            revoked = self._revoke_index(f"{_PREFIX}family:{family_id}")
+            logger.warning(
+                "Reuso de refresh token detectado (empresa ID=%s, família=%s); %s token(s) revogado(s)",
+                empresa_id, family_id, revoked,
+            )
+            return -1, None
+        return 0, None
+
+    def _revoke_index(self, index_key: str) -> int:
+        try:
+            r = self._redis()
+            jtis = self._revoke_script(keys=[index_key], args=[_PREFIX], client=r)
+        except redis.RedisError as exc:
+            raise _unavailable(exc)
+        if self._audit and jtis:
+            self._audit.submit("revoke", list(jtis))
+        return len(jtis)
+
+    def revoke_empresa(self, empresa_id: int) -> int:
+        return self._revoke_index(f"{_PREFIX}empresa:{empresa_id}")
+
+    def audit_dropped(self) -> int:
+        return self._audit.dropped if self._audit else 0
+
+
+_store: Optional[RedisRefreshTokenStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store(ttl_seconds: int) -> Optional[RedisRefreshTokenStore]:
+    """O store Redis quando REFRESH_TOKEN_STORE=redis; None para o SQL padrão."""
+    global _store
+    if REFRESH_TOKEN_STORE != "redis":
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RedisRefreshTokenStore(ttl_seconds, audit=REFRESH_TOKEN_AUDIT_SQL)
+    return _store
@@ -0,0 +1,267 @@
+"""
+Roteamento de leituras para a réplica (DATABASE_REPLICA_URL)
+
+As dependências de leitura (listagens, dashboard, analytics, painel, exportações)
+chamam `route_reads` / `route_reads_async`. A sessão só lê da réplica quando:
+
+- existe réplica configurada;
+- o atraso medido da réplica está abaixo de REPLICA_MAX_LAG_SECONDS (medido no máximo
+  a cada REPLICA_LAG_CHECK_SECONDS; erro na medição = réplica fora até a próxima);
+- a empresa não gravou nada nos últimos REPLICA_READ_YOUR_WRITES_SECONDS. Os commits
+  com escrita marcam a empresa no processo e no Redis (replica:recent_write:{id}),
+  então o próximo GET depois de um POST enxerga o próprio dado mesmo em outro worker.
+  Vale para flush do ORM e para INSERT/UPDATE/DELETE em massa via `session.execute`
+  (a empresa sai dos parâmetros ou do WHERE; escrita sem empresa identificável, como
+  os jobs, mantém todas as empresas no primário pela janela).
+
+Caso contrário a leitura fica no primário. Sem réplica nada disso roda.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import anyio
+import redis
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.dml import ValuesBase
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from backend import database, models
+from backend.redis_client import get_redis_or_none, mark_redis_down
+
+logger = logging.getLogger("clientflow.replica")
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "5"))
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "10"))
+REPLICA_RECENT_WRITES_MAX_ENTRIES = 10000
+
+_WRITTEN_KEY = "replica_written_empresas"
+# Escrita sem empresa identificável: todas as empresas leem do primário pela janela.
+_ALL = "*"
+# Tabelas que nunca são lidas por sessões roteadas para a réplica.
+_UNROUTED_TABLES = {models.RefreshToken.__tablename__}
+
+# Atraso de replay no standby; 0 quando não há nada a aplicar (primário ocioso).
+_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_lock = threading.Lock()
+_recent_writes: "OrderedDict[int, float]" = OrderedDict()
+_lag = {"checked_at": None, "seconds": None}
+_stats = {"replica_reads": 0, "primary_reads": 0, "lag_fallbacks": 0, "recent_write_fallbacks": 0, "lag_errors": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _stats[name] += 1
+
+
+def _redis_key(empresa_id: int) -> str:
+    return f"replica:recent_write:{empresa_id}"
+
+
+# ====== Atraso da réplica ======
+
+def _measure_lag(conn) -> float:
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    return float(conn.execute(_LAG_SQL).scalar() or 0)
+
+
+def _record_lag(seconds: Optional[float]) -> None:
+    with _lock:
+        _lag["checked_at"] = time.monotonic()
+        _lag["seconds"] = seconds
+
+
+def _lag_check_due() -> bool:
+    with _lock:
+        checked_at = _lag["checked_at"]
+    return checked_at is None or time.monotonic() - checked_at >= REPLICA_LAG_CHECK_SECONDS
+
+
+def check_lag() -> Optional[float]:
+    """Mede o atraso da réplica agora (None = réplica indisponível)."""
+    seconds = None
+    try:
+        with database.connect(database.replica_engine) as conn:
+            seconds = _measure_lag(conn)
+    except Exception as exc:
+        _count("lag_errors")
+        logger.warning("Réplica indisponível, leituras no primário: %s", exc)
+    _record_lag(seconds)
+    return seconds
+
+
+def _replica_healthy() -> bool:
+    if _lag_check_due():
+        check_lag()
+    with _lock:
+        seconds = _lag["seconds"]
+    return seconds is not None and seconds <= REPLICA_MAX_LAG_SECONDS
+
+
+# ====== Read-your-writes ======
+
+def mark_written(empresa_id) -> None:
+    """Mantém as leituras da empresa no primário pela janela read-your-writes
+    (`_ALL`: de todas as empresas)."""
+    if database.replica_engine is None or REPLICA_READ_YOUR_WRITES_SECONDS <= 0:
+        return
+    with _lock:
+        _recent_writes[empresa_id] = time.monotonic() + REPLICA_READ_YOUR_WRITES_SECONDS
+        _recent_writes.move_to_end(empresa_id)
+        while len(_recent_writes) > REPLICA_RECENT_WRITES_MAX_ENTRIES:
+            _recent_writes.popitem(last=False)
+    r = get_redis_or_none()
+    if r is not None:
+        try:
+            r.set(_redis_key(empresa_id), "1", px=int(REPLICA_READ_YOUR_WRITES_SECONDS * 1000))
+        except redis.RedisError as exc:
+            mark_redis_down(exc)
+
+
+def _wrote_recently(empresa_id: int) -> bool:
+    with _lock:
+        for key in (empresa_id, _ALL):
+            until = _recent_writes.get(key)
+            if until is not None:
+                if until > time.monotonic():
+                    return True
+                del _recent_writes[key]
+    r = get_redis_or_none()
+    if r is not None:
+        try:
+            return bool(r.exists(_redis_key(empresa_id), _redis_key(_ALL)))
+        except redis.RedisError as exc:
+            mark_redis_down(exc)
+    return False
+
+
+def _should_use_replica(empresa_id: Optional[int]) -> bool:
+    if empresa_id is not None and _wrote_recently(empresa_id):
+        _count("recent_write_fallbacks")
+        _count("primary_reads")
+        return False
+    if not _replica_healthy():
+        _count("lag_fallbacks")
+        _count("primary_reads")
+        return False
+    _count("replica_reads")
+    return True
+
+
+# ====== Roteamento das sessões ======
+
+def route_reads(db: Session, empresa_id: Optional[int]) -> bool:
+    """Aponta as leituras da sessão (síncrona) para a réplica, se permitido."""
+    if database.replica_engine is None or not _should_use_replica(empresa_id):
+        return False
+    database.use_replica(db, database.replica_engine)
+    return True
+
+
+async def route_reads_async(db, empresa_id: Optional[int]) -> bool:
+    """Versão para AsyncSession; a decisão (Redis/medição de atraso) roda em thread."""
+    if database.replica_engine is None:
+        return False
+    if not await anyio.to_thread.run_sync(_should_use_replica, empresa_id):
+        return False
+    database.use_replica(db.sync_session, database.get_async_replica_engine().sync_engine)
+    return True
+
+
+def stats() -> dict:
+    with _lock:
+        snapshot = dict(_stats)
+        snapshot["lag_seconds"] = _lag["seconds"]
+        snapshot["recent_writes"] = len(_recent_writes)
+    snapshot["configured"] = database.replica_engine is not None
+    return snapshot
+
+
+def clear_local() -> None:
+    with _lock:
+        _recent_writes.clear()
+        _lag.update(checked_at=None, seconds=None)
+
+
+# ====== Marcação automática de escrita ======
+
+def _empresa_of(obj) -> Optional[int]:
+    if isinstance(obj, models.Empresa):
+        return obj.id
+    return getattr(obj, "empresa_id", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar_escritas(session: Session, flush_context) -> None:
+    if database.replica_engine is None:
+        return
+    ids = {_empresa_of(obj) for obj in (*session.new, *session.dirty, *session.deleted)}
+    ids.discard(None)
+    if ids:
+        session.info.setdefault(_WRITTEN_KEY, set()).update(ids)
+
+
+def _empresas_da_instrucao(statement, parameters) -> set:
+    """Empresas afetadas por um INSERT/UPDATE/DELETE: `empresa_id` nos parâmetros ou
+    `empresa_id == x` / `empresa_id IN (...)` no WHERE (`id` para a própria empresas).
+    Conjunto vazio = não deu para identificar."""
+    table = getattr(statement, "table", None)
+    coluna = "id" if getattr(table, "name", None) == models.Empresa.__tablename__ else "empresa_id"
+    ids = set()
+    for params in parameters if isinstance(parameters, (list, tuple)) else [parameters or {}]:
+        if params.get(coluna) is not None:
+            ids.add(params[coluna])
+    where = getattr(statement, "whereclause", None)
+    if where is not None:
+        for element in visitors.iterate(where):
+            if not isinstance(element, BinaryExpression) or getattr(element.left, "key", None) != coluna:
+                continue
+            if not isinstance(element.right, BindParameter) or element.right.value is None:
+                continue
+            if element.operator is operators.eq:
+                ids.add(element.right.value)
+            elif element.operator is operators.in_op:
+                ids.update(element.right.value)
+    if not ids and isinstance(statement, ValuesBase):
+        # insert(...).values(empresa_id=...): valor embutido na instrução.
+        valor = statement.compile().params.get(coluna)
+        if valor is not None:
+            ids.add(valor)
+    return ids
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_escritas_em_massa(orm_execute_state) -> None:
+    if database.replica_engine is None:
+        return
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    statement = orm_execute_state.statement
+    if getattr(getattr(statement, "table", None), "name", None) in _UNROUTED_TABLES:
+        return
+    ids = _empresas_da_instrucao(statement, orm_execute_state.parameters) or {_ALL}
+    orm_execute_state.session.info.setdefault(_WRITTEN_KEY, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_escritas(session: Session) -> None:
+    for empresa_id in session.info.pop(_WRITTEN_KEY, ()):
+        mark_written(empresa_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_escritas(session: Session) -> None:
+    session.info.pop(_WRITTEN_KEY, None)
@@ -0,0 +1,144 @@
+"""
+Rollup diário de métricas por empresa (tabela metricas_diarias)
+
+As escritas de clientes e atendimentos chamam `registrar_*` antes do commit, então o
+rollup anda na mesma transação que o dado bruto. `rebuild` recalcula a partir das
+tabelas brutas (dados históricos ou correção de divergências).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import func, insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend import models
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _dia(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def registrar(
+    db: Session,
+    empresa_id: int,
+    dia: date,
+    atendimentos: int = 0,
+    receita_centavos: int = 0,
+    novos_clientes: int = 0,
+) -> None:
+    """Soma deltas na linha (empresa_id, dia), criando-a se necessário."""
+    tabela = models.MetricaDiaria.__table__
+    valores = {
+        "empresa_id": empresa_id,
+        "dia": _dia(dia),
+        "atendimentos": atendimentos,
+        "receita_centavos": receita_centavos,
+        "novos_clientes": novos_clientes,
+    }
+    dialect_insert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(tabela).values(**valores)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabela.c.empresa_id, tabela.c.dia],
+            set_={
+                "atendimentos": tabela.c.atendimentos + stmt.excluded.atendimentos,
+                "receita_centavos": tabela.c.receita_centavos + stmt.excluded.receita_centavos,
+                "novos_clientes": tabela.c.novos_clientes + stmt.excluded.novos_clientes,
+            },
+        )
+        db.execute(stmt)
+        return
+
+    atualizadas = db.execute(
+        tabela.update()
+        .where(tabela.c.empresa_id == empresa_id, tabela.c.dia == valores["dia"])
+        .values(
+            atendimentos=tabela.c.atendimentos + atendimentos,
+            receita_centavos=tabela.c.receita_centavos + receita_centavos,
+            novos_clientes=tabela.c.novos_clientes + novos_clientes,
+        )
+    ).rowcount
+    if not atualizadas:
+        db.execute(tabela.insert().values(**valores))
+
+
+def registrar_atendimento(db: Session, atendimento: models.Atendimento) -> None:
+    """Conta um atendimento já inserido (após flush, para ter data_atendimento)."""
+    registrar(
+        db,
+        atendimento.empresa_id,
+        atendimento.data_atendimento,
+        atendimentos=1,
+        receita_centavos=atendimento.valor_centavos or 0,
+    )
+
+
+def registrar_cliente(db: Session, cliente: models.Cliente) -> None:
+    """Conta um cliente novo já inserido (após flush, para ter data_primeiro_contato)."""
+    registrar(db, cliente.empresa_id, cliente.data_primeiro_contato, novos_clientes=1)
+
+
+def rebuild(db: Session, empresa_id: Optional[int] = None) -> int:
+    """Recalcula metricas_diarias a partir de atendimentos/clientes numa transação.
+
+    Retorna o número de linhas do rollup gravadas.
+    """
+    a = models.Atendimento
+    c = models.Cliente
+    fonte_atendimentos = (
+        select(
+            a.empresa_id.label("empresa_id"),
+            func.date(a.data_atendimento).label("dia"),
+            func.count().label("atendimentos"),
+            func.coalesce(func.sum(a.valor_centavos), 0).label("receita_centavos"),
+            literal(0).label("novos_clientes"),
+        )
+        .where(a.data_atendimento.isnot(None))
+        .group_by(a.empresa_id, func.date(a.data_atendimento))
+    )
+    fonte_clientes = (
+        select(
+            c.empresa_id.label("empresa_id"),
+            func.date(c.data_primeiro_contato).label("dia"),
+            literal(0).label("atendimentos"),
+            literal(0).label("receita_centavos"),
+            func.count().label("novos_clientes"),
+        )
+        .where(c.data_primeiro_contato.isnot(None))
+        .group_by(c.empresa_id, func.date(c.data_primeiro_contato))
+    )
+    if empresa_id is not None:
+        fonte_atendimentos = fonte_atendimentos.where(a.empresa_id == empresa_id)
+        fonte_clientes = fonte_clientes.where(c.empresa_id == empresa_id)
+
+    fontes = union_all(fonte_atendimentos, fonte_clientes).subquery()
+    agregado = select(
+        fontes.c.empresa_id,
+        fontes.c.dia,
+        func.sum(fontes.c.atendimentos),
+        func.sum(fontes.c.receita_centavos),
+        func.sum(fontes.c.novos_clientes),
+    ).group_by(fontes.c.empresa_id, fontes.c.dia)
+
+    tabela = models.MetricaDiaria.__table__
+    apagar = tabela.delete()
+    if empresa_id is not None:
+        apagar = apagar.where(tabela.c.empresa_id == empresa_id)
+    db.execute(apagar)
+    gravadas = db.execute(
+        insert(tabela).from_select(
+            ["empresa_id", "dia", "atendimentos", "receita_centavos", "novos_clientes"], agregado
+        )
+    ).rowcount
+    db.commit()
+    return gravadas
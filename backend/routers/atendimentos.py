@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
-from backend import database, models
-from backend.dependencies import require_authenticated_empresa, get_tenant_db
-from backend.plan_limits import check_plan_limits
+from backend import cache, database, models, rollups
+from backend.analytics import brl_to_centavos
+from backend.dependencies import (
+    get_tenant_async_db,
+    get_tenant_db,
+    require_authenticated_empresa,
+    require_authenticated_empresa_async,
+)
+from backend.exports import stream_export
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, build_page, unpaged_list
+from backend.plan_limits import check_plan_limits, registrar_uso
 from pydantic import BaseModel, Field
 
 
@@ -13,37 +23,161 @@ class AtendimentoCreateApi(BaseModel):
     tipo_servico: str = Field(..., min_length=2, max_length=100)
     descricao_servico: str = Field(default="", max_length=2000)
     meses_retorno: int | None = Field(default=None, ge=0, le=120)
+    valor_cobrado: str | None = Field(default=None, max_length=50)
+    forma_pagamento: str | None = Field(default=None, max_length=50)
 
 
 router = APIRouter(prefix="/api/atendimentos", tags=["atendimentos"])
 
 
-@router.get("", response_model=List[dict])
-def listar_atendimentos(
-    empresa: models.Empresa = Depends(require_authenticated_empresa),
-    db: Session = Depends(get_tenant_db),
+def _serialize_atendimento(a) -> dict:
+    # Minimal shape to keep frontend compatibility without adding new schemas.
+    return {
+        "id": a.id,
+        "empresa_id": a.empresa_id,
+        "cliente_id": a.cliente_id,
+        "tipo_servico": a.tipo_servico,
+        "status_atendimento": a.status_atendimento,
+        "descricao_servico": a.descricao_servico,
+        "meses_retorno": a.meses_retorno,
+        "data_atendimento": a.data_atendimento,
+    }
+
+
+def _filtrar_atendimentos(
+    query,
+    empresa_id: int,
+    status_atendimento: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+    data_de: Optional[datetime] = None,
+    data_ate: Optional[datetime] = None,
+    tipo_servico: Optional[str] = None,
+):
+    query = query.filter(models.Atendimento.empresa_id == empresa_id)
+    if status_atendimento:
+        query = query.filter(models.Atendimento.status_atendimento == status_atendimento)
+    if cliente_id is not None:
+        query = query.filter(models.Atendimento.cliente_id == cliente_id)
+    if data_de is not None:
+        query = query.filter(models.Atendimento.data_atendimento >= data_de)
+    if data_ate is not None:
+        query = query.filter(models.Atendimento.data_atendimento < data_ate)
+    if tipo_servico:
+        query = query.filter(models.Atendimento.tipo_servico == tipo_servico)
+    return query
+
+
+def consultar_atendimentos(
+    db: Session,
+    empresa_id: int,
+    status_atendimento: Optional[str] = None,
+    cliente_id: Optional[int] = None,
+    data_de: Optional[datetime] = None,
+    data_ate: Optional[datetime] = None,
+    tipo_servico: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    response: Optional[Response] = None,
 ):
-    atendimentos = (
-        db.query(models.Atendimento)
-        .filter(models.Atendimento.empresa_id == empresa.id)
-        .order_by(models.Atendimento.data_atendimento.desc())
-        .all()
+    """Lista filtrada (sem limit/cursor, limitada a UNPAGED_LIST_MAX_ITEMS) ou página keyset
+    em (data_atendimento, id)."""
+    query = _filtrar_atendimentos(
+        db.query(models.Atendimento),
+        empresa_id,
+        status_atendimento=status_atendimento,
+        cliente_id=cliente_id,
+        data_de=data_de,
+        data_ate=data_ate,
+        tipo_servico=tipo_servico,
     )
+    if limit is None and cursor is None:
+        atendimentos = unpaged_list(query, models.Atendimento.data_atendimento, models.Atendimento.id,
+                                    key=lambda a: (a.data_atendimento, a.id), response=response)
+        return [_serialize_atendimento(a) for a in atendimentos]
 
-    # Minimal shape to keep frontend compatibility without adding new schemas.
-    return [
-        {
-            "id": a.id,
-            "empresa_id": a.empresa_id,
-            "cliente_id": a.cliente_id,
-            "tipo_servico": a.tipo_servico,
-            "status_atendimento": a.status_atendimento,
-            "descricao_servico": a.descricao_servico,
-            "meses_retorno": a.meses_retorno,
-            "data_atendimento": a.data_atendimento,
-        }
-        for a in atendimentos
-    ]
+    page_size = limit or DEFAULT_PAGE_SIZE
+    rows = apply_keyset(query, models.Atendimento.data_atendimento, models.Atendimento.id, cursor, page_size).all()
+    items, next_cursor = build_page(rows, page_size, key=lambda a: (a.data_atendimento, a.id))
+    return {"items": [_serialize_atendimento(a) for a in items], "next_cursor": next_cursor}
+
+
+@router.get("", response_model=Union[List[dict], dict])
+async def listar_atendimentos(
+    response: Response,
+    status_atendimento: Optional[str] = Query(None, alias="status"),
+    cliente_id: Optional[int] = Query(None, ge=1),
+    data_de: Optional[datetime] = Query(None, alias="from"),
+    data_ate: Optional[datetime] = Query(None, alias="to"),
+    tipo_servico: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    empresa: models.Empresa = Depends(require_authenticated_empresa_async),
+    db: AsyncSession = Depends(get_tenant_async_db),
+):
+    """
+    Lista os atendimentos da empresa, mais recentes primeiro.
+
+    Filtros opcionais: `status`, `cliente_id`, `from`/`to` (intervalo semiaberto em
+    data_atendimento) e `tipo_servico`. Com `limit` ou `cursor` devolve uma página
+    `{items, next_cursor}` via keyset em (data_atendimento, id); sem eles mantém a lista,
+    limitada a UNPAGED_LIST_MAX_ITEMS (continuação no header X-Next-Cursor).
+    """
+    return await db.run_sync(
+        consultar_atendimentos,
+        empresa.id,
+        status_atendimento,
+        cliente_id,
+        data_de,
+        data_ate,
+        tipo_servico,
+        limit,
+        cursor,
+        response,
+    )
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "cliente_id",
+    "tipo_servico",
+    "status_atendimento",
+    "descricao_servico",
+    "valor_cobrado",
+    "forma_pagamento",
+    "meses_retorno",
+    "data_atendimento",
+)
+
+
+@router.get("/export")
+def exportar_atendimentos(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    status_atendimento: Optional[str] = Query(None, alias="status"),
+    cliente_id: Optional[int] = Query(None, ge=1),
+    data_de: Optional[datetime] = Query(None, alias="from"),
+    data_ate: Optional[datetime] = Query(None, alias="to"),
+    tipo_servico: Optional[str] = Query(None),
+    empresa: models.Empresa = Depends(require_authenticated_empresa),
+):
+    """Exporta os atendimentos (mesmos filtros da listagem) em CSV ou NDJSON, em streaming."""
+    empresa_id = empresa.id
+    colunas = [getattr(models.Atendimento, c) for c in EXPORT_COLUMNS]
+
+    def build_query(db: Session):
+        query = _filtrar_atendimentos(
+            db.query(*colunas),
+            empresa_id,
+            status_atendimento=status_atendimento,
+            cliente_id=cliente_id,
+            data_de=data_de,
+            data_ate=data_ate,
+            tipo_servico=tipo_servico,
+        )
+        return query.order_by(models.Atendimento.data_atendimento.desc(), models.Atendimento.id.desc())
+
+    return stream_export(
+        build_query, EXPORT_COLUMNS, formato, "atendimentos", schema=f"empresa_{empresa_id}", empresa_id=empresa_id
+    )
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
@@ -69,8 +203,15 @@ def criar_atendimento(
         tipo_servico=body.tipo_servico,
         descricao_servico=body.descricao_servico,
         meses_retorno=body.meses_retorno,
+        valor_cobrado=body.valor_cobrado,
+        valor_centavos=brl_to_centavos(body.valor_cobrado),
+        forma_pagamento=body.forma_pagamento,
     )
     db.add(atendimento)
+    db.flush()
+    rollups.registrar_atendimento(db, atendimento)
+    registrar_uso(db, empresa.id, atendimentos=1)
     db.commit()
+    cache.invalidate_empresa(empresa.id)
     db.refresh(atendimento)
     return atendimento
@@ -1,12 +1,10 @@
 import logging
-import time
-from collections import defaultdict, deque
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
 
-from backend import auth, database, models
+from backend import auth, database, models, password_pool, plan_limits, rate_limit
 from backend.dependencies import require_authenticated_empresa
 from backend.schemas import EmpresaCreate, EmpresaLogin, EmpresaOut, RefreshRequest, TokenResponse
 
@@ -15,101 +13,108 @@ logger = logging.getLogger('clientflow.auth_routes')
 router = APIRouter(prefix='/api/auth', tags=['auth'])
 public_router = APIRouter(prefix='/auth', tags=['auth'])
 
-# Lightweight in-memory limiter. In multi-instance setups, replace with Redis-based limiter.
-_login_attempts = defaultdict(lambda: deque(maxlen=30))
-MAX_LOGIN_ATTEMPTS = 5
-LOGIN_WINDOW_SECONDS = 60
 
+# bcrypt roda no pool de password_pool e é aguardado no event loop; só as etapas de
+# banco (curtas) passam pelo threadpool, cada uma com a própria sessão.
 
-def _enforce_login_rate_limit(request: Request, email: str) -> None:
-    ip = request.client.host if request.client else 'unknown'
-    key = f'{ip}:{email.lower().strip()}'
-    now = time.time()
-
-    attempts = _login_attempts[key]
-    while attempts and now - attempts[0] > LOGIN_WINDOW_SECONDS:
-        attempts.popleft()
-
-    if len(attempts) >= MAX_LOGIN_ATTEMPTS:
-        raise HTTPException(status_code=429, detail='Muitas tentativas de login. Tente novamente em instantes.')
-
-    attempts.append(now)
-
-
-def _register_company(payload: EmpresaCreate, db: Session) -> models.Empresa:
-    existing = db.query(models.Empresa).filter(models.Empresa.email_login == payload.email_login).first()
+def _ensure_email_available(email_login: str) -> None:
+    with database.standalone_session() as db:
+        existing = db.query(models.Empresa.id).filter(models.Empresa.email_login == email_login).first()
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Email ja cadastrado')
 
-    company = models.Empresa(
-        nome_empresa=payload.nome_empresa,
-        nicho=payload.nicho,
-        telefone=payload.telefone,
-        email_login=payload.email_login,
-        senha_hash=auth.get_password_hash(payload.senha),
-    )
-    db.add(company)
-    db.commit()
-    db.refresh(company)
-    return company
 
+def _insert_company(payload: EmpresaCreate, senha_hash: str) -> EmpresaOut:
+    with database.standalone_session() as db:
+        company = models.Empresa(
+            nome_empresa=payload.nome_empresa,
+            nicho=payload.nicho,
+            telefone=payload.telefone,
+            email_login=payload.email_login,
+            senha_hash=senha_hash,
+        )
+        db.add(company)
+        db.flush()
+        plan_limits.inicializar_uso(db, company.id)
+        db.commit()
+        db.refresh(company)
+        return EmpresaOut.model_validate(company)
+
+
+async def create_company(payload: EmpresaCreate) -> EmpresaOut:
+    """Cadastro (também usado por /api/empresas/cadastrar)."""
+    await anyio.to_thread.run_sync(_ensure_email_available, payload.email_login)
+    senha_hash = await password_pool.hash_password(payload.senha)
+    return await anyio.to_thread.run_sync(_insert_company, payload, senha_hash)
+
+
+def _find_credentials(email_login: str):
+    with database.standalone_session() as db:
+        return db.query(models.Empresa.id, models.Empresa.senha_hash).filter(
+            models.Empresa.email_login == email_login
+        ).first()
+
+
+def _issue_tokens(empresa_id: int) -> TokenResponse:
+    with database.standalone_session() as db:
+        refresh_token = auth.create_refresh_token(db, empresa_id)
+    access_token = auth.create_access_token({'sub': empresa_id})
+    return TokenResponse(access_token=access_token, refresh_token=refresh_token, token_type='bearer')
 
-def _login_company(payload: EmpresaLogin, db: Session) -> TokenResponse:
-    company = db.query(models.Empresa).filter(models.Empresa.email_login == payload.email_login).first()
-    if not company or not auth.verify_password(payload.senha, company.senha_hash):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Email ou senha incorretos')
 
-    access_token = auth.create_access_token({'sub': company.id})
-    refresh_token = auth.create_refresh_token(db, company.id)
-    return TokenResponse(access_token=access_token, refresh_token=refresh_token, token_type='bearer')
+async def authenticate_company(payload: EmpresaLogin) -> TokenResponse:
+    """Login por e-mail e senha (também usado por /api/empresas/login)."""
+    company = await anyio.to_thread.run_sync(_find_credentials, payload.email_login)
+    if not company or not await password_pool.verify_password(payload.senha, company.senha_hash):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Email ou senha incorretos')
+    return await anyio.to_thread.run_sync(_issue_tokens, company.id)
 
 
-def _refresh_tokens(payload: RefreshRequest, db: Session) -> TokenResponse:
-    existing = auth.verify_refresh_token(db, payload.refresh_token)
-    if not existing:
+def rotate_refresh_token(payload: RefreshRequest) -> TokenResponse:
+    """Troca o refresh token (também usado por /api/empresas/refresh). Roda em thread."""
+    with database.standalone_session() as db:
+        exchanged = auth.exchange_refresh_token(db, payload.refresh_token)
+    if not exchanged:
         raise HTTPException(status_code=401, detail='Refresh token invalido ou expirado')
 
-    new_raw = auth.create_session_token()
-    ok, new_token = auth.rotate_refresh_token(db, existing.jti, new_raw)
-    if not ok or not new_token:
-        raise HTTPException(status_code=500, detail='Unable to rotate refresh token')
-
-    access_token = auth.create_access_token({'sub': existing.empresa_id})
+    empresa_id, new_token = exchanged
+    access_token = auth.create_access_token({'sub': empresa_id})
     return TokenResponse(access_token=access_token, refresh_token=new_token, token_type='bearer')
 
 
 @router.post('/register', response_model=EmpresaOut, status_code=status.HTTP_201_CREATED)
 @public_router.post('/register', response_model=EmpresaOut, status_code=status.HTTP_201_CREATED)
-def register_company(payload: EmpresaCreate, db: Session = Depends(database.get_db)):
+async def register_company(payload: EmpresaCreate, request: Request):
+    await anyio.to_thread.run_sync(rate_limit.enforce, request, 'register')
+
     try:
-        return _register_company(payload, db)
+        return await create_company(payload)
     except HTTPException:
         raise
     except SQLAlchemyError:
-        db.rollback()
         logger.exception('Database error while registering company')
         raise HTTPException(status_code=503, detail='Banco indisponivel. Tente novamente em instantes.')
 
 
 @router.post('/login', response_model=TokenResponse)
 @public_router.post('/login', response_model=TokenResponse)
-def login_company(payload: EmpresaLogin, request: Request, db: Session = Depends(database.get_db)):
-    _enforce_login_rate_limit(request, payload.email_login)
+async def login_company(payload: EmpresaLogin, request: Request):
+    await anyio.to_thread.run_sync(rate_limit.enforce, request, 'login', payload.email_login)
 
     try:
-        return _login_company(payload, db)
+        return await authenticate_company(payload)
     except HTTPException:
         raise
     except SQLAlchemyError:
-        db.rollback()
         logger.exception('Database error while logging in')
         raise HTTPException(status_code=503, detail='Banco indisponivel. Tente novamente em instantes.')
 
 
 @router.post('/refresh', response_model=TokenResponse)
 @public_router.post('/refresh', response_model=TokenResponse)
-def refresh_auth_token(payload: RefreshRequest, db: Session = Depends(database.get_db)):
-    return _refresh_tokens(payload, db)
+async def refresh_auth_token(payload: RefreshRequest, request: Request):
+    await anyio.to_thread.run_sync(rate_limit.enforce, request, 'refresh')
+    return await anyio.to_thread.run_sync(rotate_refresh_token, payload)
 
 
 @router.get('/me', response_model=EmpresaOut)
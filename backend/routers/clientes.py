@@ -1,20 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from backend.schemas import ClienteCreate, ClienteOut
-from backend import models, database
-from backend.dependencies import require_authenticated_empresa, get_tenant_db
-from backend.plan_limits import check_plan_limits
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from backend.schemas import ClienteCreate, ClienteOut, ClientePage
+from backend import cache, models, database, rollups
+from backend.dependencies import (
+    get_tenant_async_db,
+    get_tenant_db,
+    require_authenticated_empresa,
+    require_authenticated_empresa_async,
+)
+from backend.exports import stream_export
+from backend.imports import importar_clientes, parse_rows
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, build_page, unpaged_list
+from backend.plan_limits import check_plan_limits, registrar_uso
+from backend.telefone import TELEFONE_DUPLICADO, violou_telefone_unico
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Union
 
 router = APIRouter(prefix="/api/clientes", tags=["clientes"])
 
-@router.get("", response_model=List[ClienteOut])
-def listar_clientes(
+def consultar_clientes(db: Session, empresa_id: int, limit: Optional[int], cursor: Optional[str],
+                       response: Optional[Response] = None):
+    """Lista (sem limit/cursor, limitada a UNPAGED_LIST_MAX_ITEMS) ou página keyset em
+    (data_primeiro_contato, id)."""
+    query = db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa_id)
+    if limit is None and cursor is None:
+        clientes = unpaged_list(query, models.Cliente.data_primeiro_contato, models.Cliente.id,
+                                key=lambda c: (c.data_primeiro_contato, c.id), response=response)
+        return [ClienteOut.model_validate(c) for c in clientes]
+
+    page_size = limit or DEFAULT_PAGE_SIZE
+    rows = apply_keyset(query, models.Cliente.data_primeiro_contato, models.Cliente.id, cursor, page_size).all()
+    items, next_cursor = build_page(rows, page_size, key=lambda c: (c.data_primeiro_contato, c.id))
+    return ClientePage(items=[ClienteOut.model_validate(c) for c in items], next_cursor=next_cursor)
+
+@router.get("", response_model=Union[List[ClienteOut], ClientePage])
+async def listar_clientes(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    empresa: models.Empresa = Depends(require_authenticated_empresa_async),
+    db: AsyncSession = Depends(get_tenant_async_db)
+):
+    """
+    Lista os clientes da empresa, mais recentes primeiro.
+
+    Sem `limit`/`cursor` devolve uma lista (compatibilidade com o frontend atual) de até
+    UNPAGED_LIST_MAX_ITEMS clientes; se houver mais, o header X-Next-Cursor traz o cursor
+    da continuação. Com `limit` ou `cursor` devolve uma página `{items, next_cursor}` via
+    keyset em (data_primeiro_contato, id).
+    """
+    return await db.run_sync(consultar_clientes, empresa.id, limit, cursor, response)
+
+EXPORT_COLUMNS = (
+    "id",
+    "nome",
+    "telefone",
+    "origem_cliente",
+    "cidade",
+    "bairro",
+    "status_cliente",
+    "anotacoes_rapidas",
+    "data_primeiro_contato",
+)
+
+@router.get("/export")
+def exportar_clientes(
+    formato: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
     empresa: models.Empresa = Depends(require_authenticated_empresa),
-    db: Session = Depends(get_tenant_db)
 ):
-    clientes = db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa.id).order_by(models.Cliente.data_primeiro_contato.desc()).all()
-    return clientes
+    """Exporta os clientes da empresa em CSV ou NDJSON, em streaming."""
+    empresa_id = empresa.id
+    colunas = [getattr(models.Cliente, c) for c in EXPORT_COLUMNS]
+
+    def build_query(db: Session):
+        return db.query(*colunas).filter(models.Cliente.empresa_id == empresa_id).order_by(
+            models.Cliente.data_primeiro_contato.desc(), models.Cliente.id.desc()
+        )
+
+    return stream_export(
+        build_query, EXPORT_COLUMNS, formato, "clientes", schema=f"empresa_{empresa_id}", empresa_id=empresa_id
+    )
+
+@router.post("/import")
+async def importar_clientes_lote(
+    request: Request,
+    empresa: models.Empresa = Depends(require_authenticated_empresa),
+    db: Session = Depends(get_tenant_db),
+):
+    """
+    Importa clientes em lote a partir de um CSV (Content-Type: text/csv, colunas nome,
+    telefone e opcionalmente anotacoes_rapidas) ou de uma lista JSON de ClienteCreate.
+
+    Linhas inválidas, com telefone já cadastrado/repetido ou acima do limite do plano são
+    puladas e listadas em `erros` (linha numerada a partir de 1, sem contar o cabeçalho).
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    return await anyio.to_thread.run_sync(
+        lambda: importar_clientes(db, empresa, parse_rows(body, content_type))
+    )
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 def criar_cliente(
@@ -22,13 +108,6 @@ def criar_cliente(
     empresa: models.Empresa = Depends(require_authenticated_empresa),
     db: Session = Depends(get_tenant_db)
 ):
-    existente = db.query(models.Cliente).filter(
-        models.Cliente.empresa_id == empresa.id,
-        models.Cliente.telefone == cliente.telefone
-    ).first()
-    if existente:
-        raise HTTPException(status_code=400, detail="Cliente já cadastrado com este telefone.")
-
     check_plan_limits(empresa, "clientes", db=db)
 
     novo_cliente = models.Cliente(
@@ -38,6 +117,17 @@ def criar_cliente(
         anotacoes_rapidas=cliente.anotacoes_rapidas
     )
     db.add(novo_cliente)
+    try:
+        # Duplicata = conflito no índice único (empresa_id, telefone_normalizado).
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        if not violou_telefone_unico(exc):
+            raise
+        raise HTTPException(status_code=400, detail=TELEFONE_DUPLICADO)
+    rollups.registrar_cliente(db, novo_cliente)
+    registrar_uso(db, empresa.id, clientes=1)
     db.commit()
+    cache.invalidate_empresa(empresa.id)
     db.refresh(novo_cliente)
     return novo_cliente
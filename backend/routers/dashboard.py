@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, Query
-from backend import models, database
-from backend.dependencies import require_authenticated_empresa, get_tenant_db
+from backend import cache, models, database
+from backend.plan_limits import obter_uso
+from backend.dependencies import require_authenticated_empresa_async, get_tenant_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List
@@ -11,31 +13,33 @@ logger = logging.getLogger("clientflow.dashboard")
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 @router.get("")
-def obter_dashboard(
+async def obter_dashboard(
     period: str = Query("30d"),
-    empresa: models.Empresa = Depends(require_authenticated_empresa),
-    db: Session = Depends(get_tenant_db)
+    empresa: models.Empresa = Depends(require_authenticated_empresa_async),
+    db: AsyncSession = Depends(get_tenant_async_db)
 ):
     """
     Retorna estatísticas do dashboard filtradas por empresa
     """
     logger.info("Dashboard requisitado para empresa ID=%s (%s)", empresa.id, empresa.nome_empresa)
-    
-    # Total de clientes
-    total_clientes = db.query(models.Cliente).filter(
-        models.Cliente.empresa_id == empresa.id
-    ).count()
+    # As estatísticas não dependem do período, então a chave de cache não o inclui.
+    return await cache.get_or_compute_async(
+        empresa.id, "dashboard", None, lambda: db.run_sync(calcular_dashboard, empresa.id)
+    )
+
+
+def calcular_dashboard(db: Session, empresa_id: int) -> dict:
+    """Estatísticas de /api/dashboard, sem passar pelo cache."""
+    # Totais de clientes e atendimentos pelos contadores de uso_empresa (uma linha). O
+    # rollup diário não serve: linhas sem data não entram em metricas_diarias.
+    uso = obter_uso(db, empresa_id)
+    total_clientes, total_atendimentos = uso["clientes"], uso["atendimentos"]
     
     # Total de clientes ativos (com pelo menos um atendimento)
     total_clientes_ativos = db.query(func.count(func.distinct(models.Atendimento.cliente_id))).filter(
-        models.Atendimento.empresa_id == empresa.id
+        models.Atendimento.empresa_id == empresa_id
     ).scalar() or 0
     
-    # Total de atendimentos
-    total_atendimentos = db.query(models.Atendimento).filter(
-        models.Atendimento.empresa_id == empresa.id
-    ).count()
-    
     # Top clientes (clientes com mais atendimentos)
     top_clientes_data = db.query(
         models.Cliente.id,
@@ -44,8 +48,8 @@ def obter_dashboard(
     ).join(
         models.Atendimento, models.Atendimento.cliente_id == models.Cliente.id
     ).filter(
-        models.Cliente.empresa_id == empresa.id,
-        models.Atendimento.empresa_id == empresa.id
+        models.Cliente.empresa_id == empresa_id,
+        models.Atendimento.empresa_id == empresa_id
     ).group_by(
         models.Cliente.id, models.Cliente.nome
     ).order_by(
@@ -63,7 +67,7 @@ def obter_dashboard(
     
     logger.info(
         "Dashboard para empresa %s: %d clientes, %d ativos, %d atendimentos, %d top clientes",
-        empresa.id, total_clientes, total_clientes_ativos, total_atendimentos, len(top_clientes)
+        empresa_id, total_clientes, total_clientes_ativos, total_atendimentos, len(top_clientes)
     )
     
     return {
@@ -0,0 +1,131 @@
+"""
+Resumo financeiro da empresa, agregado no banco
+"""
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+import logging
+
+from backend import cache, models
+from backend.analytics import get_date_range, normalize_period
+from backend.dependencies import require_authenticated_empresa, get_tenant_db
+
+logger = logging.getLogger("clientflow.financeiro")
+
+router = APIRouter(prefix="/api/financeiro", tags=["financeiro"])
+
+SEM_FORMA_PAGAMENTO = "nao_informado"
+
+
+def _reais(centavos: int) -> float:
+    return round(centavos / 100, 2)
+
+
+def _bucket(destino: dict, chave: str, receita_centavos: int, atendimentos: int) -> None:
+    item = destino.setdefault(chave, {"receita_centavos": 0, "atendimentos": 0})
+    item["receita_centavos"] += receita_centavos
+    item["atendimentos"] += atendimentos
+
+
+def _listar(buckets: dict, nome: str) -> list:
+    return [
+        {nome: chave, "receita": _reais(v["receita_centavos"]), "atendimentos": v["atendimentos"]}
+        for chave, v in buckets.items()
+    ]
+
+
+def calcular_resumo(
+    db: Session,
+    empresa_id: int,
+    data_de: Optional[datetime] = None,
+    data_ate: Optional[datetime] = None,
+) -> dict:
+    """Receita total, por status, por forma de pagamento e por mês em [data_de, data_ate).
+
+    Uma única consulta agrupada sobre valor_centavos (já convertido com as regras de
+    `analytics.parse_brl_number` na escrita/backfill); os quatro cortes saem dela.
+    """
+    A = models.Atendimento
+    ano = extract("year", A.data_atendimento)
+    mes = extract("month", A.data_atendimento)
+    query = db.query(
+        A.status_atendimento,
+        A.forma_pagamento,
+        ano,
+        mes,
+        func.coalesce(func.sum(A.valor_centavos), 0),
+        func.count(A.id),
+        func.count(A.valor_centavos),
+    ).filter(A.empresa_id == empresa_id)
+    if data_de is not None:
+        query = query.filter(A.data_atendimento >= data_de)
+    if data_ate is not None:
+        query = query.filter(A.data_atendimento < data_ate)
+    linhas = query.group_by(A.status_atendimento, A.forma_pagamento, ano, mes).all()
+
+    total_centavos = 0
+    total_atendimentos = 0
+    com_valor = 0
+    por_status: dict = {}
+    por_forma: dict = {}
+    por_mes: dict = {}
+    for status_atendimento, forma_pagamento, a, m, centavos, quantidade, valorados in linhas:
+        centavos = int(centavos or 0)
+        quantidade = int(quantidade)
+        total_centavos += centavos
+        total_atendimentos += quantidade
+        com_valor += int(valorados)
+        _bucket(por_status, str(status_atendimento or "pendente").lower().strip(), centavos, quantidade)
+        _bucket(por_forma, str(forma_pagamento or SEM_FORMA_PAGAMENTO).lower().strip(), centavos, quantidade)
+        if a is not None and m is not None:
+            _bucket(por_mes, f"{int(a):04d}-{int(m):02d}", centavos, quantidade)
+
+    return {
+        "periodo": {
+            "de": data_de.isoformat() if data_de else None,
+            "ate": data_ate.isoformat() if data_ate else None,
+        },
+        "receita_total": _reais(total_centavos),
+        "atendimentos": total_atendimentos,
+        "atendimentos_sem_valor": total_atendimentos - com_valor,
+        "por_status": _listar(por_status, "status"),
+        "por_forma_pagamento": _listar(por_forma, "forma_pagamento"),
+        "por_mes": _listar(dict(sorted(por_mes.items())), "mes"),
+    }
+
+
+@router.get("/resumo")
+def obter_resumo(
+    period: Optional[str] = Query(None),
+    data_de: Optional[datetime] = Query(None, alias="from"),
+    data_ate: Optional[datetime] = Query(None, alias="to"),
+    empresa: models.Empresa = Depends(require_authenticated_empresa),
+    db: Session = Depends(get_tenant_db),
+):
+    """
+    Resumo financeiro da empresa.
+
+    Intervalo por `period` (today, 7d, 30d, month) ou por `from`/`to` (semiaberto em
+    data_atendimento); sem nenhum dos dois considera todo o histórico.
+    """
+    if period and (data_de or data_ate):
+        raise HTTPException(status_code=400, detail="Use period ou from/to, não ambos.")
+
+    if period:
+        period_key = normalize_period(period)
+        chave = period_key
+        dr = get_date_range(period_key)
+        data_de, data_ate = dr.start_date, None
+    else:
+        chave = f"{data_de.isoformat() if data_de else ''}..{data_ate.isoformat() if data_ate else ''}"
+
+    logger.info("Resumo financeiro requisitado para empresa ID=%s (%s)", empresa.id, chave)
+    return cache.get_or_compute(
+        empresa.id,
+        "financeiro",
+        chave,
+        lambda: calcular_resumo(db, empresa.id, data_de, data_ate),
+    )
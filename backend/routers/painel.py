@@ -0,0 +1,127 @@
+"""
+Endpoint agregado do Painel: tudo o que a página renderiza em uma requisição
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import logging
+
+from backend import cache, models
+from backend.analytics import compute_dashboard_analytics, get_date_range, normalize_period
+from backend.dependencies import require_authenticated_empresa_async, get_tenant_async_db
+from backend.routers.dashboard import calcular_dashboard
+from backend.schemas import EmpresaOut
+
+logger = logging.getLogger("clientflow.painel")
+
+router = APIRouter(prefix="/api/painel", tags=["painel"])
+
+# Buckets sempre presentes no gráfico de status, na ordem exibida pelo Painel.
+STATUS_BASE = ("pendente", "em andamento", "concluido", "entregue")
+CLIENTES_RECENTES_LIMIT = 6
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _atendimento_resumo(a) -> dict:
+    return {
+        "id": a.id,
+        "cliente_id": a.cliente_id,
+        "tipo_servico": a.tipo_servico,
+        "status_atendimento": a.status_atendimento,
+        "data_atendimento": _iso(a.data_atendimento),
+    }
+
+
+def calcular_painel(db: Session, empresa_id: int, recentes: int) -> dict:
+    """Buckets de status, atendimentos/clientes recentes e atendimento em andamento."""
+    A = models.Atendimento
+    C = models.Cliente
+
+    buckets = {status: 0 for status in STATUS_BASE}
+    for status_atendimento, total in (
+        db.query(A.status_atendimento, func.count(A.id))
+        .filter(A.empresa_id == empresa_id)
+        .group_by(A.status_atendimento)
+        .all()
+    ):
+        key = str(status_atendimento or "pendente").lower().strip()
+        buckets[key] = buckets.get(key, 0) + int(total)
+
+    colunas = (A.id, A.cliente_id, A.tipo_servico, A.status_atendimento, A.data_atendimento)
+    atendimentos_recentes = (
+        db.query(*colunas)
+        .filter(A.empresa_id == empresa_id)
+        .order_by(A.data_atendimento.desc(), A.id.desc())
+        .limit(recentes)
+        .all()
+    )
+    ativo = (
+        db.query(*colunas)
+        .filter(A.empresa_id == empresa_id, func.lower(A.status_atendimento).like("%andamento%"))
+        .order_by(A.data_atendimento.desc(), A.id.desc())
+        .first()
+    )
+    clientes_recentes = (
+        db.query(C.id, C.nome, C.telefone, C.status_cliente, C.score_atividade)
+        .filter(C.empresa_id == empresa_id)
+        .order_by(C.data_primeiro_contato.desc(), C.id.desc())
+        .limit(CLIENTES_RECENTES_LIMIT)
+        .all()
+    )
+
+    return {
+        "status_atendimentos": buckets,
+        "atendimentos_recentes": [_atendimento_resumo(a) for a in atendimentos_recentes],
+        "atendimento_ativo": _atendimento_resumo(ativo) if ativo else None,
+        "clientes_recentes": [
+            {
+                "id": c.id,
+                "nome": c.nome,
+                "telefone": c.telefone,
+                "status_cliente": c.status_cliente,
+                "score_atividade": c.score_atividade,
+            }
+            for c in clientes_recentes
+        ],
+    }
+
+
+@router.get("")
+async def obter_painel(
+    period: str = Query("30d"),
+    recentes: int = Query(5, ge=1, le=50),
+    empresa: models.Empresa = Depends(require_authenticated_empresa_async),
+    db: AsyncSession = Depends(get_tenant_async_db),
+):
+    """
+    Bootstrap do Painel: empresa, métricas do período, séries, estatísticas, top clientes,
+    buckets de status e itens recentes, com uma autenticação e uma sessão de banco.
+
+    Reaproveita as mesmas entradas de cache de /api/dashboard e /api/dashboard/analytics.
+    """
+    logger.info("Painel requisitado para empresa ID=%s, period=%s", empresa.id, period)
+    period_key = normalize_period(period)
+    analytics = await cache.get_or_compute_async(
+        empresa.id,
+        "analytics",
+        period_key,
+        lambda: db.run_sync(compute_dashboard_analytics, empresa.id, get_date_range(period_key)),
+    )
+    dashboard = await cache.get_or_compute_async(
+        empresa.id, "dashboard", None, lambda: db.run_sync(calcular_dashboard, empresa.id)
+    )
+    painel = await cache.get_or_compute_async(
+        empresa.id, "painel", str(recentes), lambda: db.run_sync(calcular_painel, empresa.id, recentes)
+    )
+
+    return {
+        "empresa": EmpresaOut.model_validate(empresa).model_dump(),
+        "period": period_key,
+        **analytics,
+        **dashboard,
+        **painel,
+    }
@@ -18,6 +18,15 @@ class EmpresaOut(BaseModel):
         "from_attributes": True
     }
 
+class UsoEmpresaOut(BaseModel):
+    clientes: int
+    atendimentos: int
+
+
+class EmpresaMeOut(EmpresaOut):
+    uso: UsoEmpresaOut
+
+
 class EmpresaLogin(BaseModel):
     email_login: EmailStr
     senha: str
@@ -126,11 +135,15 @@ class ClienteOut(BaseModel):
     nome: str
     telefone: str
     anotacoes_rapidas: str = ""
-    data_primeiro_contato: datetime
+    data_primeiro_contato: datetime | None = None
     model_config = {
         "from_attributes": True
     }
 
+class ClientePage(BaseModel):
+    items: list[ClienteOut]
+    next_cursor: str | None = None
+
 class PerguntaIA(BaseModel):
     pergunta: str = Field(min_length=3, max_length=1000, description="Pergunta para a IA")
     
@@ -1,48 +1,116 @@
 """
 Camada de serviços para regras de negócio, inteligência e automações do ClientFlow
 """
+import os
 from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from backend import models
+from backend import cache, models
 
-def classificar_cliente(cliente: models.Cliente, db: Session):
+# Clientes lidos/atualizados por vez na reclassificação em massa
+CLASSIFICACAO_CHUNK_SIZE = int(os.getenv("CLASSIFICACAO_CHUNK_SIZE", "1000"))
+
+
+def _como_utc(value: datetime) -> datetime:
+    # SQLite devolve datetimes sem fuso; as datas são gravadas em UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def regras_classificacao(total: int, ultimo_atendimento: Optional[datetime], agora: datetime) -> dict:
     """
-    Atualiza status_cliente, nivel_atividade, score_atividade e importante
+    status_cliente, nivel_atividade, score_atividade e importante a partir do total de
+    atendimentos e da data do mais recente (mesmas regras para um cliente ou para todos)
     """
-    atendimentos = db.query(models.Atendimento).filter(models.Atendimento.cliente_id == cliente.id, models.Atendimento.empresa_id == cliente.empresa_id).all()
-    total = len(atendimentos)
     if total == 0:
-        cliente.status_cliente = "novo"
-        cliente.nivel_atividade = "baixo"
-        cliente.score_atividade = 0
-        cliente.importante = 0
-        return
-    datas = [a.data_atendimento for a in atendimentos if a.data_atendimento]
-    datas.sort(reverse=True)
-    meses_sem_retorno = (datetime.now(timezone.utc) - datas[0]).days // 30 if datas else 99
+        return {"status_cliente": "novo", "nivel_atividade": "baixo", "score_atividade": 0, "importante": 0}
+    if ultimo_atendimento is not None:
+        meses_sem_retorno = (agora - _como_utc(ultimo_atendimento)).days // 30
+    else:
+        meses_sem_retorno = 99
     if total >= 5:
-        cliente.status_cliente = "frequente"
-        cliente.nivel_atividade = "alto"
-        cliente.importante = 1
+        status, nivel, importante = "frequente", "alto", 1
     elif meses_sem_retorno >= 6:
-        cliente.status_cliente = "inativo"
-        cliente.nivel_atividade = "baixo"
-        cliente.importante = 0
+        status, nivel, importante = "inativo", "baixo", 0
     elif meses_sem_retorno <= 2:
-        cliente.status_cliente = "recente"
-        cliente.nivel_atividade = "medio"
-        cliente.importante = 0
+        status, nivel, importante = "recente", "medio", 0
     else:
-        cliente.status_cliente = "ativo"
-        cliente.nivel_atividade = "medio"
-        cliente.importante = 0
-    cliente.score_atividade = min(100, total * 20 - meses_sem_retorno * 5)
-
-def atualizar_status_todos_clientes(empresa_id: int, db: Session):
-    clientes = db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa_id).all()
-    for cliente in clientes:
-        classificar_cliente(cliente, db)
+        status, nivel, importante = "ativo", "medio", 0
+    return {
+        "status_cliente": status,
+        "nivel_atividade": nivel,
+        "score_atividade": min(100, total * 20 - meses_sem_retorno * 5),
+        "importante": importante,
+    }
+
+
+def classificar_cliente(cliente: models.Cliente, db: Session):
+    """
+    Atualiza status_cliente, nivel_atividade, score_atividade e importante
+    """
+    a = models.Atendimento
+    total, ultimo = db.execute(
+        select(func.count(a.id), func.max(a.data_atendimento))
+        .where(a.cliente_id == cliente.id, a.empresa_id == cliente.empresa_id)
+    ).one()
+    for campo, valor in regras_classificacao(total, ultimo, datetime.now(timezone.utc)).items():
+        setattr(cliente, campo, valor)
+
+
+def atualizar_status_todos_clientes(empresa_id: int, db: Session, chunk_size: int = None) -> int:
+    """
+    Reclassifica todos os clientes da empresa com uma única consulta agregada (total e
+    último atendimento por cliente), lida em lotes, e UPDATEs em lote por id só das
+    linhas que mudaram. Retorna quantos clientes foram atualizados.
+
+    O UPDATE também filtra por empresa_id: não sai do tenant e marca a empresa para o
+    read-your-writes da réplica (ver backend.replica). Se algum cliente mudou, as
+    respostas em cache da empresa (painel, dashboard) são invalidadas após o commit.
+    """
+    chunk_size = chunk_size or CLASSIFICACAO_CHUNK_SIZE
+    c = models.Cliente
+    a = models.Atendimento
+    campos = ("status_cliente", "nivel_atividade", "score_atividade", "importante")
+    agregado = (
+        select(a.cliente_id, func.count().label("total"), func.max(a.data_atendimento).label("ultimo"))
+        .where(a.empresa_id == empresa_id)
+        .group_by(a.cliente_id)
+        .subquery()
+    )
+    consulta = (
+        select(
+            c.id,
+            *(getattr(c, campo) for campo in campos),
+            func.coalesce(agregado.c.total, 0).label("total"),
+            agregado.c.ultimo,
+        )
+        .outerjoin(agregado, agregado.c.cliente_id == c.id)
+        .where(c.empresa_id == empresa_id)
+        .order_by(c.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    agora = datetime.now(timezone.utc)
+    atualizados = 0
+    for lote in db.execute(consulta).partitions():
+        mudancas = []
+        for row in lote:
+            novos = regras_classificacao(row.total, row.ultimo, agora)
+            if any(getattr(row, campo) != valor for campo, valor in novos.items()):
+                mudancas.append({"id": row.id, **novos})
+        if mudancas:
+            # O commit no fim expira os objetos carregados; não há o que sincronizar.
+            db.execute(
+                update(c).where(c.empresa_id == empresa_id).execution_options(synchronize_session=None),
+                mudancas,
+            )
+            atualizados += len(mudancas)
     db.commit()
+    if atualizados:
+        cache.invalidate_empresa(empresa_id)
+    return atualizados
+
 
 def log_acao(empresa_id: int, usuario: str, acao: str, _db: Session = None):
     # Placeholder para logs, pode ser expandido para salvar em tabela/logfile
@@ -1,7 +1,12 @@
-from typing import Optional
+from collections import OrderedDict
+from typing import Iterable, Optional
 import os
+import hashlib
 import logging
+import random
 import secrets
+import threading
+import time
 from datetime import timedelta
 from backend.redis_client import get_redis
 
@@ -9,6 +14,130 @@ logger = logging.getLogger("clientflow.sessions")
 
 # Session TTL in seconds (default 7 days)
 SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+# Keys per MGET/DEL round trip when revoking all sessions of an empresa
+REVOKE_BATCH_SIZE = 500
+# Fraction of create_session calls that also drop expired tokens from the empresa index
+INDEX_PRUNE_PROBABILITY = 0.02
+
+# In-process near cache of token -> empresa_id (0 disables). Entries are only served
+# while this process is subscribed to the revocation channel, so a revoke_session in
+# any worker evicts them; the short TTL bounds staleness if a message is lost.
+SESSION_NEAR_CACHE_TTL = float(os.getenv("SESSION_NEAR_CACHE_TTL_SECONDS", "5"))
+SESSION_NEAR_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_NEAR_CACHE_MAX_ENTRIES", "10000"))
+REVOCATION_CHANNEL = "sessions:revoked"
+_EMPRESA_INDEX_PREFIX = "sessions:empresa:"
+
+# KEYS[1] = session:{token}; ARGV = TTL, empresa index prefix. GETEX plus the EXPIRE of
+# the empresa index in one round trip; the index name is built from the session value
+# (standalone Redis; not compatible with Redis Cluster).
+_LOOKUP_LUA = """
+local value = redis.call('GETEX', KEYS[1], 'EX', ARGV[1])
+if value and tonumber(value) then
+  redis.call('EXPIRE', ARGV[2] .. value, ARGV[1])
+end
+return value
+"""
+
+_near_lock = threading.Lock()
+_near: "OrderedDict[str, tuple]" = OrderedDict()
+_subscriber = None
+_lookup_script = None
+
+
+def _session_key(token: str) -> str:
+    return f"session:{token}"
+
+
+def _empresa_index_key(empresa_id: int) -> str:
+    # Set of the empresa's session tokens. Its expiry is pushed to SESSION_TTL on every
+    # add and every session lookup, so it outlives each member's sliding TTL and an
+    # idle empresa's set still goes away. Expired members are pruned lazily.
+    return f"{_EMPRESA_INDEX_PREFIX}{empresa_id}"
+
+
+def _token_digest(token: str) -> str:
+    # Near cache and revocation messages use a hash so raw tokens never leave Redis keys.
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _near_get(digest: str) -> Optional[int]:
+    with _near_lock:
+        item = _near.get(digest)
+        if item is None:
+            return None
+        expires_at, empresa_id = item
+        if expires_at < time.monotonic():
+            del _near[digest]
+            return None
+        _near.move_to_end(digest)
+        return empresa_id
+
+
+def _near_set(digest: str, empresa_id: int) -> None:
+    with _near_lock:
+        _near[digest] = (time.monotonic() + SESSION_NEAR_CACHE_TTL, empresa_id)
+        _near.move_to_end(digest)
+        while len(_near) > SESSION_NEAR_CACHE_MAX_ENTRIES:
+            _near.popitem(last=False)
+
+
+def _near_evict(digests: Iterable[str]) -> None:
+    with _near_lock:
+        for digest in digests:
+            _near.pop(digest, None)
+
+
+def clear_near_cache() -> None:
+    with _near_lock:
+        _near.clear()
+
+
+def _on_revoked(message) -> None:
+    _near_evict(str(message["data"]).split(","))
+
+
+def _on_subscriber_error(exc, pubsub, thread) -> None:
+    # Without the subscription revocations could be missed: drop the cache and let the
+    # next lookup resubscribe.
+    global _subscriber
+    logger.warning("Session revocation subscriber stopped: %s", exc)
+    clear_near_cache()
+    _subscriber = None
+    thread.stop()
+
+
+def _near_cache_ready(r) -> bool:
+    """True while the revocation subscriber is running (starting it if needed)."""
+    global _subscriber
+    if SESSION_NEAR_CACHE_TTL <= 0:
+        return False
+    if _subscriber is not None and _subscriber.is_alive():
+        return True
+    with _near_lock:
+        if _subscriber is None or not _subscriber.is_alive():
+            _near.clear()
+            try:
+                pubsub = r.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{REVOCATION_CHANNEL: _on_revoked})
+                _subscriber = pubsub.run_in_thread(
+                    sleep_time=0.5, daemon=True, exception_handler=_on_subscriber_error
+                )
+            except Exception as e:
+                logger.debug("Could not subscribe to %s: %s", REVOCATION_CHANNEL, e)
+                _subscriber = None
+                return False
+    return True
+
+
+def _publish_revoked(r, tokens: Iterable[str]) -> None:
+    digests = [_token_digest(t) for t in tokens]
+    if not digests:
+        return
+    _near_evict(digests)
+    try:
+        r.publish(REVOCATION_CHANNEL, ",".join(digests))
+    except Exception as e:
+        logger.warning("Could not publish session revocation: %s", e)
 
 
 def create_session(empresa_id: int) -> str:
@@ -18,70 +147,149 @@ def create_session(empresa_id: int) -> str:
     """
     r = get_redis()
     token = secrets.token_urlsafe(32)
-    key = f"session:{token}"
+    index = _empresa_index_key(empresa_id)
     try:
-        r.set(key, str(empresa_id), ex=SESSION_TTL)
+        pipe = r.pipeline(transaction=True)
+        pipe.set(_session_key(token), str(empresa_id), ex=SESSION_TTL)
+        pipe.sadd(index, token)
+        pipe.expire(index, SESSION_TTL)
+        pipe.execute()
     except Exception as e:
         logger.exception("Failed to create session in Redis: %s", e)
         raise
+    if random.random() < INDEX_PRUNE_PROBABILITY:
+        prune_session_index(empresa_id)
     return token
 
 
 def get_session_empresa(token: str) -> Optional[int]:
     """Return empresa_id associated with `token`, or None if not found/invalid.
 
-    Access refreshes the TTL for the session.
+    Access refreshes the TTL of the session and of the empresa index (GETEX and EXPIRE
+    in one Lua call: one round trip). Hot tokens are answered from the in-process near
+    cache without touching Redis.
     """
+    global _lookup_script
     r = get_redis()
-    key = f"session:{token}"
+    key = _session_key(token)
+    digest = _token_digest(token)
+    use_near_cache = _near_cache_ready(r)
+    if use_near_cache:
+        cached = _near_get(digest)
+        if cached is not None:
+            return cached
     try:
-        val = r.get(key)
+        if _lookup_script is None:
+            _lookup_script = r.register_script(_LOOKUP_LUA)
+        val = _lookup_script(keys=[key], args=[SESSION_TTL, _EMPRESA_INDEX_PREFIX], client=r)
     except Exception as e:
         logger.exception("Redis error on get_session_empresa: %s", e)
         return None
     if val is None:
         return None
-    # refresh TTL on access
-    try:
-        r.expire(key, SESSION_TTL)
-    except Exception:
-        logger.debug("Could not refresh session TTL for key %s", key)
     try:
-        return int(val)
+        empresa_id = int(val)
     except Exception:
         logger.debug("Invalid session value for key %s: %r", key, val)
         return None
+    if use_near_cache:
+        _near_set(digest, empresa_id)
+    return empresa_id
 
 
 def revoke_session(token: str) -> None:
     """Remove a single session token."""
     r = get_redis()
-    key = f"session:{token}"
+    key = _session_key(token)
     try:
-        r.delete(key)
+        val = r.getdel(key)
+        if val is not None:
+            r.srem(_empresa_index_key(int(val)), token)
     except Exception as e:
         logger.exception("Failed to delete session %s: %s", key, e)
+    _publish_revoked(r, [token])
+
+
+def _scan_index(r, empresa_id: int, revoke: bool) -> int:
+    """Walk the empresa index in batches: MGET the sessions, drop members that already
+    expired and, when `revoke` is set, delete the live ones too. Returns how many live
+    sessions were deleted."""
+    index = _empresa_index_key(empresa_id)
+    tokens = list(r.smembers(index))
+    revoked = 0
+    for start in range(0, len(tokens), REVOKE_BATCH_SIZE):
+        batch = tokens[start:start + REVOKE_BATCH_SIZE]
+        values = r.mget([_session_key(t) for t in batch])
+        live = [t for t, v in zip(batch, values) if v == str(empresa_id)]
+        stale = [t for t, v in zip(batch, values) if v != str(empresa_id)]
+        pipe = r.pipeline(transaction=False)
+        if revoke and live:
+            pipe.delete(*[_session_key(t) for t in live])
+            stale = batch
+        if stale:
+            pipe.srem(index, *stale)
+        results = pipe.execute()
+        if revoke and live:
+            revoked += results[0]
+            _publish_revoked(r, live)
+    return revoked
+
+
+def prune_session_index(empresa_id: int) -> None:
+    """Drop tokens of expired sessions from the empresa index (lazy cleanup)."""
+    try:
+        _scan_index(get_redis(), empresa_id, revoke=False)
+    except Exception as e:
+        logger.debug("Could not prune session index for empresa %s: %s", empresa_id, e)
 
 
 def revoke_all_sessions_for_empresa(empresa_id: int) -> int:
     """Revoke all sessions for a given `empresa_id`.
 
     Returns the number of revoked sessions.
-    Note: uses `SCAN` which is safe for production; avoid `KEYS`.
+    Only reads the empresa's own index set (pipelined MGET/DEL in batches), so the cost
+    follows that tenant's session count, not the whole keyspace.
     """
-    r = get_redis()
-    pattern = "session:*"
-    revoked = 0
     try:
-        for k in r.scan_iter(match=pattern):
-            try:
-                val = r.get(k)
-                if val and int(val) == empresa_id:
-                    r.delete(k)
-                    revoked += 1
-            except Exception:
-                # skip malformed values
-                continue
+        return _scan_index(get_redis(), empresa_id, revoke=True)
     except Exception as e:
         logger.exception("Error while revoking sessions for empresa %s: %s", empresa_id, e)
-    return revoked
+        return 0
+
+
+def index_legacy_sessions(batch_size: int = REVOKE_BATCH_SIZE) -> int:
+    """Add sessions created before the per-empresa index existed to their index.
+
+    One-off SCAN over session:* (run once after deploying the index, see
+    backend/jobs.py). Without it, revoke_all_sessions_for_empresa misses those
+    sessions, and GETEX keeps them alive as long as they are used. Idempotent.
+    Returns the number of sessions indexed.
+    """
+    r = get_redis()
+    indexed = 0
+    batch = []
+
+    def flush() -> int:
+        values = r.mget(batch)
+        pipe = r.pipeline(transaction=False)
+        count = 0
+        for key, value in zip(batch, values):
+            try:
+                empresa_id = int(value)
+            except (TypeError, ValueError):
+                continue
+            index = _empresa_index_key(empresa_id)
+            pipe.sadd(index, key[len(_session_key("")):])
+            pipe.expire(index, SESSION_TTL)
+            count += 1
+        pipe.execute()
+        return count
+
+    for key in r.scan_iter(match=_session_key("*"), count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            indexed += flush()
+            batch = []
+    if batch:
+        indexed += flush()
+    return indexed
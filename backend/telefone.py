@@ -0,0 +1,45 @@
+"""
+Normalização de telefones para busca e deduplicação
+"""
+import re
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+# DDD + número (fixo com 8 dígitos ou celular com 9), sem o código do país
+_BR_NATIONAL_LENGTHS = (10, 11)
+BR_COUNTRY_CODE = "55"
+
+TELEFONE_DUPLICADO = "Cliente já cadastrado com este telefone."
+# Índice único (empresa_id, telefone_normalizado), ver backend.models
+TELEFONE_UNICO = "uq_clientes_empresa_telefone_normalizado"
+
+
+def normalizar_telefone(value: Optional[str]) -> Optional[str]:
+    """Só dígitos, com o código do país (E.164 sem o "+").
+
+    "(11) 99999-9999", "011 99999-9999" e "+55 11 99999-9999" viram "5511999999999".
+    Números nacionais (10 ou 11 dígitos após remover o 0 de tronco) recebem o 55; com
+    "+" ou de outro tamanho ficam como vieram. Sem nenhum dígito, devolve None.
+    """
+    international = (value or "").strip().startswith("+")
+    digits = re.sub(r"\D", "", value or "").lstrip("0")
+    if not international and len(digits) in _BR_NATIONAL_LENGTHS:
+        digits = BR_COUNTRY_CODE + digits
+    return digits or None
+
+
+def violou_telefone_unico(exc: IntegrityError) -> bool:
+    """True se a IntegrityError veio do índice único (empresa_id, telefone_normalizado).
+
+    Postgres informa o nome da constraint (psycopg2: diag.constraint_name; asyncpg:
+    constraint_name na exceção original); o SQLite só cita as colunas na mensagem."""
+    orig = exc.orig
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or getattr(
+        getattr(orig, "__cause__", None), "constraint_name", None
+    )
+    if constraint is not None:
+        return constraint == TELEFONE_UNICO
+    mensagem = str(orig)
+    return TELEFONE_UNICO in mensagem or "clientes.empresa_id, clientes.telefone_normalizado" in mensagem
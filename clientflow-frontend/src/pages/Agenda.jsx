@@ -1,5 +1,5 @@
 import { useState, useEffect, useMemo } from 'react'
-import api from '../services/api'
+import { getAllPages } from '../services/api'
 
 const STATUS_COLOR = {
   novo: 'status-new',
@@ -22,11 +22,11 @@ export default function Agenda() {
 
   useEffect(() => {
     Promise.all([
-      api.get('/atendimentos'),
-      api.get('/clientes')
-    ]).then(([aR, cR]) => {
-      setAtendimentos(Array.isArray(aR.data) ? aR.data : [])
-      setClientes(Array.isArray(cR.data) ? cR.data : [])
+      getAllPages('/atendimentos'),
+      getAllPages('/clientes')
+    ]).then(([at, cl]) => {
+      setAtendimentos(at)
+      setClientes(cl)
     }).catch(() => {}).finally(() => setLoading(false))
   }, [])
 
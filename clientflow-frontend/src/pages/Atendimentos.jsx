@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react'
-import api from '../services/api'
+import api, { getAllPages } from '../services/api'
 
 const STATUS_COLOR = {
   novo: 'status-new',
@@ -29,12 +29,12 @@ export default function Atendimentos() {
   const fetchData = useCallback(async () => {
     try {
       setLoading(true)
-      const [atResp, clResp] = await Promise.all([
-        api.get('/atendimentos'),
-        api.get('/clientes')
+      const [at, cl] = await Promise.all([
+        getAllPages('/atendimentos'),
+        getAllPages('/clientes')
       ])
-      setAtendimentos(Array.isArray(atResp.data) ? atResp.data : [])
-      setClientes(Array.isArray(clResp.data) ? clResp.data : [])
+      setAtendimentos(at)
+      setClientes(cl)
       setError('')
     } catch (err) {
       if (err.response?.status !== 401) {
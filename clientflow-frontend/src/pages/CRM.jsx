@@ -1,5 +1,5 @@
 import { useState, useEffect, useContext, useCallback } from 'react'
-import api from '../services/api'
+import api, { getAllPages } from '../services/api'
 import AuthContext from '../context/AuthContext'
 
 const STATUS_COLOR = {
@@ -29,8 +29,7 @@ export default function CRM() {
   const fetchClientes = useCallback(async () => {
     try {
       setLoading(true)
-      const resp = await api.get('/clientes')
-      setClientes(Array.isArray(resp.data) ? resp.data : [])
+      setClientes(await getAllPages('/clientes'))
       setError('')
     } catch (err) {
       if (err.response?.status !== 401) {
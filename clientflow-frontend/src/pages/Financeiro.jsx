@@ -4,19 +4,19 @@ import api from '../services/api'
 const moneyBR = (v) => new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' }).format(Number(v) || 0)
 
 export default function Financeiro() {
-  const [atendimentos, setAtendimentos] = useState([])
+  const [resumo, setResumo] = useState(null)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    api.get('/atendimentos')
-      .then(r => setAtendimentos(Array.isArray(r.data) ? r.data : []))
+    api.get('/financeiro/resumo')
+      .then(r => setResumo(r.data))
       .catch(() => {})
       .finally(() => setLoading(false))
   }, [])
 
-  const total = atendimentos.reduce((s, a) => s + (parseFloat(a.valor_cobrado) || 0), 0)
-  const concluidos = atendimentos.filter(a => String(a.status_atendimento || '').toLowerCase() === 'concluido')
-  const pendentes = atendimentos.filter(a => String(a.status_atendimento || '').toLowerCase() === 'pendente')
+  const porStatus = resumo?.por_status || []
+  const contarStatus = (status) => porStatus.find(s => s.status === status)?.atendimentos || 0
+  const totalAtendimentos = resumo?.atendimentos || 0
 
   return (
     <>
@@ -31,17 +31,17 @@ export default function Financeiro() {
       <section className="kpi-grid">
         <article className="cf-panel kpi-card kpi-green">
           <header className="kpi-head"><span className="kpi-title">Faturamento Total</span></header>
-          <p className="kpi-value">{moneyBR(total)}</p>
-          <p className="kpi-subtitle">{atendimentos.length} atendimentos</p>
+          <p className="kpi-value">{moneyBR(resumo?.receita_total)}</p>
+          <p className="kpi-subtitle">{totalAtendimentos} atendimentos</p>
         </article>
         <article className="cf-panel kpi-card kpi-blue">
           <header className="kpi-head"><span className="kpi-title">Concluídos</span></header>
-          <p className="kpi-value">{concluidos.length}</p>
+          <p className="kpi-value">{contarStatus('concluido')}</p>
           <p className="kpi-subtitle">atendimentos finalizados</p>
         </article>
         <article className="cf-panel kpi-card kpi-amber">
           <header className="kpi-head"><span className="kpi-title">Pendentes</span></header>
-          <p className="kpi-value">{pendentes.length}</p>
+          <p className="kpi-value">{contarStatus('pendente')}</p>
           <p className="kpi-subtitle">aguardando conclusão</p>
         </article>
       </section>
@@ -52,10 +52,21 @@ export default function Financeiro() {
           </header>
           {loading ? (
             <p style={{ color: '#9eb5df', padding: '2rem', textAlign: 'center' }}>Carregando...</p>
-          ) : atendimentos.length === 0 ? (
+          ) : totalAtendimentos === 0 ? (
             <p style={{ color: '#9eb5df', padding: '2rem', textAlign: 'center' }}>Nenhum atendimento registrado ainda.</p>
           ) : (
-            <p style={{ color: '#a8c1e7', padding: '1rem' }}>Dados sendo calculados com base nos {atendimentos.length} atendimentos registrados.</p>
+            <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(220px, 1fr))', gap: '1rem', padding: '1rem', color: '#a8c1e7' }}>
+              {[['Por mês', resumo.por_mes, 'mes'], ['Por forma de pagamento', resumo.por_forma_pagamento, 'forma_pagamento'], ['Por status', porStatus, 'status']].map(([titulo, itens, campo]) => (
+                <div key={campo}>
+                  <h3>{titulo}</h3>
+                  <ul>
+                    {itens.map(item => (
+                      <li key={item[campo]}>{item[campo]}: {moneyBR(item.receita)} ({item.atendimentos})</li>
+                    ))}
+                  </ul>
+                </div>
+              ))}
+            </div>
           )}
         </article>
       </section>
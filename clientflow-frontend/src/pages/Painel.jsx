@@ -92,11 +92,7 @@ export default function PainelPage() {
   const [period, setPeriod] = useState('30d')
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
-  const [empresa, setEmpresa] = useState(null)
-  const [analytics, setAnalytics] = useState(null)
-  const [dashboardData, setDashboardData] = useState(null)
-  const [atendimentos, setAtendimentos] = useState([])
-  const [clientes, setClientes] = useState([])
+  const [painel, setPainel] = useState(null)
 
   const { token, logout } = useContext(AuthContext)
 
@@ -111,19 +107,9 @@ export default function PainelPage() {
       setLoading(true)
       setError('')
 
-      const [empresaResp, analyticsResp, dashboardResp, atendimentosResp, clientesResp] = await Promise.all([
-        api.get('/empresas/me'),
-        api.get('/dashboard/analytics', { params: { period } }),
-        api.get('/dashboard', { params: { period } }),
-        api.get('/atendimentos'),
-        api.get('/clientes')
-      ])
-
-      setEmpresa(empresaResp.data)
-      setAnalytics(analyticsResp.data)
-      setDashboardData(dashboardResp.data)
-      setAtendimentos(Array.isArray(atendimentosResp.data) ? atendimentosResp.data : [])
-      setClientes(Array.isArray(clientesResp.data) ? clientesResp.data : [])
+      // Um unico request: o backend devolve exatamente o que o painel renderiza.
+      const { data } = await api.get('/painel', { params: { period } })
+      setPainel(data)
     } catch (err) {
       console.error('[Painel] Erro ao carregar dashboard:', err)
       // AxiosBridge já trata 401 com refresh automático.
@@ -141,11 +127,14 @@ export default function PainelPage() {
     fetchData()
   }, [fetchData])
 
-  const revenueMetric = analytics?.metrics?.revenue
-  const clientsMetric = analytics?.metrics?.clients
-  const appointmentsMetric = analytics?.metrics?.appointments
+  const empresa = painel?.empresa
+  const dashboardData = painel
+  const revenueMetric = painel?.metrics?.revenue
+  const clientsMetric = painel?.metrics?.clients
+  const appointmentsMetric = painel?.metrics?.appointments
+  const totalClientes = painel?.estatisticas?.total_clientes
 
-  const revenueSeries = analytics?.revenue_series || []
+  const revenueSeries = painel?.revenue_series || []
   const revenueChartData = useMemo(
     () => ({
       labels: revenueSeries.map((item) => safeDateShort(item.date)),
@@ -188,15 +177,10 @@ export default function PainelPage() {
     []
   )
 
-  const statusBuckets = useMemo(() => {
-    const base = { pendente: 0, 'em andamento': 0, concluido: 0, entregue: 0 }
-    atendimentos.forEach((item) => {
-      const key = String(item?.status_atendimento || 'pendente').toLowerCase().trim()
-      if (base[key] === undefined) base[key] = 0
-      base[key] += 1
-    })
-    return base
-  }, [atendimentos])
+  const statusBuckets = useMemo(
+    () => ({ pendente: 0, 'em andamento': 0, concluido: 0, entregue: 0, ...(painel?.status_atendimentos || {}) }),
+    [painel]
+  )
 
   const statusChartData = useMemo(
     () => ({
@@ -227,20 +211,9 @@ export default function PainelPage() {
     []
   )
 
-  const agenda = useMemo(() => {
-    return [...atendimentos]
-      .sort((a, b) => new Date(a.data_atendimento) - new Date(b.data_atendimento))
-      .slice(0, 5)
-  }, [atendimentos])
-
-  const activeAppointment = useMemo(() => {
-    return (
-      atendimentos.find((item) => String(item.status_atendimento || '').toLowerCase().includes('andamento')) ||
-      agenda[0]
-    )
-  }, [agenda, atendimentos])
-
-  const clientesRecentes = useMemo(() => clientes.slice(0, 6), [clientes])
+  const agenda = painel?.atendimentos_recentes || []
+  const activeAppointment = painel?.atendimento_ativo || agenda[0]
+  const clientesRecentes = painel?.clientes_recentes || []
   const topClientes = dashboardData?.top_clientes || []
   const isOperational = !error
 
@@ -271,7 +244,7 @@ export default function PainelPage() {
           value={numberBR(dashboardData?.estatisticas?.total_clientes_ativos)}
           delta={pctFormat(clientsMetric?.percentage)}
           tone="blue"
-          subtitle={`${numberBR(clientes.length)} cadastrados`}
+          subtitle={`${numberBR(totalClientes)} cadastrados`}
         />
         <KpiCard
           title="Atendimentos hoje"
@@ -350,7 +323,7 @@ export default function PainelPage() {
         <article className="cf-panel panel-sm">
           <h2>Fluxo de vendas</h2>
           <ul className="funnel-list">
-            <li><span>Leads</span><strong>{numberBR(clientes.length)}</strong></li>
+            <li><span>Leads</span><strong>{numberBR(totalClientes)}</strong></li>
             <li><span>Orcamentos</span><strong>{numberBR(statusBuckets.pendente + statusBuckets['em andamento'])}</strong></li>
             <li><span>Aprovados</span><strong>{numberBR(statusBuckets.concluido)}</strong></li>
             <li><span>Entregues</span><strong>{numberBR(statusBuckets.entregue)}</strong></li>
@@ -36,6 +36,7 @@ function Planos() {
 
   const freeClientes = empresa?.limite_clientes ?? 'X'
   const freeAtendimentos = empresa?.limite_atendimentos ?? 'X'
+  const uso = empresa?.uso
 
   const handleLogout = () => {
     logout()
@@ -76,6 +77,12 @@ function Planos() {
               <li>{freeClientes} clientes</li>
               <li>{freeAtendimentos} atendimentos</li>
             </ul>
+            {uso && (
+              <div className="mt-4 pt-4 border-t text-sm text-gray-600 space-y-1">
+                <p>Em uso: {uso.clientes} de {freeClientes} clientes</p>
+                <p>Em uso: {uso.atendimentos} de {freeAtendimentos} atendimentos</p>
+              </div>
+            )}
           </div>
 
           <div className="bg-white rounded-lg shadow p-6">
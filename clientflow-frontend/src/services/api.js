@@ -194,4 +194,22 @@ export function clearApiCache() {
   requestCache.clear()
 }
 
+// Maior página aceita por /clientes e /atendimentos (MAX_PAGE_SIZE no backend)
+const LIST_PAGE_SIZE = 500
+
+// Lista completa de uma rota paginada por cursor ({ items, next_cursor }), página a página.
+// Sem limit/cursor essas rotas cortam a lista em UNPAGED_LIST_MAX_ITEMS.
+export async function getAllPages(url, config = {}) {
+  const items = []
+  let cursor = null
+  do {
+    const params = { ...(config.params || {}), limit: LIST_PAGE_SIZE }
+    if (cursor) params.cursor = cursor
+    const response = await api.get(url, { ...config, params })
+    items.push(...(Array.isArray(response.data?.items) ? response.data.items : []))
+    cursor = response.data?.next_cursor || null
+  } while (cursor)
+  return items
+}
+
 export default api
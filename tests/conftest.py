@@ -0,0 +1,14 @@
+import fakeredis
+import pytest
+
+from backend import redis_client
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """In-process Redis (with Lua scripting) in place of the shared client."""
+    r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "_redis_client", r)
+    monkeypatch.setattr(redis_client, "_down_until", 0.0)
+    yield r
+    r.flushall()
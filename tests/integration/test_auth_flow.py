@@ -44,3 +44,36 @@ def test_refresh_token_lifecycle():
     new_rt = auth.verify_refresh_token(db, new_token)
     assert new_rt is not None
     assert new_rt.revoked == 0
+
+
+def test_exchange_refresh_token_rotaciona_e_detecta_reuso():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="T2", nicho="x", email_login="t2@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    empresa_id = empresa.id
+
+    primeiro = auth.create_refresh_token(db, empresa_id)
+    outro_login = auth.create_refresh_token(db, empresa_id)
+
+    trocado = auth.exchange_refresh_token(db, primeiro)
+    assert trocado is not None
+    assert trocado[0] == empresa_id
+    segundo = trocado[1]
+
+    jti1, jti2 = primeiro.split("::")[0], segundo.split("::")[0]
+    antigo = db.query(models.RefreshToken).filter(models.RefreshToken.jti == jti1).one()
+    novo = db.query(models.RefreshToken).filter(models.RefreshToken.jti == jti2).one()
+    assert antigo.revoked == 1 and antigo.replaced_by == jti2
+    assert novo.family_id == antigo.family_id == jti1
+
+    # Segredo errado ou formato inválido não rotacionam.
+    assert auth.exchange_refresh_token(db, f"{jti2}::errado") is None
+    assert auth.exchange_refresh_token(db, "sem-separador") is None
+    assert auth.verify_refresh_token(db, segundo) is not None
+
+    # Reuso do token já rotacionado revoga a família inteira, mas não outros logins.
+    assert auth.exchange_refresh_token(db, primeiro) is None
+    assert auth.verify_refresh_token(db, segundo) is None
+    assert auth.exchange_refresh_token(db, segundo) is None
+    assert auth.verify_refresh_token(db, outro_login) is not None
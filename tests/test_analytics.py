@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend import jobs, models, rollups
+from backend.analytics import brl_to_centavos, compute_dashboard_analytics, get_date_range
+from backend.database import Base as DBBase
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+@pytest.mark.parametrize(
+    "valor, esperado",
+    [
+        ("1234.56", 123456),
+        ("1.234,56", 123456),
+        ("R$ 1234,5", 123450),
+        ("80", 8000),
+        (99.9, 9990),
+        ("abc", 0),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_brl_to_centavos(valor, esperado):
+    assert brl_to_centavos(valor) == esperado
+
+
+def test_backfill_valor_centavos():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="A1", nicho="x", email_login="a1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    cliente = models.Cliente(empresa_id=empresa.id, nome="C", telefone="11999990000")
+    db.add(cliente)
+    db.commit()
+    valores = ["1.234,56", "10", None, "R$ 5,00", "??"]
+    for valor in valores:
+        db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=cliente.id, tipo_servico="x", valor_cobrado=valor))
+    db.commit()
+
+    atualizados = jobs.backfill_valor_centavos(db, batch_size=2, sleep_seconds=0)
+
+    assert atualizados == 4
+    centavos = [a.valor_centavos for a in db.query(models.Atendimento).order_by(models.Atendimento.id)]
+    assert centavos == [123456, 1000, None, 500, 0]
+    assert jobs.backfill_valor_centavos(db, batch_size=2, sleep_seconds=0) == 0
+
+
+def test_dashboard_analytics_le_rollup_em_uma_consulta():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="A2", nicho="x", email_login="a2@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    clientes = [
+        models.Cliente(empresa_id=empresa.id, nome="Atual", telefone="11999990001",
+                       data_primeiro_contato=datetime(2026, 3, 5, 10)),
+        models.Cliente(empresa_id=empresa.id, nome="Anterior", telefone="11999990002",
+                       data_primeiro_contato=datetime(2026, 2, 27, 10)),
+        models.Cliente(empresa_id=empresa.id, nome="Fora", telefone="11999990003",
+                       data_primeiro_contato=datetime(2026, 2, 24, 8)),
+    ]
+    db.add_all(clientes)
+    db.commit()
+    for data, centavos in [
+        (datetime(2026, 3, 5, 9), 1000),
+        (datetime(2026, 3, 10, 10), 250),
+        (datetime(2026, 2, 27, 12), 500),
+        (datetime(2026, 2, 24, 8), 9999),   # antes do período anterior
+        (datetime(2026, 3, 11, 9), 9999),   # depois do período atual
+    ]:
+        db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=clientes[0].id, tipo_servico="x",
+                                  data_atendimento=data, valor_centavos=centavos))
+    db.commit()
+    rollups.rebuild(db)
+
+    empresa_id = empresa.id
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    dr = get_date_range("7d", now=datetime(2026, 3, 10, 15))
+    result = compute_dashboard_analytics(db, empresa_id, dr)
+
+    assert len(statements) == 1
+    assert result["metrics"]["revenue"] == {"current": 12.5, "previous": 5.0, "percentage": 150.0}
+    assert result["metrics"]["appointments"]["current"] == 2
+    assert result["metrics"]["appointments"]["previous"] == 1
+    assert result["metrics"]["clients"]["current"] == 1
+    assert result["metrics"]["clients"]["previous"] == 1
+    assert result["revenue_series"] == [
+        {"date": "2026-03-05", "value": 10.0},
+        {"date": "2026-03-10", "value": 2.5},
+    ]
+    assert result["clients_series"] == [{"date": "2026-03-05", "value": 1}]
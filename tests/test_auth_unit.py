@@ -16,3 +16,26 @@ def test_create_and_decode_access_token():
     decoded = auth.decode_access_token(token)
     assert decoded is not None
     assert decoded.get("sub") == 42
+
+
+def test_verify_access_token_reaproveita_verificacao(monkeypatch):
+    auth.clear_verified_tokens()
+    token = auth.create_access_token(data={"sub": 7})
+    chamadas = []
+    decode_original = auth.jwt.decode
+
+    def decode_contando(*args, **kwargs):
+        chamadas.append(1)
+        return decode_original(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", decode_contando)
+    assert auth.verify_access_token(token)["sub"] == "7"
+    assert auth.decode_access_token(token)["sub"] == 7
+    assert auth.verify_access_token(token)["sub"] == "7"
+    assert len(chamadas) == 1
+
+    # Depois do exp a entrada em cache não vale mais e o token volta a ser verificado (e rejeitado).
+    exp = auth.verify_access_token(token)["exp"]
+    monkeypatch.setattr(auth.time, "time", lambda: exp + 1)
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **k: (_ for _ in ()).throw(auth.JWTError("expired")))
+    assert auth.decode_access_token(token) is None
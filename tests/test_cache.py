@@ -0,0 +1,34 @@
+from backend import cache
+
+
+def test_fallback_local_hit_miss_e_invalidacao(monkeypatch):
+    # Força o caminho sem Redis (o mesmo usado quando o Redis está fora do ar).
+    monkeypatch.setattr(cache, "get_redis_or_none", lambda: None)
+    cache.clear_local()
+    antes = cache.stats()
+    chamadas = []
+
+    def compute():
+        chamadas.append(1)
+        return {"total": len(chamadas)}
+
+    assert cache.get_or_compute(1, "analytics", "7d", compute) == {"total": 1}
+    assert cache.get_or_compute(1, "analytics", "7d", compute) == {"total": 1}
+    assert cache.get_or_compute(1, "analytics", "30d", compute) == {"total": 2}
+    assert cache.get_or_compute(2, "analytics", "7d", compute) == {"total": 3}
+
+    cache.invalidate_empresa(1)
+    assert cache.get_or_compute(1, "analytics", "7d", compute) == {"total": 4}
+    assert cache.get_or_compute(2, "analytics", "7d", compute) == {"total": 3}
+
+    depois = cache.stats()
+    assert depois["hits"] - antes["hits"] == 2
+    assert depois["misses"] - antes["misses"] == 4
+    assert 0 < depois["hit_ratio"] < 1
+
+
+def test_ttl_zero_desliga_cache(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis_or_none", lambda: None)
+    valores = iter(range(10))
+    assert cache.get_or_compute(3, "dashboard", None, lambda: next(valores), ttl=0) == 0
+    assert cache.get_or_compute(3, "dashboard", None, lambda: next(valores), ttl=0) == 1
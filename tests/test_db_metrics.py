@@ -0,0 +1,52 @@
+import asyncio
+import contextvars
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from backend import db_metrics, dependencies
+from backend.main import app
+
+
+def test_contador_por_requisicao_e_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}", poolclass=db_metrics.InstrumentedQueuePool)
+    antes = db_metrics.stats()
+
+    def requisicao():
+        request_stats = db_metrics.start_request()
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return request_stats
+
+    # Cada requisição roda no próprio contexto, como no middleware.
+    request_stats = contextvars.copy_context().run(requisicao)
+    assert request_stats.queries == 3
+    assert request_stats.db_ms >= 0
+    assert db_metrics._current.get() is None
+
+    depois = db_metrics.stats({"primary": engine.pool})
+    assert depois["queries"] - antes["queries"] == 3
+    assert depois["checkouts"] - antes["checkouts"] == 1
+    assert depois["pools"]["primary"]["checked_out"] == 0
+    assert depois["pools"]["primary"]["size"] == 5
+
+
+def _get_metrics(headers=None) -> httpx.Response:
+    async def get():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/metrics", headers=headers)
+    return asyncio.run(get())
+
+
+def test_metrics_exige_token(monkeypatch):
+    monkeypatch.setattr(dependencies, "METRICS_TOKEN", "")
+    assert _get_metrics().status_code == 404
+
+    monkeypatch.setattr(dependencies, "METRICS_TOKEN", "segredo")
+    assert _get_metrics().status_code == 401
+    assert _get_metrics({"X-Metrics-Token": "errado"}).status_code == 401
+    resposta = _get_metrics({"X-Metrics-Token": "segredo"})
+    assert resposta.status_code == 200
+    assert "db" in resposta.json()
@@ -0,0 +1,78 @@
+import dataclasses
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend import empresa_cache, models
+from backend.database import Base as DBBase
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(empresa_cache, "get_redis_or_none", lambda: None)
+    empresa_cache.clear_local()
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    empresa_cache.clear_local()
+
+
+def contar_selects_empresas(db):
+    consultas = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def _contar(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "empresas" in statement:
+            consultas.append(statement)
+
+    return consultas
+
+
+def test_snapshot_cacheado_e_invalidado_no_commit(db):
+    empresa = models.Empresa(nome_empresa="E1", nicho="x", email_login="e1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    empresa_id = empresa.id
+    antes = empresa_cache.stats()
+    consultas = contar_selects_empresas(db)
+
+    primeira = empresa_cache.get_empresa(db, empresa_id)
+    segunda = empresa_cache.get_empresa(db, empresa_id)
+    assert primeira is segunda
+    assert primeira.plano_empresa == "free"
+    assert not hasattr(primeira, "senha_hash")
+    assert len(consultas) == 1
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        primeira.plano_empresa = "pro"
+
+    empresa = db.get(models.Empresa, empresa_id)
+    empresa.plano_empresa = "pro"
+    db.flush()
+    # Antes do commit o snapshot antigo continua valendo.
+    assert empresa_cache.get_empresa(db, empresa_id).plano_empresa == "free"
+    db.commit()
+    assert empresa_cache.get_empresa(db, empresa_id).plano_empresa == "pro"
+
+    db.query(models.Empresa).filter(models.Empresa.id == empresa_id).update({models.Empresa.ativo: 0})
+    db.commit()
+    assert empresa_cache.get_empresa(db, empresa_id).ativo == 0
+
+    depois = empresa_cache.stats()
+    assert depois["hits"] - antes["hits"] == 2
+    assert depois["misses"] - antes["misses"] == 3
+    assert empresa_cache.get_empresa(db, 9999) is None
+
+
+def test_rollback_nao_invalida(db):
+    empresa = models.Empresa(nome_empresa="E2", nicho="x", email_login="e2@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    snapshot = empresa_cache.get_empresa(db, empresa.id)
+
+    empresa.nome_empresa = "Outro nome"
+    db.flush()
+    db.rollback()
+    assert empresa_cache.get_empresa(db, snapshot.id) is snapshot
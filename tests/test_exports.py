@@ -0,0 +1,34 @@
+import json
+from datetime import datetime
+
+from backend import exports
+
+
+ROWS = [
+    (1, "Ana", datetime(2026, 1, 2, 3, 4, 5)),
+    (2, "Bruno, Jr.", None),
+]
+COLUMNS = ("id", "nome", "data")
+
+
+def test_iter_csv_envia_cabecalho_antes_das_linhas():
+    consumidas = []
+
+    def rows():
+        for row in ROWS:
+            consumidas.append(row)
+            yield row
+
+    gen = exports.iter_csv(rows(), COLUMNS)
+    assert next(gen) == "id,nome,data\r\n"
+    assert consumidas == []
+    corpo = "".join(gen)
+    assert corpo == '1,Ana,2026-01-02T03:04:05\r\n2,"Bruno, Jr.",\r\n'
+
+
+def test_iter_ndjson_uma_linha_por_registro(monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_BATCH_SIZE", 1)
+    chunks = list(exports.iter_ndjson(iter(ROWS), COLUMNS))
+    assert len(chunks) == 2
+    assert json.loads(chunks[0]) == {"id": 1, "nome": "Ana", "data": "2026-01-02T03:04:05"}
+    assert json.loads(chunks[1])["data"] is None
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.analytics import brl_to_centavos
+from backend.database import Base as DBBase
+from backend.routers.financeiro import calcular_resumo
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_resumo_agrega_por_status_forma_e_mes():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="F1", nicho="x", email_login="f1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+
+    cliente = models.Cliente(empresa_id=empresa.id, nome="C", telefone="11999990000")
+    db.add(cliente)
+    db.flush()
+    for data, valor, status, forma in [
+        (datetime(2026, 4, 30, 9), "1.234,56", "concluido", "pix"),
+        (datetime(2026, 5, 2, 9), "100", "Concluido", "PIX"),
+        (datetime(2026, 5, 3, 9), None, "pendente", None),
+        (datetime(2026, 6, 1, 9), "50,5", "pendente", "dinheiro"),
+    ]:
+        db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=cliente.id, tipo_servico="x",
+                                  data_atendimento=data, status_atendimento=status, forma_pagamento=forma,
+                                  valor_cobrado=valor, valor_centavos=brl_to_centavos(valor)))
+    db.commit()
+
+    resumo = calcular_resumo(db, empresa.id)
+    assert resumo["receita_total"] == 1385.06
+    assert resumo["atendimentos"] == 4
+    assert resumo["atendimentos_sem_valor"] == 1
+    assert {s["status"]: (s["receita"], s["atendimentos"]) for s in resumo["por_status"]} == {
+        "concluido": (1334.56, 2),
+        "pendente": (50.5, 2),
+    }
+    assert {f["forma_pagamento"]: f["receita"] for f in resumo["por_forma_pagamento"]} == {
+        "pix": 1334.56,
+        "dinheiro": 50.5,
+        "nao_informado": 0.0,
+    }
+    assert [(m["mes"], m["receita"]) for m in resumo["por_mes"]] == [
+        ("2026-04", 1234.56),
+        ("2026-05", 100.0),
+        ("2026-06", 50.5),
+    ]
+
+    maio = calcular_resumo(db, empresa.id, datetime(2026, 5, 1), datetime(2026, 6, 1))
+    assert maio["receita_total"] == 100.0
+    assert maio["atendimentos"] == 2
+    assert maio["periodo"] == {"de": "2026-05-01T00:00:00", "ate": "2026-06-01T00:00:00"}
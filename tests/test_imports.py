@@ -0,0 +1,77 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import imports, models
+from backend.database import Base as DBBase
+from backend.plan_limits import obter_uso
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def seed_empresa(db, limite_clientes=1000):
+    empresa = models.Empresa(nome_empresa="I1", nicho="x", email_login="i1@example.com", senha_hash="x",
+                             limite_clientes=limite_clientes)
+    db.add(empresa)
+    db.commit()
+    db.add(models.Cliente(empresa_id=empresa.id, nome="Existente", telefone="11999990000"))
+    db.commit()
+    return empresa
+
+
+def test_importacao_csv_com_relatorio_por_linha(monkeypatch):
+    monkeypatch.setattr(imports, "CLIENTES_IMPORT_BATCH_SIZE", 2)
+    db = setup_inmemory_db()
+    empresa = seed_empresa(db)
+    csv_body = (
+        "Nome;Telefone;Anotacoes_Rapidas\n"
+        "Ana;11999990001;vip\n"
+        "Bruno;11999990000;\n"
+        "C;11999990002;\n"
+        "Dora;11999990001;\n"
+        "Eva;11999990003;\n"
+        "Fábio;11999990004;\n"
+        "Gil;(11) 99999-0004;\n"
+    ).encode()
+
+    relatorio = imports.importar_clientes(db, empresa, imports.parse_rows(csv_body, "text/csv"))
+
+    assert relatorio["total"] == 7
+    assert relatorio["importados"] == 3
+    assert [e["linha"] for e in relatorio["erros"]] == [2, 3, 4, 7]
+    assert "já cadastrado" in relatorio["erros"][0]["erro"]
+    assert relatorio["erros"][1]["erro"].startswith("nome:")
+    assert "repetido" in relatorio["erros"][2]["erro"]
+    assert "repetido" in relatorio["erros"][3]["erro"]
+
+    nomes = {c.nome for c in db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa.id)}
+    assert nomes == {"Existente", "Ana", "Eva", "Fábio"}
+    assert obter_uso(db, empresa.id)["clientes"] == 4
+    metrica = db.query(models.MetricaDiaria).filter(models.MetricaDiaria.empresa_id == empresa.id).one()
+    assert metrica.novos_clientes == 3
+
+
+def test_importacao_json_respeita_limite_do_plano():
+    db = setup_inmemory_db()
+    empresa = seed_empresa(db, limite_clientes=3)
+    rows = [{"nome": f"Cliente {i}", "telefone": f"1198888000{i}"} for i in range(4)]
+
+    relatorio = imports.importar_clientes(db, empresa, rows)
+
+    assert relatorio["importados"] == 2
+    assert [e["linha"] for e in relatorio["erros"]] == [3, 4]
+    assert relatorio["erros"][0]["erro"] == "Você atingiu o limite do plano FREE."
+
+
+def test_payload_invalido():
+    with pytest.raises(HTTPException) as exc_info:
+        imports.parse_rows(b'{"nome": "x"}', "application/json")
+    assert exc_info.value.status_code == 400
+    with pytest.raises(HTTPException):
+        imports.parse_rows(b"nome,email\nx,y\n", "text/csv")
@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, pagination
+from backend.database import Base as DBBase
+from backend.pagination import decode_cursor, encode_cursor
+from backend.routers.atendimentos import consultar_atendimentos
+from backend.routers.clientes import consultar_clientes, listar_clientes
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def seed_clientes(db, total):
+    empresa = models.Empresa(nome_empresa="P1", nicho="x", email_login="p1@example.com", senha_hash="x")
+    outra = models.Empresa(nome_empresa="P2", nicho="x", email_login="p2@example.com", senha_hash="x")
+    db.add_all([empresa, outra])
+    db.commit()
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    for i in range(total):
+        # Pairs share the same timestamp so the id tie-breaker is exercised.
+        db.add(models.Cliente(empresa_id=empresa.id, nome=f"C{i}", telefone=f"1199999{i:04d}",
+                              data_primeiro_contato=base + timedelta(minutes=i // 2)))
+    db.add(models.Cliente(empresa_id=outra.id, nome="Outro", telefone="11988887777", data_primeiro_contato=base))
+    db.commit()
+    return empresa
+
+
+def test_cursor_roundtrip():
+    dt = datetime(2026, 3, 4, 5, 6, 7, 890)
+    assert decode_cursor(encode_cursor(dt, 42)) == (dt, 42)
+
+
+def test_cursor_com_data_nula():
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor("nao-e-um-cursor")
+    assert exc_info.value.status_code == 400
+
+
+def test_listar_clientes_sem_limit_devolve_lista_ate_o_teto():
+    db = setup_inmemory_db()
+    empresa = seed_clientes(db, 7)
+    response = Response()
+    clientes = consultar_clientes(db, empresa.id, limit=None, cursor=None, response=response)
+    assert isinstance(clientes, list)
+    assert len(clientes) == 7
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_listar_clientes_sem_limit_e_cortada_com_cursor_no_header(monkeypatch):
+    monkeypatch.setattr(pagination, "UNPAGED_LIST_MAX_ITEMS", 4)
+    db = setup_inmemory_db()
+    empresa = seed_clientes(db, 7)
+    response = Response()
+
+    clientes = consultar_clientes(db, empresa.id, limit=None, cursor=None, response=response)
+    assert len(clientes) == 4
+    resto = consultar_clientes(db, empresa.id, limit=10, cursor=response.headers[pagination.NEXT_CURSOR_HEADER])
+    assert len(resto.items) == 3
+    assert resto.next_cursor is None
+
+
+def test_listar_clientes_pagina_por_cursor():
+    db = setup_inmemory_db()
+    empresa = seed_clientes(db, 7)
+
+    vistos = []
+    cursor = None
+    while True:
+        page = consultar_clientes(db, empresa.id, limit=3, cursor=cursor)
+        vistos.extend(c.id for c in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    esperado = [
+        c.id for c in db.query(models.Cliente)
+        .filter(models.Cliente.empresa_id == empresa.id)
+        .order_by(models.Cliente.data_primeiro_contato.desc(), models.Cliente.id.desc())
+    ]
+    assert vistos == esperado
+
+
+def test_clientes_sem_data_entram_na_paginacao():
+    db = setup_inmemory_db()
+    empresa = seed_clientes(db, 4)
+    for i in range(3):
+        db.add(models.Cliente(empresa_id=empresa.id, nome=f"Sem data {i}", telefone=f"1197777{i:04d}",
+                              data_primeiro_contato=None))
+    db.commit()
+    db.query(models.Cliente).filter(models.Cliente.nome.like("Sem data%")).update(
+        {models.Cliente.data_primeiro_contato: None}, synchronize_session=False
+    )
+    db.commit()
+
+    vistos = []
+    cursor = None
+    while True:
+        page = consultar_clientes(db, empresa.id, limit=2, cursor=cursor)
+        vistos.extend(c.nome for c in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(vistos) == 7
+    assert vistos[:3] == ["Sem data 2", "Sem data 1", "Sem data 0"]
+    assert vistos == [c.nome for c in consultar_clientes(db, empresa.id, limit=None, cursor=None)]
+
+
+def seed_atendimentos(db, empresa, total):
+    cliente_a, cliente_b = (
+        db.query(models.Cliente).filter(models.Cliente.empresa_id == empresa.id).order_by(models.Cliente.id).limit(2).all()
+    )
+    base = datetime(2026, 2, 1, 9, 0, 0)
+    for i in range(total):
+        db.add(models.Atendimento(
+            empresa_id=empresa.id,
+            cliente_id=(cliente_a if i % 2 == 0 else cliente_b).id,
+            tipo_servico="Revisão" if i % 3 == 0 else "Troca de óleo",
+            status_atendimento="Concluido" if i % 2 == 0 else "Novo",
+            data_atendimento=base + timedelta(days=i),
+        ))
+    db.commit()
+    return cliente_a
+
+
+def test_listar_atendimentos_filtros_e_cursor():
+    db = setup_inmemory_db()
+    empresa = seed_clientes(db, 2)
+    cliente_a = seed_atendimentos(db, empresa, 10)
+
+    filtros = dict(
+        status_atendimento="Concluido",
+        cliente_id=cliente_a.id,
+        data_de=datetime(2026, 2, 2),
+        data_ate=datetime(2026, 2, 10),
+        tipo_servico=None,
+    )
+    completo = consultar_atendimentos(db, empresa.id, **filtros, limit=None, cursor=None)
+    assert [a["data_atendimento"].day for a in completo] == [9, 7, 5, 3]
+
+    vistos = []
+    cursor = None
+    while True:
+        page = consultar_atendimentos(db, empresa.id, **filtros, limit=3, cursor=cursor)
+        vistos.extend(a["id"] for a in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert vistos == [a["id"] for a in completo]
+
+
+def test_listar_clientes_async_session(tmp_path):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    DBBase.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    empresa = seed_clientes(db, 4)
+    esperado = [c.id for c in consultar_clientes(db, empresa.id, limit=None, cursor=None)]
+    db.close()
+
+    async def listar():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        try:
+            async with AsyncSession(async_engine) as session:
+                return await listar_clientes(Response(), limit=None, cursor=None, empresa=empresa, db=session)
+        finally:
+            await async_engine.dispose()
+
+    assert [c.id for c in asyncio.run(listar())] == esperado
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.database import Base as DBBase
+from backend.routers.painel import calcular_painel
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_calcular_painel_buckets_e_recentes():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="P1", nicho="x", email_login="p1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+
+    cliente = models.Cliente(empresa_id=empresa.id, nome="C", telefone="11999990000",
+                             data_primeiro_contato=datetime(2026, 5, 1, 10))
+    db.add(cliente)
+    db.flush()
+    for dia, status in [(1, "Pendente"), (2, "Em andamento"), (3, "concluido"), (4, None), (5, "cancelado")]:
+        db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=cliente.id, tipo_servico=f"s{dia}",
+                                  data_atendimento=datetime(2026, 5, dia, 9), status_atendimento=status))
+    db.commit()
+
+    painel = calcular_painel(db, empresa.id, recentes=2)
+
+    assert painel["status_atendimentos"] == {
+        "pendente": 1, "em andamento": 1, "concluido": 1, "entregue": 0, "cancelado": 1, "novo": 1,
+    }
+    assert [a["tipo_servico"] for a in painel["atendimentos_recentes"]] == ["s5", "s4"]
+    assert painel["atendimento_ativo"]["tipo_servico"] == "s2"
+    assert painel["atendimento_ativo"]["data_atendimento"] == "2026-05-02T09:00:00"
+    assert [c["nome"] for c in painel["clientes_recentes"]] == ["C"]
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from backend import auth, password_pool
+
+
+def test_hash_e_verificacao_no_pool():
+    antes = password_pool.stats()["completed"]
+    h = asyncio.run(password_pool.hash_password("SenhaForte123"))
+    assert auth.verify_password("SenhaForte123", h)
+    assert asyncio.run(password_pool.verify_password("SenhaForte123", h))
+    assert not asyncio.run(password_pool.verify_password("outra", h))
+    depois = password_pool.stats()
+    assert depois["completed"] - antes == 3
+    assert depois["in_flight"] == 0
+
+
+def test_fila_cheia_rejeita_com_503(monkeypatch):
+    monkeypatch.setattr(password_pool, "_slots", threading.BoundedSemaphore(1))
+    liberar = threading.Event()
+    iniciou = threading.Event()
+
+    def bloqueia():
+        iniciou.set()
+        liberar.wait(5)
+        return "ok"
+
+    resultado = {}
+    t = threading.Thread(target=lambda: resultado.update(v=asyncio.run(password_pool.run(bloqueia))))
+    t.start()
+    assert iniciou.wait(5)
+    rejeitadas = password_pool.stats()["rejected"]
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(password_pool.run(lambda: "nunca"))
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == "1"
+    assert password_pool.stats()["rejected"] == rejeitadas + 1
+
+    liberar.set()
+    t.join(5)
+    assert resultado["v"] == "ok"
+
+
+def test_cancelar_quem_aguarda_nao_libera_vaga_antes_do_job(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    slots = threading.BoundedSemaphore(2)
+    monkeypatch.setattr(password_pool, "_executor", executor)
+    monkeypatch.setattr(password_pool, "_slots", slots)
+    liberar = threading.Event()
+    iniciou = threading.Event()
+
+    def bloqueia():
+        iniciou.set()
+        liberar.wait(5)
+        return "ok"
+
+    async def cenario():
+        rodando = asyncio.create_task(password_pool.run(bloqueia))
+        while not iniciou.is_set():
+            await asyncio.sleep(0.01)
+        na_fila = asyncio.create_task(password_pool.run(lambda: "nunca"))
+        await asyncio.sleep(0.01)
+
+        # O job na fila é cancelado junto com quem aguardava: a vaga volta na hora.
+        na_fila.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await na_fila
+        # O job em execução continua ocupando a vaga mesmo sem ninguém aguardando.
+        rodando.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await rodando
+        assert slots.acquire(blocking=False)
+        assert not slots.acquire(blocking=False)
+        slots.release()
+
+        liberar.set()
+        for _ in range(500):
+            if slots.acquire(blocking=False):
+                break
+            await asyncio.sleep(0.01)
+        else:
+            pytest.fail("a vaga do job cancelado não foi devolvida")
+        slots.release()
+
+    try:
+        asyncio.run(cenario())
+    finally:
+        liberar.set()
+        executor.shutdown(wait=True)
+    assert password_pool.stats()["in_flight"] == 0
@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import database, models
+from backend.database import Base as DBBase
+from backend.plan_limits import check_plan_limits, inicializar_uso, obter_uso, reconciliar_uso, registrar_uso
+from backend.routers.auth_routes import _insert_company
+from backend.schemas import EmpresaCreate
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def seed(db, clientes=0, limite_clientes=3, inicializar=True):
+    empresa = models.Empresa(nome_empresa="L1", nicho="x", email_login="l1@example.com", senha_hash="x",
+                             limite_clientes=limite_clientes)
+    db.add(empresa)
+    db.commit()
+    for i in range(clientes):
+        db.add(models.Cliente(empresa_id=empresa.id, nome=f"C{i}", telefone=f"1199999{i:04d}"))
+    if inicializar:
+        # Como a migração 007 faz para as empresas existentes.
+        db.flush()
+        inicializar_uso(db, empresa.id)
+    db.commit()
+    return empresa
+
+
+def linhas_de_uso(db):
+    return db.query(models.UsoEmpresa).count()
+
+
+def test_uso_inicializado_das_tabelas_e_incrementado():
+    db = setup_inmemory_db()
+    empresa = seed(db, clientes=2, inicializar=False)
+
+    # Sem a linha, a leitura conta nas tabelas brutas e não grava nada.
+    assert obter_uso(db, empresa.id) == {"clientes": 2, "atendimentos": 0}
+    assert not db.new and not db.dirty
+    assert linhas_de_uso(db) == 0
+
+    db.add(models.Cliente(empresa_id=empresa.id, nome="Novo", telefone="11911112222"))
+    db.flush()
+    registrar_uso(db, empresa.id, clientes=1)
+    db.commit()
+    assert obter_uso(db, empresa.id) == {"clientes": 3, "atendimentos": 0}
+
+
+def test_primeiro_registro_sem_linha_conta_a_escrita_uma_vez():
+    db = setup_inmemory_db()
+    empresa = seed(db, clientes=1, inicializar=False)
+
+    db.add(models.Cliente(empresa_id=empresa.id, nome="Novo", telefone="11911112222"))
+    db.flush()
+    registrar_uso(db, empresa.id, clientes=1)
+    db.commit()
+    assert obter_uso(db, empresa.id)["clientes"] == 2
+
+
+def test_limite_usa_o_contador():
+    db = setup_inmemory_db()
+    empresa = seed(db, clientes=2)
+    check_plan_limits(empresa, "clientes", db=db)
+
+    registrar_uso(db, empresa.id, clientes=1)
+    with pytest.raises(HTTPException) as exc_info:
+        check_plan_limits(empresa, "clientes", db=db)
+    assert exc_info.value.status_code == 403
+
+
+def test_reconciliar_corrige_divergencia():
+    db = setup_inmemory_db()
+    empresa = seed(db, clientes=2)
+    registrar_uso(db, empresa.id, clientes=5)
+    db.commit()
+    assert obter_uso(db, empresa.id)["clientes"] == 7
+
+    assert reconciliar_uso(db) == 1
+    assert obter_uso(db, empresa.id) == {"clientes": 2, "atendimentos": 0}
+
+
+def test_cadastro_cria_a_linha_de_uso(monkeypatch):
+    db = setup_inmemory_db()
+
+    @contextmanager
+    def sessao(schema=None):
+        yield db
+
+    monkeypatch.setattr(database, "standalone_session", sessao)
+    empresa = _insert_company(
+        EmpresaCreate(nome_empresa="Oficina", nicho="Mecânica", email_login="nova@example.com", senha="Senha123"), "hash"
+    )
+    assert linhas_de_uso(db) == 1
+    assert obter_uso(db, empresa.id) == {"clientes": 0, "atendimentos": 0}
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from backend import rate_limit
+
+
+def fake_request(ip="10.0.0.1", forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": (ip, 1234)})
+
+
+@pytest.fixture(autouse=True)
+def sem_redis(monkeypatch):
+    monkeypatch.setattr(rate_limit, "get_redis_or_none", lambda: None)
+    rate_limit.clear_local()
+    yield
+    rate_limit.clear_local()
+
+
+def test_login_bloqueia_apos_limite_por_ip_e_email():
+    limite = rate_limit.POLICIES["login"].limit
+    for _ in range(limite):
+        rate_limit.enforce(fake_request(), "login", "A@Example.com ")
+
+    with pytest.raises(HTTPException) as exc:
+        rate_limit.enforce(fake_request(), "login", "a@example.com")
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+    # Outro e-mail ou outro IP têm janelas próprias.
+    rate_limit.enforce(fake_request(), "login", "b@example.com")
+    rate_limit.enforce(fake_request("10.0.0.2"), "login", "a@example.com")
+
+
+def test_janela_desliza(monkeypatch):
+    policy = rate_limit.POLICIES["refresh"]
+    agora = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: agora[0])
+    for _ in range(policy.limit):
+        assert rate_limit.hit("refresh", "ip")[0]
+    permitido, espera = rate_limit.hit("refresh", "ip")
+    assert not permitido and espera == policy.window_seconds
+
+    agora[0] += policy.window_seconds
+    assert rate_limit.hit("refresh", "ip")[0]
+
+
+def test_fallback_local_limitado(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_LOCAL_MAX_KEYS", 3)
+    for i in range(10):
+        rate_limit.hit("login", f"ip-{i}")
+    assert rate_limit.stats()["local_keys"] == 3
+
+
+def test_client_ip_usa_x_forwarded_for_so_de_proxy_confiavel(monkeypatch):
+    # Sem proxies configurados o header é ignorado.
+    assert rate_limit.client_ip(fake_request("10.1.2.3", "203.0.113.9")) == "10.1.2.3"
+
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXIES", rate_limit._networks("10.0.0.0/8, 192.168.0.1"))
+    assert rate_limit.client_ip(fake_request("10.1.2.3", "203.0.113.9")) == "203.0.113.9"
+    # Valor forjado pelo cliente fica à esquerda; vale o salto adicionado pelos proxies.
+    assert rate_limit.client_ip(fake_request("10.1.2.3", "1.1.1.1, 203.0.113.9, 192.168.0.1")) == "203.0.113.9"
+    # Conexão direta (não confiável) não pode escolher o próprio IP.
+    assert rate_limit.client_ip(fake_request("198.51.100.7", "203.0.113.9")) == "198.51.100.7"
+
+
+def test_refresh_atras_do_proxy_tem_janela_por_cliente(monkeypatch):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXIES", rate_limit._networks("10.0.0.0/8"))
+    limite = rate_limit.POLICIES["refresh"].limit
+    for _ in range(limite):
+        rate_limit.enforce(fake_request("10.0.0.5", "203.0.113.1"), "refresh")
+    with pytest.raises(HTTPException):
+        rate_limit.enforce(fake_request("10.0.0.5", "203.0.113.1"), "refresh")
+    rate_limit.enforce(fake_request("10.0.0.5", "203.0.113.2"), "refresh")
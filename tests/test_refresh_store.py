@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import auth, jobs, models, refresh_store
+from backend.database import Base as DBBase
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def test_purge_refresh_tokens_remove_so_expirados():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="P", nicho="x", email_login="p@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    valido = auth.create_refresh_token(db, empresa.id)
+    agora = datetime.now(timezone.utc)
+    for i in range(3):
+        db.add(models.RefreshToken(empresa_id=empresa.id, jti=f"velho{i}", token_hash="h",
+                                   expires_at=agora - timedelta(days=1), revoked=i % 2))
+    db.commit()
+
+    assert jobs.purge_refresh_tokens(db, batch_size=2, sleep_seconds=0) == 3
+    assert db.query(models.RefreshToken).count() == 1
+    assert auth.verify_refresh_token(db, valido) is not None
+
+
+@pytest.fixture
+def redis_store(monkeypatch, fake_redis):
+    monkeypatch.setattr(refresh_store, "REFRESH_TOKEN_STORE", "redis")
+    monkeypatch.setattr(refresh_store, "_store", None)
+    yield refresh_store.get_store(3600)
+    monkeypatch.setattr(refresh_store, "_store", None)
+
+
+def test_redis_store_rotacao_reuso_e_revogacao(redis_store):
+    token = auth.create_refresh_token(None, 991)
+    assert auth.verify_refresh_token(None, token).empresa_id == 991
+
+    empresa_id, novo = auth.exchange_refresh_token(None, token)
+    assert empresa_id == 991
+    assert auth.verify_refresh_token(None, token) is None
+    assert auth.verify_refresh_token(None, novo) is not None
+
+    # Reuso do token rotacionado revoga a família.
+    assert auth.exchange_refresh_token(None, token) is None
+    assert auth.verify_refresh_token(None, novo) is None
+
+    outro = auth.create_refresh_token(None, 991)
+    assert auth.revoke_refresh_tokens_for_empresa(None, 991) >= 1
+    assert auth.verify_refresh_token(None, outro) is None
+
+
+def test_redis_store_token_invalido_ou_expirado_nao_rotaciona(redis_store, fake_redis):
+    token = auth.create_refresh_token(None, 992)
+    jti = token.split("::", 1)[0]
+
+    # Hash errado: nada muda e a família não é revogada.
+    assert auth.exchange_refresh_token(None, f"{jti}::outro") is None
+    assert auth.verify_refresh_token(None, token) is not None
+
+    # Outra sessão da mesma empresa é outra família: o reuso de uma não derruba a outra.
+    outra_sessao = auth.create_refresh_token(None, 992)
+    _, novo = auth.exchange_refresh_token(None, token)
+    assert auth.exchange_refresh_token(None, token) is None
+    assert auth.verify_refresh_token(None, novo) is None
+    assert auth.verify_refresh_token(None, outra_sessao) is not None
+
+    fake_redis.hset(f"refresh:{outra_sessao.split('::', 1)[0]}", "expires_at", 0)
+    assert auth.exchange_refresh_token(None, outra_sessao) is None
@@ -0,0 +1,126 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from backend import database, models, replica
+from backend.database import Base as DBBase, RoutingSession
+
+
+def setup_primary_and_replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(replica, "get_redis_or_none", lambda: None)
+    engines = []
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        DBBase.metadata.create_all(bind=engine)
+        engines.append(engine)
+    primary, replica_engine = engines
+    with RoutingSession(bind=replica_engine) as db:
+        db.add(models.Empresa(id=1, nome_empresa="Da réplica", nicho="x", email_login="r@example.com", senha_hash="x"))
+        db.commit()
+    monkeypatch.setattr(database, "replica_engine", replica_engine)
+    replica.clear_local()
+    return primary, replica_engine
+
+
+def nome_lido(db):
+    return db.query(models.Empresa.nome_empresa).filter(models.Empresa.id == 1).scalar()
+
+
+def test_leituras_na_replica_e_escritas_no_primario(tmp_path, monkeypatch):
+    primary, _ = setup_primary_and_replica(tmp_path, monkeypatch)
+
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=1) is True
+        assert nome_lido(db) == "Da réplica"
+        db.add(models.Empresa(id=1, nome_empresa="Do primário", nicho="x", email_login="p@example.com", senha_hash="x"))
+        db.commit()
+
+    with RoutingSession(bind=primary) as db:
+        assert nome_lido(db) == "Do primário"
+
+
+def test_read_your_writes_mantem_a_empresa_no_primario(tmp_path, monkeypatch):
+    primary, _ = setup_primary_and_replica(tmp_path, monkeypatch)
+
+    with RoutingSession(bind=primary) as db:
+        db.add(models.Empresa(id=1, nome_empresa="Do primário", nicho="x", email_login="p@example.com", senha_hash="x"))
+        db.commit()
+
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=1) is False
+        assert nome_lido(db) == "Do primário"
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=2) is True
+
+    monkeypatch.setattr(replica, "REPLICA_READ_YOUR_WRITES_SECONDS", 0)
+    replica.clear_local()
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=1) is True
+
+
+def test_replica_atrasada_ou_fora_cai_no_primario(tmp_path, monkeypatch):
+    primary, _ = setup_primary_and_replica(tmp_path, monkeypatch)
+    monkeypatch.setattr(replica, "_measure_lag", lambda conn: 30.0)
+    antes = replica.stats()
+
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=1) is False
+        assert nome_lido(db) is None
+
+    def fora(conn):
+        raise RuntimeError("replica down")
+
+    monkeypatch.setattr(replica, "_measure_lag", fora)
+    replica.clear_local()
+    with RoutingSession(bind=primary) as db:
+        assert replica.route_reads(db, empresa_id=1) is False
+
+    depois = replica.stats()
+    assert depois["lag_fallbacks"] - antes["lag_fallbacks"] == 2
+    assert depois["lag_errors"] - antes["lag_errors"] == 1
+
+
+def test_route_reads_async(tmp_path, monkeypatch):
+    _, replica_engine = setup_primary_and_replica(tmp_path, monkeypatch)
+    monkeypatch.setattr(database, "_async_replica_engine", None)
+
+    async def ler():
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary'}.db")
+        try:
+            async with AsyncSession(primary, sync_session_class=RoutingSession) as db:
+                assert await replica.route_reads_async(db, empresa_id=1) is True
+                return await db.run_sync(nome_lido)
+        finally:
+            await primary.dispose()
+            await database.get_async_replica_engine().dispose()
+
+    assert asyncio.run(ler()) == "Da réplica"
+
+
+def test_escritas_em_massa_marcam_a_empresa(tmp_path, monkeypatch):
+    from sqlalchemy import insert, update
+
+    from backend import services
+
+    primary, _ = setup_primary_and_replica(tmp_path, monkeypatch)
+    with RoutingSession(bind=primary) as db:
+        db.execute(insert(models.Empresa), [dict(id=i, nome_empresa=f"E{i}", nicho="x",
+                                                 email_login=f"e{i}@example.com", senha_hash="x") for i in (3, 4)])
+        db.commit()
+    assert replica._wrote_recently(3) and replica._wrote_recently(4)
+    assert not replica._wrote_recently(5)
+
+    replica.clear_local()
+    with RoutingSession(bind=primary) as db:
+        db.execute(insert(models.Cliente.__table__).values(empresa_id=3, nome="C", telefone="11999990000"))
+        db.commit()
+        services.atualizar_status_todos_clientes(3, db)
+    assert replica._wrote_recently(3) and not replica._wrote_recently(4)
+
+    # UPDATE sem empresa identificável (ex.: jobs): todas as empresas ficam no primário.
+    replica.clear_local()
+    with RoutingSession(bind=primary) as db:
+        db.execute(update(models.Atendimento).values(valor_centavos=0))
+        db.commit()
+    assert replica._wrote_recently(4)
@@ -0,0 +1,78 @@
+from datetime import date, datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, rollups
+from backend.database import Base as DBBase
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def snapshot(db):
+    return [
+        (m.empresa_id, m.dia, m.atendimentos, m.receita_centavos, m.novos_clientes)
+        for m in db.query(models.MetricaDiaria).order_by(models.MetricaDiaria.empresa_id, models.MetricaDiaria.dia)
+    ]
+
+
+def test_registrar_incremental_confere_com_rebuild():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="R1", nicho="x", email_login="r1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+
+    cliente = models.Cliente(empresa_id=empresa.id, nome="C", telefone="11999990000",
+                             data_primeiro_contato=datetime(2026, 5, 1, 10))
+    db.add(cliente)
+    db.flush()
+    rollups.registrar_cliente(db, cliente)
+    for data, centavos in [(datetime(2026, 5, 1, 11), 1500), (datetime(2026, 5, 1, 18), None),
+                           (datetime(2026, 5, 3, 9), 700)]:
+        atendimento = models.Atendimento(empresa_id=empresa.id, cliente_id=cliente.id, tipo_servico="x",
+                                         data_atendimento=data, valor_centavos=centavos)
+        db.add(atendimento)
+        db.flush()
+        rollups.registrar_atendimento(db, atendimento)
+    db.commit()
+
+    incremental = snapshot(db)
+    assert incremental == [
+        (empresa.id, date(2026, 5, 1), 2, 1500, 1),
+        (empresa.id, date(2026, 5, 3), 1, 700, 0),
+    ]
+
+    assert rollups.rebuild(db, empresa_id=empresa.id) == 2
+    assert snapshot(db) == incremental
+
+
+def test_totais_do_dashboard_contam_linhas_sem_data():
+    from backend.plan_limits import inicializar_uso
+    from backend.routers.dashboard import calcular_dashboard
+
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="R2", nicho="x", email_login="r2@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+    # Linhas legadas sem data ficam fora de metricas_diarias.
+    datado = models.Cliente(empresa_id=empresa.id, nome="Datado", telefone="11999990001",
+                            data_primeiro_contato=datetime(2026, 5, 1, 10))
+    legado = models.Cliente(empresa_id=empresa.id, nome="Legado", telefone="11999990002")
+    db.add_all([datado, legado])
+    db.flush()
+    legado.data_primeiro_contato = None
+    db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=legado.id, tipo_servico="x",
+                              data_atendimento=None))
+    db.flush()
+    inicializar_uso(db, empresa.id)
+    db.commit()
+    rollups.rebuild(db, empresa_id=empresa.id)
+
+    estatisticas = calcular_dashboard(db, empresa.id)["estatisticas"]
+    assert estatisticas["total_clientes"] == 2
+    assert estatisticas["total_atendimentos"] == 1
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from backend import database
+
+
+class FakeDBAPIConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return SimpleNamespace(execute=self.statements.append, close=lambda: None)
+
+    def commit(self):
+        self.statements.append("COMMIT")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.dialect = SimpleNamespace(name="postgresql")
+        self.info = {}
+        self.connection = SimpleNamespace(dbapi_connection=FakeDBAPIConnection())
+
+    @property
+    def statements(self):
+        return self.connection.dbapi_connection.statements
+
+
+def begin(conn, schema):
+    session = SimpleNamespace(info={database._SESSION_SCHEMA: schema})
+    database._search_path_on_begin(session, None, conn)
+
+
+def test_search_path_so_e_emitido_quando_o_tenant_muda():
+    conn = FakeConnection()
+
+    begin(conn, "empresa_1")
+    begin(conn, "empresa_1")
+    begin(conn, "empresa_2")
+    begin(conn, None)
+    begin(conn, None)
+
+    assert conn.statements == [
+        "SET search_path TO empresa_1, public", "COMMIT",
+        "SET search_path TO empresa_2, public", "COMMIT",
+        "RESET search_path", "COMMIT",
+    ]
+
+
+def test_search_path_vale_mesmo_sem_commit_da_sessao():
+    # Requisições só de leitura terminam em rollback; o SET já foi confirmado na
+    # conexão antes da transação da sessão, então a próxima não repete.
+    conn = FakeConnection()
+
+    begin(conn, "empresa_1")
+    begin(conn, "empresa_1")
+
+    assert conn.statements == ["SET search_path TO empresa_1, public", "COMMIT"]
+    assert database._current_search_path(conn) == "empresa_1"
+
+
+def test_sqlite_nao_emite_search_path():
+    conn = FakeConnection()
+    conn.dialect.name = "sqlite"
+    begin(conn, "empresa_1")
+    assert conn.statements == []
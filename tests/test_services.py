@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import cache, models, services
+from backend.database import Base as DBBase
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+def seed(db):
+    empresa = models.Empresa(nome_empresa="S1", nicho="x", email_login="s1@example.com", senha_hash="x")
+    outra = models.Empresa(nome_empresa="S2", nicho="x", email_login="s2@example.com", senha_hash="x")
+    db.add_all([empresa, outra])
+    db.commit()
+    agora = datetime.now(timezone.utc)
+    # nome -> dias atrás de cada atendimento
+    historico = {
+        "Novo": [],
+        "Frequente": [10, 20, 30, 40, 50],
+        "Inativo": [200],
+        "Recente": [15],
+        "Ativo": [100, 120],
+    }
+    for i, (nome, dias) in enumerate(historico.items()):
+        cliente = models.Cliente(empresa_id=empresa.id, nome=nome, telefone=f"1199990{i:04d}")
+        db.add(cliente)
+        db.flush()
+        for d in dias:
+            db.add(models.Atendimento(empresa_id=empresa.id, cliente_id=cliente.id, tipo_servico="x",
+                                      data_atendimento=agora - timedelta(days=d)))
+    db.add(models.Cliente(empresa_id=outra.id, nome="Outra", telefone="11988880000"))
+    db.commit()
+    return empresa
+
+
+def test_reclassificacao_em_lote_usa_as_mesmas_regras(monkeypatch):
+    invalidadas = []
+    monkeypatch.setattr(cache, "invalidate_empresa", invalidadas.append)
+    db = setup_inmemory_db()
+    empresa = seed(db)
+
+    assert services.atualizar_status_todos_clientes(empresa.id, db, chunk_size=2) == 4
+    assert invalidadas == [empresa.id]
+
+    clientes = {c.nome: c for c in db.query(models.Cliente)}
+    status = {nome: (c.status_cliente, c.nivel_atividade, c.score_atividade, c.importante)
+              for nome, c in clientes.items()}
+    assert status == {
+        "Novo": ("novo", "baixo", 0, 0),
+        "Frequente": ("frequente", "alto", 100, 1),
+        "Inativo": ("inativo", "baixo", -10, 0),
+        "Recente": ("recente", "medio", 20, 0),
+        "Ativo": ("ativo", "medio", 25, 0),
+        "Outra": ("novo", "baixo", 0, 0),
+    }
+
+    for cliente in clientes.values():
+        services.classificar_cliente(cliente, db)
+        assert (cliente.status_cliente, cliente.nivel_atividade, cliente.score_atividade,
+                cliente.importante) == status[cliente.nome]
+
+    # Nada mudou: a segunda passada não regrava nenhuma linha.
+    db.rollback()
+    assert services.atualizar_status_todos_clientes(empresa.id, db) == 0
+    assert invalidadas == [empresa.id]
@@ -1,15 +1,144 @@
-from backend import sessions
+import time
+
 import pytest
+import redis
+
+from backend import sessions
 
 
-def test_create_and_get_session():
-    # Skip when Redis is unavailable in local/dev environments.
-    try:
-        token = sessions.create_session(123)
-    except Exception:
-        pytest.skip("Redis local não disponível para teste de sessão")
+def test_create_and_get_session(fake_redis):
+    token = sessions.create_session(123)
     assert isinstance(token, str) and len(token) > 0
     empresa_id = sessions.get_session_empresa(token)
     assert empresa_id == 123
     sessions.revoke_session(token)
     assert sessions.get_session_empresa(token) is None
+
+
+def test_revoke_all_sessions_for_empresa_usa_indice(fake_redis):
+    tokens = [sessions.create_session(124) for _ in range(3)]
+    outra = sessions.create_session(125)
+    sessions.revoke_session(tokens[0])
+    assert sessions.revoke_all_sessions_for_empresa(124) == 2
+    assert all(sessions.get_session_empresa(t) is None for t in tokens)
+    assert sessions.get_session_empresa(outra) == 125
+    sessions.revoke_session(outra)
+
+
+def test_indice_expira_junto_com_as_sessoes(fake_redis):
+    sessions.create_session(126)
+    index = sessions._empresa_index_key(126)
+    assert 0 < fake_redis.ttl(index) <= sessions.SESSION_TTL
+
+
+def test_sessoes_anteriores_ao_indice_sao_revogadas_apos_backfill(fake_redis):
+    # Sessões criadas antes do índice por empresa: só a chave session:{token}.
+    fake_redis.set(sessions._session_key("legado-1"), "127", ex=sessions.SESSION_TTL)
+    fake_redis.set(sessions._session_key("legado-2"), "127", ex=sessions.SESSION_TTL)
+    fake_redis.set(sessions._session_key("legado-3"), "128", ex=sessions.SESSION_TTL)
+    nova = sessions.create_session(127)
+
+    assert sessions.index_legacy_sessions(batch_size=2) == 4
+    assert sessions.revoke_all_sessions_for_empresa(127) == 3
+    assert sessions.get_session_empresa("legado-1") is None
+    assert sessions.get_session_empresa(nova) is None
+    assert sessions.get_session_empresa("legado-3") == 128
+
+
+def test_consulta_renova_ttl_do_indice_no_mesmo_round_trip(fake_redis, monkeypatch):
+    token = sessions.create_session(129)
+    index = sessions._empresa_index_key(129)
+    fake_redis.expire(index, 10)
+    monkeypatch.setattr(sessions, "SESSION_NEAR_CACHE_TTL", 0)
+
+    assert sessions.get_session_empresa(token) == 129
+    assert fake_redis.ttl(index) > 10
+
+
+@pytest.fixture
+def near_cache(fake_redis, monkeypatch):
+    monkeypatch.setattr(sessions, "SESSION_NEAR_CACHE_TTL", 60)
+    yield fake_redis
+    if sessions._subscriber is not None:
+        sessions._subscriber.stop()
+        sessions._subscriber.join(5)
+    sessions._subscriber = None
+    sessions.clear_near_cache()
+
+
+def _esperar(condicao):
+    for _ in range(500):
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_getex_renova_ttl_da_sessao(fake_redis):
+    token = sessions.create_session(130)
+    fake_redis.expire(sessions._session_key(token), 10)
+
+    assert sessions.get_session_empresa(token) == 130
+    assert fake_redis.ttl(sessions._session_key(token)) > 10
+
+
+def test_near_cache_responde_sem_ler_o_redis(near_cache):
+    token = sessions.create_session(131)
+    assert sessions.get_session_empresa(token) == 131
+
+    # Some do Redis sem passar por revoke_session: só o near cache pode responder.
+    near_cache.delete(sessions._session_key(token))
+    assert sessions.get_session_empresa(token) == 131
+
+
+def test_revoke_session_remove_do_near_cache(near_cache):
+    token = sessions.create_session(132)
+    assert sessions.get_session_empresa(token) == 132
+
+    sessions.revoke_session(token)
+    assert sessions.get_session_empresa(token) is None
+
+
+def test_revoke_all_remove_do_near_cache(near_cache):
+    tokens = [sessions.create_session(133) for _ in range(2)]
+    assert [sessions.get_session_empresa(t) for t in tokens] == [133, 133]
+
+    assert sessions.revoke_all_sessions_for_empresa(133) == 2
+    assert all(sessions.get_session_empresa(t) is None for t in tokens)
+
+
+def test_revogacao_publicada_por_outro_worker_remove_do_near_cache(near_cache):
+    token = sessions.create_session(134)
+    assert sessions.get_session_empresa(token) == 134
+    digest = sessions._token_digest(token)
+
+    near_cache.delete(sessions._session_key(token))
+    near_cache.publish(sessions.REVOCATION_CHANNEL, digest)
+
+    assert _esperar(lambda: sessions._near_get(digest) is None)
+    assert sessions.get_session_empresa(token) is None
+
+
+def test_sem_assinante_o_near_cache_nao_e_usado(near_cache, monkeypatch):
+    def indisponivel(**kwargs):
+        raise redis.ConnectionError("pubsub indisponível")
+
+    monkeypatch.setattr(near_cache, "pubsub", indisponivel)
+    token = sessions.create_session(135)
+    assert sessions.get_session_empresa(token) == 135
+
+    near_cache.delete(sessions._session_key(token))
+    assert sessions.get_session_empresa(token) is None
+
+
+def test_queda_do_assinante_limpa_o_near_cache(near_cache):
+    token = sessions.create_session(136)
+    assert sessions.get_session_empresa(token) == 136
+    assert sessions._subscriber.is_alive()
+
+    sessions._on_subscriber_error(redis.ConnectionError("caiu"), None, sessions._subscriber)
+    assert sessions._near_get(sessions._token_digest(token)) is None
+
+    # Sem o evento de revogação, a próxima consulta vai ao Redis (e reassina o canal).
+    near_cache.delete(sessions._session_key(token))
+    assert sessions.get_session_empresa(token) is None
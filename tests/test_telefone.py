@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from backend import models
+from backend.database import Base as DBBase
+from backend.routers.clientes import criar_cliente
+from backend.schemas import ClienteCreate
+from backend.telefone import TELEFONE_DUPLICADO, TELEFONE_UNICO, normalizar_telefone, violou_telefone_unico
+
+
+def setup_inmemory_db():
+    engine = create_engine("sqlite:///:memory:")
+    DBBase.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+
+@pytest.mark.parametrize("valor", ["(11) 99999-9999", "11999999999", "011 99999 9999", "+55 11 99999-9999"])
+def test_normalizar_telefone_celular(valor):
+    assert normalizar_telefone(valor) == "5511999999999"
+
+
+def test_normalizar_telefone_outros_casos():
+    assert normalizar_telefone("(11) 3333-4444") == "551133334444"
+    assert normalizar_telefone("+1 415 555 0100") == "14155550100"
+    assert normalizar_telefone("") is None
+    assert normalizar_telefone(None) is None
+
+
+def test_criar_cliente_recusa_mesmo_telefone_com_outra_formatacao():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="T1", nicho="x", email_login="t1@example.com", senha_hash="x")
+    outra = models.Empresa(nome_empresa="T2", nicho="x", email_login="t2@example.com", senha_hash="x")
+    db.add_all([empresa, outra])
+    db.commit()
+
+    criado = criar_cliente(ClienteCreate(nome="Ana", telefone="(11) 99999-9999"), empresa=empresa, db=db)
+    assert criado.telefone_normalizado == "5511999999999"
+
+    with pytest.raises(HTTPException) as exc_info:
+        criar_cliente(ClienteCreate(nome="Ana 2", telefone="11999999999"), empresa=empresa, db=db)
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == TELEFONE_DUPLICADO
+
+    # Outra empresa pode ter o mesmo telefone.
+    criar_cliente(ClienteCreate(nome="Ana", telefone="11999999999"), empresa=outra, db=db)
+    assert db.query(models.Cliente).count() == 2
+
+
+def test_so_o_indice_de_telefone_conta_como_duplicata():
+    db = setup_inmemory_db()
+    empresa = models.Empresa(nome_empresa="T1", nicho="x", email_login="t1@example.com", senha_hash="x")
+    db.add(empresa)
+    db.commit()
+
+    # Outra violação (aqui, NOT NULL) não vira "telefone duplicado".
+    db.add(models.Cliente(empresa_id=empresa.id, nome=None, telefone="11988887777"))
+    with pytest.raises(IntegrityError) as erro:
+        db.flush()
+    db.rollback()
+    assert not violou_telefone_unico(erro.value)
+
+    def postgres(constraint):
+        orig = SimpleNamespace(diag=SimpleNamespace(constraint_name=constraint))
+        return IntegrityError("INSERT", {}, orig)
+
+    assert violou_telefone_unico(postgres(TELEFONE_UNICO))
+    assert not violou_telefone_unico(postgres("atendimentos_cliente_id_fkey"))